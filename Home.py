@@ -66,7 +66,8 @@ with open("logo.png", "rb") as image_file:
 methodes = {
     "Méthode Dreux-Gorisse": "pages/1_Dreux_Gorisse.py",
     "Méthode des Volumes Absolus": "pages/2_Volumes_Absolus.py",
-    "Algorithme Génétique": "pages/3_Genetique.py"
+    "Algorithme Génétique": "pages/3_Genetique.py",
+    "Portefeuille Centrale (stocks partagés)": "pages/4_Portefeuille.py"
 }
 
 choix = st.selectbox("Méthode de formulation :", list(methodes.keys()))
@@ -1,38 +1,84 @@
 import numpy as np
-import random
+import hashlib
+import json
+import os
+import tempfile
+import itertools
 from collections import defaultdict
+from functools import partial
+
+from code_dreux_gorisse_final import classe_vraie_ciment
 
 # =============================================
 # FONCTION DE CONFIGURATION DES PARAMÈTRES ALGO
 # =============================================
-def configurer_parametres():
+PARAMETRES_DEFAUT = {"POP_SIZE": 100, "N_GENERATIONS": 80, "MUTATION_RATE": 0.15, "N_PARENTS": 20}
+# Réglages par classe de problème produits hors ligne par reglage_hyperparametres.py
+FICHIER_PARAMETRES_REGLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parametres_regles.json")
+
+def classe_probleme(constraints):
+    """Classe d'un problème : bande de résistance cible, largeur relative des bornes, Dmax."""
+    fc = constraints["target_strength"]
+    bande_fc = "fc≤25" if fc <= 25 else "fc25-35" if fc <= 35 else "fc>35"
+    largeur = np.mean([
+        (constraints[f"max_{mat}"] - constraints[f"min_{mat}"]) / max(constraints[f"max_{mat}"] + constraints[f"min_{mat}"], 1e-9) * 2
+        for mat in ("cement", "water", "sand", "gravel")
+    ])
+    bande_largeur = "bornes-étroites" if largeur < 0.15 else "bornes-moyennes" if largeur < 0.3 else "bornes-larges"
+    dmax = constraints["D_max"]
+    bande_dmax = "D≤10" if dmax <= 10 else "D≤16" if dmax <= 16 else "D≤20" if dmax <= 20 else "D>20"
+    return f"{bande_fc}|{bande_largeur}|{bande_dmax}"
+
+def variante_probleme(constraints):
+    """Type d'instance : choix de sources ("sources"), plafond CO2 ("co2") ou "simple"."""
+    if constraints.get("sources"):
+        return "sources"
+    return "co2" if "max_co2" in constraints else "simple"
+
+def parametres_regles(constraints, fichier=FICHIER_PARAMETRES_REGLES):
+    """
+    Paramètres GA réglés pour la classe du problème, ou PARAMETRES_DEFAUT si le fichier
+    manque ou si ce type d'instance (`variante_probleme`) n'a pas été représenté au réglage.
+    """
+    try:
+        with open(fichier, encoding="utf-8") as f:
+            regles = json.load(f)
+    except (OSError, ValueError):
+        return dict(PARAMETRES_DEFAUT)
+    if variante_probleme(constraints) not in regles.get("variantes", ["simple"]):
+        return dict(PARAMETRES_DEFAUT)
+    reglage = regles.get("classes", {}).get(classe_probleme(constraints), {})
+    return {nom: reglage.get(nom, defaut) for nom, defaut in PARAMETRES_DEFAUT.items()}
+
+def configurer_parametres(defauts=None):
+    defauts = defauts or PARAMETRES_DEFAUT
     print("\n⚙️ PERSONNALISATION DES PARAMÈTRES ALGORITHMIQUES")
     print("--------------------------------------------")
     
     parametres = {
         "POP_SIZE": {
-            "defaut": 100,
+            "defaut": defauts["POP_SIZE"],
             "description": "Nombre de solutions testées par génération",
             "conseil": "Augmenter (150-200) pour problèmes complexes, réduire (30-50) pour rapidité"
         },
         "N_GENERATIONS": {
-            "defaut": 80,
+            "defaut": defauts["N_GENERATIONS"],
             "description": "Nombre d'itérations de l'algorithme",
             "conseil": "Augmenter (>100) pour précision, réduire (<50) pour tests rapides"
         },
         "MUTATION_RATE": {
-            "defaut": 0.15,
+            "defaut": defauts["MUTATION_RATE"],
             "description": "Probabilité de modification aléatoire d'un dosage",
             "conseil": "Augmenter (0.2-0.3) pour explorer, réduire (0.05-0.1) pour affiner"
         },
         "N_PARENTS": {
-            "defaut": 20,
+            "defaut": defauts["N_PARENTS"],
             "description": "Nombre de meilleures solutions conservées",
             "conseil": "15-25% de POP_SIZE pour équilibre, 5-10% pour optimisation rapide"
         }
     }
 
-    print("\nValeurs par défaut recommandées :")
+    print("\nValeurs par défaut recommandées (réglées pour cette classe de problème) :")
     for nom, infos in parametres.items():
         print(f"- {nom}: {infos['defaut']} | {infos['description']}")
 
@@ -52,9 +98,15 @@ OPTIMIZATION_PROFILES = {
     1: {"name": "Résistance structurelle", "weights": (0.5, 0.3, 0.2)},
     2: {"name": "Ouvrabilité maximale", "weights": (0.3, 0.5, 0.2)},
     3: {"name": "Économie industrielle", "weights": (0.2, 0.3, 0.5)},
-    4: {"name": "Approche équilibrée", "weights": (0.33, 0.33, 0.34)}
+    4: {"name": "Approche équilibrée", "weights": (0.33, 0.33, 0.34)},
+    5: {"name": "Bas carbone", "weights": (0.25, 0.25, 0.2, 0.3)}
 }
 
+# Facteurs d'émission par défaut (kg CO2-eq/kg) : ordres de grandeur des FDES courantes
+FACTEURS_CO2 = {"cement": 0.84, "water": 0.0003, "sand": 0.005, "gravel": 0.008}
+# Empreinte (kg CO2-eq/m³) au-delà de laquelle le profil 'Bas carbone' est conseillé, sans plafond max_co2
+SEUIL_CONSEIL_CO2 = 350
+
 def resistance_compression(E_C, a=110.0, b=4.5):
     return a / (b ** (1.5 * E_C))
 
@@ -99,22 +151,30 @@ def get_user_constraints():
     constraints["rho_sand"] = float(input("→ Masse volumique du sable (kg/m³) [Typique=1600] : ") or "1600")
     constraints["rho_gravel"] = float(input("→ Masse volumique du gravier (kg/m³) [Typique=1500] : ") or "1500")
 
+    print("\n🌍 EMPREINTE CARBONE (kg CO2-eq/kg)")
+    for mat in materials:
+        constraints[f"co2_{mat}"] = float(input(f"→ {materials[mat]['name']} [Défaut={FACTEURS_CO2[mat]}] : ") or FACTEURS_CO2[mat])
+    plafond = input("→ Plafond CO2 (kg CO2-eq/m³) [Entrée = aucun] : ")
+    if plafond:
+        constraints["max_co2"] = float(plafond)
+
     return constraints
 
 def select_optimization_profile():
     print("\n🎯 STRATÉGIE D'OPTIMISATION")
     print("=========================")
     for k, v in OPTIMIZATION_PROFILES.items():
-        print(f"{k}. {v['name']} (Résistance={v['weights'][0]*100}%, Ouvrabilité={v['weights'][1]*100}%, Coût={v['weights'][2]*100}%)")
+        carbone = f", Carbone={v['weights'][3]*100}%" if len(v['weights']) > 3 else ""
+        print(f"{k}. {v['name']} (Résistance={v['weights'][0]*100}%, Ouvrabilité={v['weights'][1]*100}%, Coût={v['weights'][2]*100}%{carbone})")
     
     while True:
-        choice = int(input("→ Choix [1-4] : "))
+        choice = int(input(f"→ Choix [1-{len(OPTIMIZATION_PROFILES)}] : "))
         if choice in OPTIMIZATION_PROFILES:
             return OPTIMIZATION_PROFILES[choice]["weights"]
         print("⚠ Choix invalide !")
 
-def donner_conseils(best, constraints, GS_target, weights):
-    """Analyse les résultats et donne des conseils d'optimisation."""
+def generer_conseils(best, constraints, GS_target, weights):
+    """Analyse les résultats et retourne la liste des conseils d'optimisation."""
     C, E, S, G = best["cement"], best["water"], best["sand"], best["gravel"]
     E_C = E / C
     GS_real = (G / constraints["rho_gravel"]) / (S / constraints["rho_sand"])
@@ -123,6 +183,7 @@ def donner_conseils(best, constraints, GS_target, weights):
     slump = calculate_slump(E, constraints["D_max"])
     cost = sum([C * constraints["cost_cement"], E * constraints["cost_water"], 
                 S * constraints["cost_sand"], G * constraints["cost_gravel"]])
+    co2 = sum(best[mat] * facteur_co2(constraints, mat) for mat in MATERIAUX)
 
     conseils = []
     
@@ -155,6 +216,18 @@ def donner_conseils(best, constraints, GS_target, weights):
     if weights[2] < 0.3 and cost > (constraints["cost_cement"]*350 + constraints["cost_sand"]*600 + constraints["cost_gravel"]*900)*1.2:
         conseils.append("💰 Coût élevé : Essayez le profil 'Économie industrielle' (option 3)")
 
+    # 6. Empreinte carbone
+    if "max_co2" in constraints and co2 > constraints["max_co2"]:
+        conseils.append(f"🌍 Plafond CO2 dépassé ({co2:.0f} > {constraints['max_co2']:.0f} kg/m³). Solution : Réduire max_cement ou choisir un ciment moins émissif")
+    elif (len(weights) < 4 or weights[3] == 0) and co2 > constraints.get("max_co2", SEUIL_CONSEIL_CO2):
+        conseils.append("🌍 Empreinte carbone élevée : Essayez le profil 'Bas carbone' (option 5)")
+
+    return conseils
+
+def donner_conseils(best, constraints, GS_target, weights):
+    """Analyse les résultats et donne des conseils d'optimisation."""
+    conseils = generer_conseils(best, constraints, GS_target, weights)
+
     # Affichage conditionnel
     if conseils:
         print("\n💡 CONSEILS D'OPTIMISATION")
@@ -165,135 +238,836 @@ def donner_conseils(best, constraints, GS_target, weights):
         print("\n✅ Aucun ajustement nécessaire : la formulation est optimale !")
 
 # =============================================
-# ALGORITHME PRINCIPAL
+# CHOIX DISCRETS DES MATÉRIAUX (SOURCING)
 # =============================================
-def run_optimization():
-    # Chargement des configurations
-    parametres = configurer_parametres()
+# constraints["sources"] = {"cement": [...], "sand": [...], "gravel": [...]} : chaque option
+# porte son coût (FCFA/kg), son facteur CO2, sa masse volumique (granulats) et, pour
+# le ciment, le coefficient `a` de resistance_compression.
+CATEGORIES = ("cement", "sand", "gravel")
+
+def option_ciment(denomination, cost, co2=FACTEURS_CO2["cement"]):
+    """Option de ciment dont le coefficient de résistance suit la classe vraie (32.5 → a=110)."""
+    return {"name": denomination, "cost": cost, "co2": co2,
+            "a": 110.0 * classe_vraie_ciment(denomination) / classe_vraie_ciment("CEM I 32.5")}
+
+CIMENTS_DEFAUT = [
+    option_ciment("CEM I 32.5", 95.0, 0.80),
+    option_ciment("CEM I 42.5", 105.0, 0.84),
+    option_ciment("CEM I 52.5", 120.0, 0.88),
+]
+
+def genes_discrets(constraints):
+    """Matériaux à choix discret présents dans les contraintes, dans l'ordre de CATEGORIES."""
+    return [mat for mat in CATEGORIES if constraints.get("sources", {}).get(mat)]
+
+def variante_sources(constraints, choix):
+    """Contraintes scalaires correspondant à un choix {matériau: indice d'option}."""
+    variante = {k: v for k, v in constraints.items() if k != "sources"}
+    for mat, i in choix.items():
+        option = constraints["sources"][mat][i]
+        variante[f"cost_{mat}"] = option["cost"]
+        variante[f"co2_{mat}"] = option.get("co2", FACTEURS_CO2[mat])
+        if mat == "cement":
+            variante["coef_resistance"] = option["a"]
+        else:
+            variante[f"rho_{mat}"] = option["rho"]
+    return variante
+
+def decoder_choix(x, constraints):
+    """Indices d'options portés par les gènes discrets d'un individu."""
+    discrets = genes_discrets(constraints)
+    return {mat: int(min(max(np.floor(x[len(GENES) + j]), 0), len(constraints["sources"][mat]) - 1))
+            for j, mat in enumerate(discrets)}
+
+# =============================================
+# PRÉRÉSOLUTION DES BORNES
+# =============================================
+MATERIAUX = {"cement": "Ciment", "water": "Eau", "sand": "Sable", "gravel": "Gravier"}
+EC_MIN, EC_MAX = 0.30, 0.65
+S_RATIO_MIN, S_RATIO_MAX = 0.35, 0.45
+TOLERANCE_GS = 0.2
+GENES = tuple(MATERIAUX)
+
+def _projeter_ratio(x_bornes, y_bornes, r_min, r_max):
+    """Projette la boîte x × y sur le cône r_min ≤ y/x ≤ r_max (x > 0)."""
+    (x_min, x_max), (y_min, y_max) = x_bornes, y_bornes
+    x_proj = (max(x_min, y_min / r_max), min(x_max, y_max / r_min))
+    y_proj = (max(y_min, r_min * x_min), min(y_max, r_max * x_max))
+    return x_proj, y_proj
+
+def fenetre_ratio_GS(constraints, GS_target):
+    """Intervalle admissible de G/S en masse (G/S volumique ±20 % ∩ sable 35-45 %)."""
+    rho_ratio = constraints["rho_gravel"] / constraints["rho_sand"]
+    fenetre_gs = ((1 - TOLERANCE_GS) * GS_target * rho_ratio, (1 + TOLERANCE_GS) * GS_target * rho_ratio)
+    fenetre_masse = ((1 - S_RATIO_MAX) / S_RATIO_MAX, (1 - S_RATIO_MIN) / S_RATIO_MIN)
+    return max(fenetre_gs[0], fenetre_masse[0]), min(fenetre_gs[1], fenetre_masse[1]), fenetre_gs, fenetre_masse
+
+def facteur_co2(constraints, mat):
+    """Facteur d'émission (kg CO2-eq/kg) saisi ou, à défaut, valeur de FACTEURS_CO2."""
+    return constraints.get(f"co2_{mat}", FACTEURS_CO2[mat])
+
+def presolve_bornes(constraints, GS_target):
+    """
+    Resserre analytiquement les bornes min/max sur la région admissible
+    (E/C, G/S volumique, ratio massique sable, plafond CO2) avant l'optimisation.
+
+    Retourne un dict {"faisable", "bornes", "diagnostics"} ; chaque diagnostic
+    porte le message et le conseil d'ajustement correspondant. Avec des choix
+    discrets (`sources`), chaque combinaison est prérésolue : les bornes sont
+    l'enveloppe des combinaisons faisables et "sources" liste les options utiles.
+    """
+    discrets = genes_discrets(constraints)
+    if not discrets:
+        return _presolve_simple(constraints, GS_target)
+
+    faisables, echecs = [], []
+    for indices in itertools.product(*(range(len(constraints["sources"][mat])) for mat in discrets)):
+        choix = dict(zip(discrets, indices))
+        resultat = _presolve_simple(variante_sources(constraints, choix), GS_target)
+        (faisables if resultat["faisable"] else echecs).append((choix, resultat))
+
+    if not faisables:
+        choix, resultat = min(echecs, key=lambda e: len(e[1]["diagnostics"]))
+        noms = ", ".join(constraints["sources"][mat][i]["name"] for mat, i in choix.items())
+        diagnostics = [{**diag, "message": f"{diag['message']} (meilleure combinaison : {noms})"}
+                       for diag in resultat["diagnostics"]]
+        return {"faisable": False, "bornes": resultat["bornes"], "diagnostics": diagnostics}
+
+    bornes = {mat: (min(r["bornes"][mat][0] for _, r in faisables), max(r["bornes"][mat][1] for _, r in faisables))
+              for mat in MATERIAUX}
+    sources = {mat: sorted({choix[mat] for choix, _ in faisables}) for mat in discrets}
+    return {"faisable": True, "bornes": bornes, "diagnostics": [], "sources": sources}
+
+def _presolve_simple(constraints, GS_target):
+    """Prérésolution d'un problème sans choix discret (voir `presolve_bornes`)."""
+    bornes = {mat: (float(constraints[f"min_{mat}"]), float(constraints[f"max_{mat}"])) for mat in MATERIAUX}
+    diagnostics = []
+
+    def signaler(contrainte, message, conseil):
+        diagnostics.append({"contrainte": contrainte, "message": message, "conseil": conseil})
+
+    # 1. Cohérence des bornes saisies
+    for mat, nom in MATERIAUX.items():
+        lo, hi = bornes[mat]
+        if lo > hi:
+            signaler("bornes", f"Min {nom.lower()} ({lo:.0f}) > Max {nom.lower()} ({hi:.0f})",
+                     f"Corriger les bornes : min_{mat} doit être ≤ max_{mat}")
+        elif hi <= 0 and mat in ("cement", "sand"):
+            signaler("bornes", f"Max {nom.lower()} nul : les ratios E/C et G/S sont indéfinis",
+                     f"Saisir un max_{mat} strictement positif")
+    if diagnostics:
+        return {"faisable": False, "bornes": bornes, "diagnostics": diagnostics}
+
+    # 2. Fenêtre E/C : 0.30·C ≤ E ≤ 0.65·C
+    (c_min, c_max), (w_min, w_max) = bornes["cement"], bornes["water"]
+    if EC_MAX * c_max < w_min:
+        signaler("E/C", f"E/C > {EC_MAX:.2f} inévitable (eau min {w_min:.0f} pour ciment max {c_max:.0f})",
+                 f"💧 Augmenter max_cement à ≥ {w_min / EC_MAX:.0f} kg/m³ ou réduire min_water à ≤ {EC_MAX * c_max:.0f} kg/m³")
+    if EC_MIN * c_min > w_max:
+        signaler("E/C", f"E/C < {EC_MIN:.2f} inévitable (eau max {w_max:.0f} pour ciment min {c_min:.0f})",
+                 f"💧 Augmenter max_water à ≥ {EC_MIN * c_min:.0f} kg/m³ ou réduire min_cement à ≤ {w_max / EC_MIN:.0f} kg/m³")
+
+    # 3. Fenêtre G/S en masse : r_min·S ≤ G ≤ r_max·S
+    if GS_target <= 0:
+        signaler("G/S", f"G/S cible non positif ({GS_target:.2f}) : affaissement trop élevé pour ce Dmax/Mf",
+                 "🔍 Réduire l'affaissement cible ou augmenter Dmax")
+    else:
+        r_min, r_max, fenetre_gs, fenetre_masse = fenetre_ratio_GS(constraints, GS_target)
+        (s_min, s_max), (g_min, g_max) = bornes["sand"], bornes["gravel"]
+        if r_min > r_max:
+            signaler("G/S", f"G/S cible ±20 % (masse {fenetre_gs[0]:.2f}-{fenetre_gs[1]:.2f}) incompatible avec "
+                            f"le ratio sable 35-45 % (G/S masse {fenetre_masse[0]:.2f}-{fenetre_masse[1]:.2f})",
+                     "🔍 Vérifier ρ sable / ρ gravier, Mf et Dmax : aucune borne ne peut compenser")
+        else:
+            if r_min * s_min > g_max:
+                source = "G/S volumique" if r_min == fenetre_gs[0] else "ratio sable ≤ 45 %"
+                signaler("G/S", f"Pas assez de gravier possible ({source} : G ≥ {r_min:.2f}·S)",
+                         f"🏖️ Augmenter max_gravel à ≥ {r_min * s_min:.0f} kg/m³ ou réduire min_sand à ≤ {g_max / r_min:.0f} kg/m³")
+            if r_max * s_max < g_min:
+                source = "G/S volumique" if r_max == fenetre_gs[1] else "ratio sable ≥ 35 %"
+                signaler("G/S", f"Trop de gravier imposé ({source} : G ≤ {r_max:.2f}·S)",
+                         f"🏖️ Réduire min_gravel à ≤ {r_max * s_max:.0f} kg/m³ ou augmenter max_sand à ≥ {g_min / r_max:.0f} kg/m³")
+
+    if diagnostics:
+        return {"faisable": False, "bornes": bornes, "diagnostics": diagnostics}
+
+    # 4. Projection des boîtes sur les cônes admissibles
+    bornes["cement"], bornes["water"] = _projeter_ratio(bornes["cement"], bornes["water"], EC_MIN, EC_MAX)
+    bornes["sand"], bornes["gravel"] = _projeter_ratio(bornes["sand"], bornes["gravel"], r_min, r_max)
+
+    # 5. Plafond carbone : émission minimale atteignable dans la région admissible
+    if "max_co2" in constraints:
+        ef = {mat: facteur_co2(constraints, mat) for mat in MATERIAUX}
+        c_min, s_min = bornes["cement"][0], bornes["sand"][0]
+        co2_granulats = ef["sand"] * s_min + ef["gravel"] * max(bornes["gravel"][0], r_min * s_min)
+        co2_min = ef["cement"] * c_min + ef["water"] * max(bornes["water"][0], EC_MIN * c_min) + co2_granulats
+        if co2_min > constraints["max_co2"]:
+            signaler("CO2", f"Émission minimale atteignable {co2_min:.0f} kg CO2-eq/m³ > plafond {constraints['max_co2']:.0f}",
+                     f"🌍 Relever max_co2 à ≥ {co2_min:.0f} kg/m³, réduire min_cement ou choisir un ciment moins émissif")
+            return {"faisable": False, "bornes": bornes, "diagnostics": diagnostics}
+        c_max = (constraints["max_co2"] - co2_granulats) / (ef["cement"] + ef["water"] * EC_MIN)
+        bornes["cement"] = (bornes["cement"][0], min(bornes["cement"][1], c_max))
+        bornes["cement"], bornes["water"] = _projeter_ratio(bornes["cement"], bornes["water"], EC_MIN, EC_MAX)
+    return {"faisable": True, "bornes": bornes, "diagnostics": diagnostics}
+
+def appliquer_presolve(constraints, presolve):
+    """Copie des contraintes avec les bornes resserrées par `presolve_bornes`."""
+    resserrees = dict(constraints)
+    for mat, (lo, hi) in presolve["bornes"].items():
+        resserrees[f"min_{mat}"], resserrees[f"max_{mat}"] = lo, hi
+    if "sources" in presolve:
+        resserrees["sources"] = {**constraints["sources"],
+                                 **{mat: [constraints["sources"][mat][i] for i in indices]
+                                    for mat, indices in presolve["sources"].items()}}
+    return resserrees
+
+def afficher_diagnostic_presolve(presolve):
+    """Affiche le diagnostic d'infaisabilité et les conseils associés."""
+    print("\n❌ BORNES INFAISABLES")
+    print("====================")
+    for diag in presolve["diagnostics"]:
+        print(f"- [{diag['contrainte']}] {diag['message']}")
+    print("\n💡 CONSEILS D'OPTIMISATION")
+    print("========================")
+    for i, diag in enumerate(presolve["diagnostics"], 1):
+        print(f"{i}. {diag['conseil']}")
+
+
+# =============================================
+# OBJECTIF VECTORISÉ
+# =============================================
+
+def _coefficients_materiaux(X, constraints):
+    """
+    Coefficients coût/CO2 (… × 4 × 2), masses volumiques et coefficient de résistance,
+    scalaires ou par individu selon les gènes discrets (colonnes 4 et suivantes de X).
+    Des contraintes empilées (tableaux de taille M, cf. portefeuille) donnent M × 4 × 2.
+    """
+    coefficients = np.array([[constraints[f"cost_{mat}"], facteur_co2(constraints, mat)] for mat in GENES], dtype=float)
+    if coefficients.ndim > 2:
+        coefficients = np.moveaxis(coefficients, (0, 1), (-2, -1))
+    rho = {"sand": constraints["rho_sand"], "gravel": constraints["rho_gravel"]}
+    coef_resistance = constraints.get("coef_resistance", 110.0)
+
+    discrets = genes_discrets(constraints)
+    if discrets:
+        coefficients = np.broadcast_to(coefficients, X.shape[:-1] + coefficients.shape).copy()
+        for j, mat in enumerate(discrets):
+            options = constraints["sources"][mat]
+            idx = np.clip(np.floor(X[..., len(GENES) + j]).astype(int), 0, len(options) - 1)
+            coefficients[..., GENES.index(mat), 0] = np.array([o["cost"] for o in options])[idx]
+            coefficients[..., GENES.index(mat), 1] = np.array([o.get("co2", FACTEURS_CO2[mat]) for o in options])[idx]
+            if mat == "cement":
+                coef_resistance = np.array([o["a"] for o in options])[idx]
+            else:
+                rho[mat] = np.array([o["rho"] for o in options], dtype=float)[idx]
+    return coefficients, rho, coef_resistance
+
+def evaluer_indicateurs(X, constraints, GS_target):
+    """
+    Indicateurs d'une population X (n × 4 : ciment, eau, sable, gravier, suivis des
+    éventuels gènes discrets de `sources`) en une passe.
+    Les indicateurs `penalite_*` valent True lorsque la contrainte est violée.
+    """
+    X = np.asarray(X, dtype=float)
+    C, E, S, G = X[..., 0], X[..., 1], X[..., 2], X[..., 3]
+    coefficients, rho, coef_resistance = _coefficients_materiaux(X, constraints)
+    # Coût et carbone en un seul produit : (n × 4) @ (4 × 2), ou par individu (n × 4 × 2)
+    if coefficients.ndim == 2:
+        cost, co2 = np.moveaxis(X[..., :len(GENES)] @ coefficients, -1, 0)
+    else:
+        cost, co2 = np.moveaxis(np.einsum("...j,...jk->...k", X[..., :len(GENES)], coefficients), -1, 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        E_C = E / C
+        GS_real = (G / rho["gravel"]) / (S / rho["sand"])
+        S_ratio = S / (S + G)
+        strength = resistance_compression(E_C, a=coef_resistance)
+    slump = calculate_slump(E, constraints["D_max"])
+
+    return {
+        "E_C": E_C,
+        "strength": strength,
+        "slump": slump,
+        "cost": cost,
+        "co2": co2,
+        "GS_real": GS_real,
+        "S_ratio": S_ratio,
+        "penalite_EC": ~((E_C >= EC_MIN) & (E_C <= EC_MAX)),
+        "penalite_GS": np.abs(GS_real - GS_target) > TOLERANCE_GS * GS_target,
+        "penalite_masse": ~((S_ratio >= S_RATIO_MIN) & (S_ratio <= S_RATIO_MAX)),
+        "penalite_co2": co2 > constraints.get("max_co2", np.inf),
+    }
+
+def evaluer_population(X, constraints, weights, GS_target, squelette=None, poids_compacite=0.0):
+    """
+    Fitness (à maximiser) de chaque individu de X, identique pour tous les optimiseurs.
+    Avec un `squelette` sable + gravier (`empilement_compressible`), la compacité Φ du
+    squelette de chaque individu ajoute `poids_compacite` × 100·Φ.
+    """
+    ind = evaluer_indicateurs(X, constraints, GS_target)
+
+    # Normalisation
+    strength_norm = ind["strength"] / 50
+    slump_norm = 1 - (np.abs(ind["slump"] - constraints["target_slump"]) / 150)
+    cost_norm = 1e6 / (ind["cost"] + 1e4)
+    co2_norm = 1e4 / (ind["co2"] + 100)
+
+    # Profils à 3 poids : carbone non pondéré
+    w_str, w_work, w_cost, w_co2 = (*weights, 0.0)[:4]
+    fitness = (w_str * strength_norm * 10 +
+               w_work * slump_norm * 5 +
+               w_cost * cost_norm +
+               w_co2 * co2_norm -
+               1e6 * ind["penalite_GS"] - 1e6 * ind["penalite_masse"] - 1e6 * ind["penalite_co2"])
+    if squelette is not None and poids_compacite:
+        from empilement_compressible import compacite_population
+        fitness = fitness + poids_compacite * 100 * compacite_population(X, constraints, squelette)
+    return np.where(ind["penalite_EC"], -1e9, fitness)
+
+# =============================================
+# OPTIMISEURS INTERCHANGEABLES
+# =============================================
+# Chaque moteur reçoit l'objectif vectorisé (X de forme n × d → fitness de forme n),
+# les bornes lo/hi, les paramètres algorithmiques et un générateur aléatoire numpy.
+# Il retourne {"x": meilleur individu, "fitness": sa fitness}.
+
+class PointDeReprise:
+    """
+    Sauvegarde compacte (.npz) de l'état d'un GA : population, état du générateur,
+    archive élite, génération courante et listes annexes (historique).
+
+    Le fichier n'est repris que si sa signature correspond au problème courant ;
+    sinon le calcul repart de zéro et l'écrase.
+    """
+
+    def __init__(self, chemin, signature, intervalle=10, annexes=None):
+        self.chemin = chemin
+        self.signature = signature
+        self.intervalle = max(1, int(intervalle))
+        self.annexes = annexes or {}
+
+    def charger(self):
+        if not os.path.exists(self.chemin):
+            return None
+        with np.load(self.chemin, allow_pickle=False) as data:
+            if str(data["signature"]) != self.signature:
+                return None
+            etat = {k: data[k] for k in data.files}
+        for nom, valeurs in self.annexes.items():
+            valeurs[:] = etat[f"annexe_{nom}"].tolist()
+        etat["rng"] = json.loads(str(etat["rng"]))
+        etat["generation"] = int(etat["generation"])
+        return etat
+
+    def sauver(self, generation, population, rng, archive_x, archive_f):
+        dossier = os.path.dirname(os.path.abspath(self.chemin))
+        with tempfile.NamedTemporaryFile(dir=dossier, suffix=".npz", delete=False) as tmp:
+            np.savez_compressed(
+                tmp,
+                signature=self.signature,
+                generation=generation,
+                population=population,
+                rng=json.dumps(rng.bit_generator.state),
+                archive_x=archive_x,
+                archive_f=archive_f,
+                **{f"annexe_{nom}": np.asarray(valeurs, dtype=float) for nom, valeurs in self.annexes.items()},
+            )
+        os.replace(tmp.name, self.chemin)
+
+def signature_probleme(*elements):
+    """Empreinte SHA-256 stable des entrées d'un calcul (dicts triés, tuples, scalaires)."""
+    return hashlib.sha256(json.dumps(elements, sort_keys=True, default=str).encode()).hexdigest()
+
+N_ELITES = 5
+
+def _optimiser_ga(objectif, lo, hi, parametres, rng, reprise=None, discretes=None):
+    """
+    Algorithme génétique : sélection des N_PARENTS meilleurs, croisement barycentrique,
+    mutation gaussienne, archive des N_ELITES meilleurs individus rencontrés.
+    `reprise` (PointDeReprise) permet de reprendre un calcul interrompu à l'identique.
+    `discretes` donne le nombre d'options de chaque gène (0 = continu) : les gènes
+    discrets sont hérités d'un des deux parents et mutés par tirage uniforme.
+    """
     POP_SIZE = int(parametres["POP_SIZE"])
     N_GENERATIONS = int(parametres["N_GENERATIONS"])
     MUTATION_RATE = parametres["MUTATION_RATE"]
-    N_PARENTS = int(parametres["N_PARENTS"])
-    
+    N_PARENTS = min(max(int(parametres["N_PARENTS"]), 2), POP_SIZE)
+    echelle = (hi - lo) / 20
+    discretes = np.zeros(lo.size, dtype=int) if discretes is None else np.asarray(discretes)
+    cat = discretes > 0
+
+    etat = reprise.charger() if reprise is not None else None
+    if etat is not None:
+        debut, population = etat["generation"], etat["population"]
+        archive_x, archive_f = etat["archive_x"], etat["archive_f"]
+        rng.bit_generator.state = etat["rng"]
+    else:
+        debut = 0
+        population = lo + (hi - lo) * rng.random((POP_SIZE, lo.size))
+        if cat.any():
+            population[:, cat] = rng.integers(0, discretes[cat], size=(POP_SIZE, cat.sum()))
+        archive_x, archive_f = np.empty((0, lo.size)), np.empty(0)
+
+    for gen in range(debut, N_GENERATIONS):
+        fitnesses = objectif(population)
+
+        # Archive élite
+        candidats_x = np.concatenate([archive_x, population])
+        candidats_f = np.concatenate([archive_f, fitnesses])
+        garde = np.argsort(-candidats_f, kind="stable")[:N_ELITES]
+        archive_x, archive_f = candidats_x[garde], candidats_f[garde]
+
+        # Sélection
+        parents = population[np.argpartition(fitnesses, -N_PARENTS)[-N_PARENTS:]]
+
+        # Reproduction (deux parents distincts)
+        i1 = rng.integers(N_PARENTS, size=POP_SIZE)
+        i2 = (i1 + rng.integers(1, N_PARENTS, size=POP_SIZE)) % N_PARENTS
+        alpha = rng.uniform(0.4, 0.6, size=(POP_SIZE, 1))
+        enfants = alpha * parents[i1] + (1 - alpha) * parents[i2]
+        if cat.any():
+            herite = rng.random((POP_SIZE, cat.sum())) < 0.5
+            enfants[:, cat] = np.where(herite, parents[i1][:, cat], parents[i2][:, cat])
+
+        # Mutation
+        taux = MUTATION_RATE * (0.5 + 0.5 * np.exp(-gen / 20))
+        masque = rng.random(enfants.shape) < taux
+        mutes = np.clip(enfants + rng.normal(0.0, echelle, size=enfants.shape), lo, hi)
+        if cat.any():
+            mutes[:, cat] = rng.integers(0, discretes[cat], size=(POP_SIZE, cat.sum()))
+        population = np.where(masque, mutes, enfants)
+
+        if reprise is not None and ((gen + 1) % reprise.intervalle == 0 or gen + 1 == N_GENERATIONS):
+            reprise.sauver(gen + 1, population, rng, archive_x, archive_f)
+
+    fitnesses = objectif(population)
+    finale_x = np.concatenate([archive_x, population])
+    finale_f = np.concatenate([archive_f, fitnesses])
+    i_best = int(np.argmax(finale_f))
+    return {"x": finale_x[i_best], "fitness": float(finale_f[i_best])}
+
+def _optimiser_de(objectif, lo, hi, parametres, rng):
+    """Évolution différentielle de SciPy, évaluation vectorisée de toute la population."""
+    from scipy.optimize import differential_evolution
+
+    res = differential_evolution(
+        lambda X: -objectif(X.T),
+        list(zip(lo, hi)),
+        maxiter=int(parametres["N_GENERATIONS"]),
+        popsize=max(1, int(parametres["POP_SIZE"]) // lo.size),
+        tol=0,
+        seed=int(rng.integers(2**32)),
+        polish=False,
+        updating="deferred",
+        vectorized=True,
+    )
+    return {"x": res.x, "fitness": float(-res.fun)}
+
+def _optimiser_cmaes(objectif, lo, hi, parametres, rng):
+    """CMA-ES (μ/μ_w, λ) en coordonnées normalisées [0, 1]^d, individus ramenés dans les bornes."""
+    d = lo.size
+    lam = max(4, int(parametres["POP_SIZE"]))
+    mu = lam // 2
+    w = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+    w /= w.sum()
+    mu_eff = 1 / np.sum(w ** 2)
+
+    # Constantes d'adaptation (Hansen, 2016)
+    c_sigma = (mu_eff + 2) / (d + mu_eff + 5)
+    d_sigma = 1 + 2 * max(0.0, np.sqrt((mu_eff - 1) / (d + 1)) - 1) + c_sigma
+    c_c = (4 + mu_eff / d) / (d + 4 + 2 * mu_eff / d)
+    c_1 = 2 / ((d + 1.3) ** 2 + mu_eff)
+    c_mu = min(1 - c_1, 2 * (mu_eff - 2 + 1 / mu_eff) / ((d + 2) ** 2 + mu_eff))
+    chi_n = np.sqrt(d) * (1 - 1 / (4 * d) + 1 / (21 * d ** 2))
+
+    m, sigma = rng.random(d), 0.3
+    Cov, p_sigma, p_c = np.eye(d), np.zeros(d), np.zeros(d)
+    best_x, best_f = None, -np.inf
+
+    for gen in range(int(parametres["N_GENERATIONS"])):
+        valeurs, B = np.linalg.eigh(Cov)
+        D = np.sqrt(np.maximum(valeurs, 1e-20))
+        Z = rng.standard_normal((lam, d))
+        Y = (Z * D) @ B.T
+        U = np.clip(m + sigma * Y, 0.0, 1.0)
+        fitnesses = objectif(lo + (hi - lo) * U)
+
+        ordre = np.argsort(-fitnesses)
+        if fitnesses[ordre[0]] > best_f:
+            best_f, best_x = float(fitnesses[ordre[0]]), lo + (hi - lo) * U[ordre[0]]
+
+        # Recombinaison sur les pas effectifs (après projection dans les bornes)
+        Y_sel = (U[ordre[:mu]] - m) / sigma
+        y_w = w @ Y_sel
+        m = m + sigma * y_w
+
+        C_inv_sqrt = B @ np.diag(1 / D) @ B.T
+        p_sigma = (1 - c_sigma) * p_sigma + np.sqrt(c_sigma * (2 - c_sigma) * mu_eff) * C_inv_sqrt @ y_w
+        h_sigma = np.linalg.norm(p_sigma) / np.sqrt(1 - (1 - c_sigma) ** (2 * (gen + 1))) < (1.4 + 2 / (d + 1)) * chi_n
+        p_c = (1 - c_c) * p_c + h_sigma * np.sqrt(c_c * (2 - c_c) * mu_eff) * y_w
+
+        Cov = ((1 - c_1 - c_mu) * Cov
+               + c_1 * (np.outer(p_c, p_c) + (1 - h_sigma) * c_c * (2 - c_c) * Cov)
+               + c_mu * (Y_sel.T * w) @ Y_sel)
+        sigma *= np.exp((c_sigma / d_sigma) * (np.linalg.norm(p_sigma) / chi_n - 1))
+        sigma = min(sigma, 1.0)
+
+    return {"x": best_x, "fitness": best_f}
+
+def _optimiser_pso(objectif, lo, hi, parametres, rng):
+    """Essaim particulaire à meilleur global (coefficients de constriction de Clerc)."""
+    n = int(parametres["POP_SIZE"])
+    inertie, c_perso, c_social = 0.7298, 1.49618, 1.49618
+    v_max = 0.2 * (hi - lo)
+
+    X = lo + (hi - lo) * rng.random((n, lo.size))
+    V = rng.uniform(-v_max, v_max, size=X.shape)
+    f = objectif(X)
+    perso_x, perso_f = X.copy(), f.copy()
+    i_best = int(np.argmax(f))
+    best_x, best_f = X[i_best].copy(), float(f[i_best])
+
+    for _ in range(int(parametres["N_GENERATIONS"])):
+        r1, r2 = rng.random(X.shape), rng.random(X.shape)
+        V = np.clip(inertie * V + c_perso * r1 * (perso_x - X) + c_social * r2 * (best_x - X), -v_max, v_max)
+        X = np.clip(X + V, lo, hi)
+        f = objectif(X)
+
+        ameliores = f > perso_f
+        perso_x[ameliores], perso_f[ameliores] = X[ameliores], f[ameliores]
+        i_best = int(np.argmax(perso_f))
+        if perso_f[i_best] > best_f:
+            best_x, best_f = perso_x[i_best].copy(), float(perso_f[i_best])
+
+    return {"x": best_x, "fitness": best_f}
+
+OPTIMISEURS = {
+    "ga": {"name": "Algorithme génétique", "fonction": _optimiser_ga, "reprise": True, "discretes": True},
+    "de": {"name": "Évolution différentielle (SciPy)", "fonction": _optimiser_de, "reprise": False, "discretes": False},
+    "cmaes": {"name": "CMA-ES", "fonction": _optimiser_cmaes, "reprise": False, "discretes": False},
+    "pso": {"name": "Essaim particulaire (PSO)", "fonction": _optimiser_pso, "reprise": False, "discretes": False},
+}
+# Les moteurs sans "discretes" traitent les choix de sources par relaxation continue :
+# le gène vit dans [0, nombre d'options) et l'option retenue est sa partie entière.
+
+# =============================================
+# API
+# =============================================
+def optimiser_formulation(constraints, weights, parametres=None, methode="ga", seed=None,
+                          checkpoint=None, intervalle_checkpoint=10, n_workers=1, trace_population=False,
+                          GS_target=None, squelette=None, poids_compacite=0.0):
+    """
+    Optimise une formulation sans interaction (page Streamlit, scripts, lots).
+
+    `methode` est une clé de OPTIMISEURS ; les paramètres non fournis prennent les
+    valeurs réglées pour la classe du problème (`parametres_regles`). Si les bornes sont infaisables, retourne
+    {"faisable": False, "presolve": ...} sans lancer l'optimiseur.
+    `checkpoint` (chemin .npz) sauvegarde l'état toutes les `intervalle_checkpoint`
+    générations et reprend un calcul interrompu ; avec la même graine, le résultat
+    est identique au bit près à celui d'un calcul ininterrompu.
+    `n_workers` > 1 répartit l'évaluation de la fitness sur un pool de processus
+    partageant la population en mémoire (`evaluation_parallele`) ; le résultat est inchangé.
+    `trace_population` conserve chaque population évaluée (float32) dans res["population"]
+    pour `echantillonner_population`.
+    `GS_target` remplace le G/S volumique empirique de `compute_GS_target`, par exemple
+    le rapport de compacité maximale du squelette (`empilement_compressible.rapport_GS_optimal`).
+    `squelette` (sable + gravier, `empilement_compressible.squelette_granulaire`) et
+    `poids_compacite` > 0 ajoutent la compacité du squelette à l'objectif (cf. `evaluer_population`).
+    """
+    parametres = {**parametres_regles(constraints), **(parametres or {})}
+    if checkpoint is not None and not OPTIMISEURS[methode]["reprise"]:
+        raise ValueError(f"Le moteur '{methode}' ne gère pas les points de reprise")
+    if poids_compacite and squelette is None:
+        raise ValueError("poids_compacite > 0 exige un squelette granulaire")
+    if squelette is not None and {"sand", "gravel"} & set(genes_discrets(constraints)):
+        raise ValueError("Le squelette décrit un seul sable et un seul gravier : incompatible avec le choix des sources de granulats")
+    if GS_target is None:
+        GS_target = compute_GS_target(constraints["target_slump"], constraints["D_max"], constraints["Mf"])
+
+    presolve = presolve_bornes(constraints, GS_target)
+    if not presolve["faisable"]:
+        return {"faisable": False, "presolve": presolve, "GS_target": GS_target}
+    constraints = appliquer_presolve(constraints, presolve)
+
+    discrets = genes_discrets(constraints)
+    niveaux = [len(constraints["sources"][mat]) for mat in discrets]
+    lo = np.array([constraints[f"min_{mat}"] for mat in GENES] + [0] * len(discrets), dtype=float)
+    hi = np.array([constraints[f"max_{mat}"] for mat in GENES] + niveaux, dtype=float)
+    historique = []
+    evaluer = partial(evaluer_population, constraints=constraints, weights=weights, GS_target=GS_target,
+                      squelette=squelette, poids_compacite=poids_compacite)
+    if n_workers > 1:
+        from evaluation_parallele import EvaluateurParallele
+        evaluer = EvaluateurParallele(evaluer, len(lo), n_workers, capacite=max(int(parametres["POP_SIZE"]), 64))
+
+    trace = []
+
+    def objectif(X):
+        fitnesses = evaluer(X)
+        historique.append(max(float(np.max(fitnesses)), historique[-1] if historique else -np.inf))
+        if trace_population:
+            trace.append((np.asarray(X, dtype=np.float32), np.asarray(fitnesses, dtype=np.float32)))
+        return fitnesses
+
+    rng = np.random.default_rng(seed)
+    options = {}
+    if checkpoint is not None:
+        signature = signature_probleme(dict(constraints), list(weights), parametres, methode, seed, GS_target,
+                                       squelette and squelette.empreinte(), poids_compacite)
+        options["reprise"] = PointDeReprise(checkpoint, signature, intervalle_checkpoint, {"historique": historique})
+    if discrets and OPTIMISEURS[methode]["discretes"]:
+        options["discretes"] = [0] * len(GENES) + niveaux
+    try:
+        res = OPTIMISEURS[methode]["fonction"](objectif, lo, hi, parametres, rng, **options)
+    finally:
+        if n_workers > 1:
+            evaluer.fermer()
+
+    population = None
+    if trace_population:
+        population = {
+            "X": np.concatenate([X for X, _ in trace]),
+            "fitness": np.concatenate([f for _, f in trace]),
+            "generation": np.repeat(np.arange(len(trace), dtype=np.int32), [len(f) for _, f in trace]),
+            "constraints": constraints,
+        }
+
+    # Le choix de sources retenu fixe des contraintes scalaires pour la suite (rapport, conseils, cartes)
+    best = dict(zip(GENES, map(float, res["x"][:len(GENES)])))
+    if discrets:
+        choix = decoder_choix(res["x"], constraints)
+        best["sources"] = {mat: constraints["sources"][mat][i]["name"] for mat, i in choix.items()}
+        constraints = variante_sources(constraints, choix)
+    indicateurs = {k: v.item() for k, v in evaluer_indicateurs(res["x"][:len(GENES)], constraints, GS_target).items()}
+    if squelette is not None:
+        from empilement_compressible import compacite_population
+        indicateurs["compacite"] = float(compacite_population(res["x"][:len(GENES)], constraints, squelette))
+    return {
+        "faisable": True,
+        "methode": methode,
+        "best": best,
+        "fitness": res["fitness"],
+        "indicateurs": indicateurs,
+        "GS_target": GS_target,
+        "constraints": constraints,
+        "weights": weights,
+        "squelette": squelette,
+        "poids_compacite": poids_compacite,
+        "presolve": presolve,
+        "historique": historique,
+        "population": population,
+        "conseils": generer_conseils(best, constraints, GS_target, weights),
+    }
+
+def formater_resultats(res):
+    """Rapport texte des résultats d'`optimiser_formulation` (console et export TXT)."""
+    best, ind, constraints = res["best"], res["indicateurs"], res["constraints"]
+    GS_target, weights = res["GS_target"], res["weights"]
+    lignes = [
+        "\n🔎 BORNES RESSERRÉES (région admissible)",
+        *[f"  • {nom} ∈ [{constraints[f'min_{mat}']:.1f} ; {constraints[f'max_{mat}']:.1f}] kg/m³"
+          for mat, nom in MATERIAUX.items()],
+        f"\n✅ RÉSULTATS OPTIMISÉS ({OPTIMISEURS[res['methode']]['name']})",
+        "=====================",
+        f"🧱 Ciment : {best['cement']:.0f} kg/m³",
+        f"💧 Eau : {best['water']:.0f} kg/m³ | E/C = {ind['E_C']:.3f}",
+        f"🏖 Sable : {best['sand']:.0f} kg/m³ ({ind['S_ratio']*100:.1f}%)",
+        f"🗻 Gravier : {best['gravel']:.0f} kg/m³ ({(1-ind['S_ratio'])*100:.1f}%)",
+        *([f"🏷️ Sources : " + ", ".join(f"{MATERIAUX[mat]}={nom}" for mat, nom in best["sources"].items())]
+          if "sources" in best else []),
+        f"📐 Ratio G/S (volumique) : {ind['GS_real']:.2f} (Cible={GS_target:.2f})",
+    ]
+    if ind["penalite_GS"]:
+        lignes.append("⚠️ Écart > 20% avec le G/S optimal !")
+    lignes += [
+        f"📏 Ratio Sable/Gravier (masse) : {ind['S_ratio']*100:.1f}% (Cible 35-45%)",
+        f"🏋️ Résistance : {ind['strength']:.1f} MPa (Cible: {constraints['target_strength']} MPa)",
+        f"📏 Affaissement : {ind['slump']:.0f} mm (Cible: {constraints['target_slump']} mm)",
+        f"💰 Coût total : {ind['cost']:,.0f} FCFA/m³",
+        f"🌍 Empreinte carbone : {ind['co2']:.0f} kg CO2-eq/m³"
+        + (f" (Plafond: {constraints['max_co2']:.0f})" if "max_co2" in constraints else ""),
+    ]
+    if "compacite" in ind:
+        lignes.append(f"🧩 Compacité du squelette : {ind['compacite']:.4f}"
+                      + (f" (Poids: {res['poids_compacite']:g})" if res.get("poids_compacite") else ""))
+
+    profile = next((p for p in OPTIMIZATION_PROFILES.values() if p["weights"] == tuple(weights)), None)
+    lignes.append(f"\n⚙ PROFIL APPLIQUÉ : {profile['name'] if profile else 'Personnalisé'}")
+    carbone = f", Carbone={weights[3]*100:.0f}%" if len(weights) > 3 else ""
+    lignes.append(f"- Résistance={weights[0]*100:.0f}%, Ouvrabilité={weights[1]*100:.0f}%, Coût={weights[2]*100:.0f}%{carbone}")
+    return "\n".join(lignes)
+
+# =============================================
+# PAYSAGE DE LA FITNESS
+# =============================================
+AXES_PAYSAGE = {
+    "E_C": {"name": "E/C", "etendue": (0.25, 0.75)},
+    "S_ratio": {"name": "Ratio massique sable S/(S+G)", "etendue": (0.25, 0.55)},
+    **{mat: {"name": f"{nom} (kg/m³)", "etendue": None} for mat, nom in MATERIAUX.items()},
+}
+# Bits de la carte des pénalités (16 : hors des bornes min/max resserrées)
+PENALITES_PAYSAGE = {"penalite_EC": 1, "penalite_GS": 2, "penalite_masse": 4, "penalite_co2": 8}
+HORS_BORNES_PAYSAGE = 16
+_CACHE_PAYSAGE = {}
+_TAILLE_CACHE_PAYSAGE = 16
+
+def carte_paysage(res, axe_x="E_C", axe_y="S_ratio", n=200, etendue_x=None, etendue_y=None):
+    """
+    Fitness et pénalités sur une grille n × n de deux axes (gènes ou E/C, ratio sable),
+    les autres gènes étant fixés à l'optimum de `res` (résultat d'optimiser_formulation).
+
+    Une seule évaluation vectorisée de l'objectif exact de l'optimiseur ; les cartes
+    sont mises en cache par empreinte des entrées.
+    """
+    if axe_x == axe_y or {axe_x, axe_y} in ({"E_C", "water"}, {"S_ratio", "sand"}, {"S_ratio", "gravel"}):
+        raise ValueError(f"Axes incompatibles : {axe_x} × {axe_y}")
+    constraints, weights, GS_target, best = res["constraints"], res["weights"], res["GS_target"], res["best"]
+
+    def etendue(axe, valeur):
+        if valeur is not None:
+            return valeur
+        if AXES_PAYSAGE[axe]["etendue"] is not None:
+            return AXES_PAYSAGE[axe]["etendue"]
+        return 0.8 * constraints[f"min_{axe}"], 1.2 * constraints[f"max_{axe}"]
+    etendue_x, etendue_y = etendue(axe_x, etendue_x), etendue(axe_y, etendue_y)
+
+    squelette, poids_compacite = res.get("squelette"), res.get("poids_compacite", 0.0)
+    cle = signature_probleme(dict(constraints), list(weights), best, GS_target, axe_x, axe_y, n, etendue_x, etendue_y,
+                             squelette and squelette.empreinte(), poids_compacite)
+    if cle in _CACHE_PAYSAGE:
+        return _CACHE_PAYSAGE[cle]
+
+    xs = np.linspace(*etendue_x, n)
+    ys = np.linspace(*etendue_y, n)
+    grille = {axe_x: xs[None, :], axe_y: ys[:, None]}
+
+    # Gènes fixés à l'optimum, puis axes directs, puis axes dérivés
+    X = np.empty((n, n, len(GENES)))
+    for j, mat in enumerate(GENES):
+        X[..., j] = grille.get(mat, best[mat])
+    if "E_C" in grille:
+        X[..., 1] = grille["E_C"] * X[..., 0]
+    if "S_ratio" in grille:
+        total = X[..., 2] + X[..., 3]
+        X[..., 2] = grille["S_ratio"] * total
+        X[..., 3] = total - X[..., 2]
+
+    X = X.reshape(-1, len(GENES))
+    indicateurs = evaluer_indicateurs(X, constraints, GS_target)
+    penalites = sum(bit * indicateurs[nom].astype(np.uint8) for nom, bit in PENALITES_PAYSAGE.items())
+    lo = np.array([constraints[f"min_{mat}"] for mat in GENES])
+    hi = np.array([constraints[f"max_{mat}"] for mat in GENES])
+    penalites += HORS_BORNES_PAYSAGE * np.any((X < lo) | (X > hi), axis=1).astype(np.uint8)
+    carte = {
+        "axe_x": axe_x,
+        "axe_y": axe_y,
+        "x": xs,
+        "y": ys,
+        "fitness": evaluer_population(X, constraints, weights, GS_target, squelette, poids_compacite).reshape(n, n),
+        "penalites": penalites.reshape(n, n),
+    }
+
+    if len(_CACHE_PAYSAGE) >= _TAILLE_CACHE_PAYSAGE:
+        _CACHE_PAYSAGE.pop(next(iter(_CACHE_PAYSAGE)))
+    _CACHE_PAYSAGE[cle] = carte
+    return carte
+
+def coordonnees_optimum(res, axe):
+    """Position de l'optimum de `res` sur un axe de AXES_PAYSAGE."""
+    best = res["best"]
+    if axe == "E_C":
+        return best["water"] / best["cement"]
+    if axe == "S_ratio":
+        return best["sand"] / (best["sand"] + best["gravel"])
+    return best[axe]
+
+# =============================================
+# TRACE DE LA POPULATION
+# =============================================
+MAX_POINTS_POPULATION = 20000
+
+def echantillonner_population(res, max_points=MAX_POINTS_POPULATION, part_elite=0.1, seed=0):
+    """
+    Sous-échantillon borné de la population tracée (`trace_population=True`) pour
+    l'affichage : au plus `max_points` individus, répartis également entre les
+    générations ; dans chaque génération, la meilleure fraction `part_elite` du quota
+    est toujours conservée, le reste est tiré au hasard. Les indicateurs (E/C, coût,
+    pénalités) ne sont calculés que sur les individus retenus.
+
+    Retourne {"generation", "E_C", "cost", "fitness", "admissible", "n_total"}.
+    """
+    population = res["population"]
+    generation, fitness = population["generation"], population["fitness"]
+    n_generations = int(generation[-1]) + 1
+    quota = max(1, max_points // n_generations)
+    rng = np.random.default_rng(seed)
+
+    debuts = np.searchsorted(generation, np.arange(n_generations + 1))
+    retenus = []
+    for debut, fin in zip(debuts[:-1], debuts[1:]):
+        if fin - debut <= quota:
+            retenus.append(np.arange(debut, fin))
+            continue
+        ordre = debut + np.argsort(-fitness[debut:fin], kind="stable")
+        n_elite = int(np.ceil(part_elite * quota))
+        reste = rng.choice(ordre[n_elite:], size=quota - n_elite, replace=False)
+        retenus.append(np.concatenate([ordre[:n_elite], reste]))
+    retenus = np.sort(np.concatenate(retenus))
+
+    ind = evaluer_indicateurs(population["X"][retenus].astype(float), population["constraints"], res["GS_target"])
+    penalise = ind["penalite_EC"] | ind["penalite_GS"] | ind["penalite_masse"] | ind["penalite_co2"]
+    return {
+        "generation": generation[retenus],
+        "E_C": ind["E_C"],
+        "cost": ind["cost"],
+        "fitness": fitness[retenus],
+        "admissible": ~penalise,
+        "n_total": len(fitness),
+    }
+
+# =============================================
+# ALGORITHME PRINCIPAL
+# =============================================
+def select_optimizer():
+    print("\n🧭 MOTEUR D'OPTIMISATION")
+    print("=======================")
+    cles = list(OPTIMISEURS)
+    for i, cle in enumerate(cles, 1):
+        print(f"{i}. {OPTIMISEURS[cle]['name']}")
+
+    while True:
+        choice = input(f"→ Choix [1-{len(cles)}] (défaut=1) : ") or "1"
+        if choice.isdigit() and 1 <= int(choice) <= len(cles):
+            return cles[int(choice) - 1]
+        print("⚠ Choix invalide !")
+
+def select_workers():
+    n_cpu = os.cpu_count() or 1
+    while True:
+        choice = input(f"→ Processus parallèles pour la fitness [1-{n_cpu}] (défaut=1) : ") or "1"
+        if choice.isdigit() and int(choice) >= 1:
+            return int(choice)
+        print("⚠ Choix invalide !")
+
+def run_optimization():
+    # Chargement des configurations
     constraints = get_user_constraints()
+    parametres = configurer_parametres(parametres_regles(constraints))
     weights = select_optimization_profile()
-    
-    # Calcul du G/S cible
-    GS_target = compute_GS_target(constraints["target_slump"], constraints["D_max"], constraints["Mf"])
-    
-    # Initialisation population
-    def generate_individual():
-        return {
-            "cement": random.uniform(constraints["min_cement"], constraints["max_cement"]),
-            "water": random.uniform(constraints["min_water"], constraints["max_water"]),
-            "sand": random.uniform(constraints["min_sand"], constraints["max_sand"]),
-            "gravel": random.uniform(constraints["min_gravel"], constraints["max_gravel"])
-        }
-    
-    population = [generate_individual() for _ in range(POP_SIZE)]
-    
-    # Évolution
-    for gen in range(N_GENERATIONS):
-        # Évaluation
-        def compute_fitness(ind):
-            C, E, S, G = ind["cement"], ind["water"], ind["sand"], ind["gravel"]
-            E_C = E / C
-            
-            if not (0.30 <= E_C <= 0.65): return -1e9
-            
-            # Calcul des indicateurs
-            strength = resistance_compression(E_C)
-            slump_dev = abs(calculate_slump(E, constraints["D_max"]) - constraints["target_slump"])
-            cost = sum([
-                C * constraints["cost_cement"],
-                E * constraints["cost_water"],
-                S * constraints["cost_sand"],
-                G * constraints["cost_gravel"]
-            ])
-            
-            # Vérification G/S
-            GS_real = (G / constraints["rho_gravel"]) / (S / constraints["rho_sand"])
-            GS_penalty = 0
-            if abs(GS_real - GS_target) > 0.2 * GS_target:
-                GS_penalty = 1e6
-                
-            # Vérification ratio masse
-            S_ratio = S / (S + G)
-            mass_ratio_penalty = 0
-            if not 0.35 <= S_ratio <= 0.45:
-                mass_ratio_penalty = 1e6
-
-            # Normalisation
-            strength_norm = strength / 50
-            slump_norm = 1 - (slump_dev / 150)
-            cost_norm = 1e6 / (cost + 1e4)
-            
-            w_str, w_work, w_cost = weights
-            return (w_str * strength_norm * 10 +
-                    w_work * slump_norm * 5 +
-                    w_cost * cost_norm -
-                    GS_penalty - mass_ratio_penalty)
-        
-        fitnesses = [compute_fitness(ind) for ind in population]
-        
-        # Sélection
-        parents = [population[i] for i in np.argpartition(fitnesses, -N_PARENTS)[-N_PARENTS:]]
-        
-        # Reproduction
-        next_gen = []
-        while len(next_gen) < POP_SIZE:
-            p1, p2 = random.sample(parents, 2)
-            alpha = random.uniform(0.4, 0.6)
-            child = {
-                k: alpha * p1[k] + (1 - alpha) * p2[k]
-                for k in p1.keys()
-            }
-            
-            # Mutation
-            for k in child:
-                if random.random() < MUTATION_RATE * (0.5 + 0.5 * np.exp(-gen / 20)):
-                    delta = random.gauss(0, (constraints[f"max_{k}"] - constraints[f"min_{k}"]) / 20)
-                    child[k] = np.clip(child[k] + delta, constraints[f"min_{k}"], constraints[f"max_{k}"])
-            
-            next_gen.append(child)
-        
-        population = next_gen
-    
-    # Résultats
-    best = max(population, key=lambda x: compute_fitness(x))
-    C, E, S, G = best["cement"], best["water"], best["sand"], best["gravel"]
-    E_C = E / C
-    S_ratio = S / (S + G)
-    GS_real = (G / constraints["rho_gravel"]) / (S / constraints["rho_sand"])
-    
-    print("\n✅ RÉSULTATS OPTIMISÉS")
-    print("=====================")
-    print(f"🧱 Ciment : {C:.0f} kg/m³")
-    print(f"💧 Eau : {E:.0f} kg/m³ | E/C = {E_C:.3f}")
-    print(f"🏖 Sable : {S:.0f} kg/m³ ({S_ratio*100:.1f}%)")
-    print(f"🗻 Gravier : {G:.0f} kg/m³ ({(1-S_ratio)*100:.1f}%)")
-    print(f"📐 Ratio G/S (volumique) : {GS_real:.2f} (Cible={GS_target:.2f})")
-    if abs(GS_real - GS_target) > 0.2 * GS_target:
-        print("⚠️ Écart > 20% avec le G/S optimal !")
-    print(f"📏 Ratio Sable/Gravier (masse) : {S_ratio*100:.1f}% (Cible 35-45%)")
-    print(f"🏋️ Résistance : {resistance_compression(E_C):.1f} MPa (Cible: {constraints['target_strength']} MPa)")
-    print(f"📏 Affaissement : {calculate_slump(E, constraints['D_max']):.0f} mm (Cible: {constraints['target_slump']} mm)")
-    
-    cost = sum([
-        C * constraints["cost_cement"],
-        E * constraints["cost_water"],
-        S * constraints["cost_sand"],
-        G * constraints["cost_gravel"]
-    ])
-    print(f"💰 Coût total : {cost:,.0f} FCFA/m³")
-    
-    # Conseils
-    profile = next(p for p in OPTIMIZATION_PROFILES.values() if p["weights"] == weights)
-    print(f"\n⚙ PROFIL APPLIQUÉ : {profile['name']}")
-    print(f"- Résistance={weights[0]*100:.0f}%, Ouvrabilité={weights[1]*100:.0f}%, Coût={weights[2]*100:.0f}%")
-    
+    methode = select_optimizer()
+    n_workers = select_workers()
+
+    res = optimiser_formulation(constraints, weights, parametres, methode, n_workers=n_workers)
+    if not res["faisable"]:
+        afficher_diagnostic_presolve(res["presolve"])
+        return None
+
+    print(formater_resultats(res))
+
     # Appel du nouveau module de conseils
-    donner_conseils(best, constraints, GS_target, weights)
+    donner_conseils(res["best"], res["constraints"], res["GS_target"], weights)
+    return res
 
 # =============================================
 # LANCEMENT
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# Banc d'essai de l'évaluation parallèle (evaluation_parallele.py) de 1 à 16 processus
+#
+#   python benchmark_parallele.py [--scenarios 200] [--pop 2000] [--repetitions 5] [--markdown]
+#
+# La fitness mesurée est une fitness « robuste » coûteuse : moyenne de
+# `evaluer_population` sur des scénarios où ρ, Mf et les coûts sont perturbés.
+#
+import argparse
+import os
+import time
+from functools import partial
+
+import numpy as np
+
+import algorithme_genetique_co as ga
+from evaluation_parallele import EvaluateurParallele
+
+CONTRAINTES = {"target_strength": 30, "target_slump": 100, "D_max": 20, "Mf": 2.5,
+               "rho_sand": 1600, "rho_gravel": 1500,
+               "cost_cement": 100, "cost_water": 0.23, "cost_sand": 5, "cost_gravel": 9,
+               "min_cement": 270, "max_cement": 330, "min_water": 180, "max_water": 220,
+               "min_sand": 540, "max_sand": 660, "min_gravel": 810, "max_gravel": 990}
+POIDS = (0.25, 0.25, 0.25, 0.25)
+PROCESSUS = [1, 2, 4, 8, 12, 16]
+
+def scenarios_perturbes(constraints, n, dispersion=0.05, seed=0):
+    """n variantes des contraintes avec ρ, Mf et coûts perturbés (±dispersion, loi normale)."""
+    rng = np.random.default_rng(seed)
+    cles = ["rho_sand", "rho_gravel", "Mf", *[f"cost_{mat}" for mat in ga.GENES]]
+    return [{**constraints, **{k: constraints[k] * (1 + dispersion * rng.standard_normal()) for k in cles}}
+            for _ in range(n)]
+
+def fitness_robuste(X, scenarios, weights):
+    """Fitness moyenne sur les scénarios (K évaluations vectorisées par appel)."""
+    total = np.zeros(len(X))
+    for c in scenarios:
+        GS_target = ga.compute_GS_target(c["target_slump"], c["D_max"], c["Mf"])
+        total += ga.evaluer_population(X, c, weights, GS_target)
+    return total / len(scenarios)
+
+def mesurer(objectif, X, repetitions):
+    """Temps médian d'une évaluation complète de X."""
+    objectif(X)  # échauffement (imports, caches)
+    temps = []
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        objectif(X)
+        temps.append(time.perf_counter() - t0)
+    return float(np.median(temps))
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d’essai de l’évaluation parallèle de la fitness")
+    parser.add_argument("--scenarios", type=int, default=200)
+    parser.add_argument("--pop", type=int, default=2000)
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--markdown", action="store_true", help="affiche aussi le tableau pour le README")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    lo = np.array([CONTRAINTES[f"min_{mat}"] for mat in ga.GENES], dtype=float)
+    hi = np.array([CONTRAINTES[f"max_{mat}"] for mat in ga.GENES], dtype=float)
+    X = rng.uniform(lo, hi, size=(args.pop, len(lo)))
+    fonction = partial(fitness_robuste, scenarios=scenarios_perturbes(CONTRAINTES, args.scenarios), weights=POIDS)
+
+    print(f"\n⏱️ ÉVALUATION PARALLÈLE – {args.pop} individus × {args.scenarios} scénarios "
+          f"({os.cpu_count()} CPU logiques)")
+    print("==============================================================")
+    if (os.cpu_count() or 1) < 2:
+        print("⚠️ Un seul CPU : les mesures ne donnent que le surcoût du mode parallèle, pas son accélération.")
+    reference = mesurer(fonction, X, args.repetitions)
+    print(f"{'séquentiel':>12} : {reference * 1e3:8.1f} ms")
+    lignes = [("séquentiel", reference)]
+    for n in PROCESSUS:
+        with EvaluateurParallele(fonction, len(lo), n_workers=n, capacite=args.pop) as objectif:
+            assert np.allclose(objectif(X), fonction(X))
+            t = mesurer(objectif, X, args.repetitions)
+        print(f"{n:>3} processus : {t * 1e3:8.1f} ms | accélération ×{reference / t:.2f}")
+        lignes.append((str(n), t))
+
+    if args.markdown:
+        print(f"\n{os.cpu_count()} CPU logiques, {args.pop} individus × {args.scenarios} scénarios\n")
+        print("| Processus | Temps (ms) | Accélération |")
+        print("|-----------|-----------:|-------------:|")
+        for nom, t in lignes:
+            print(f"| {nom} | {t * 1e3:.1f} | ×{reference / t:.2f} |")
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,703 @@
 # Code optimisé et corrigé - Version exécutable directement dans VSCode
 
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import numpy as np
-from scipy.interpolate import interp1d, RBFInterpolator
+from scipy.interpolate import RBFInterpolator
 import math
+import os
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from functools import lru_cache
+from dataclasses import dataclass, field
 import pandas as pd
 
+# ============================================
+# MODÈLE COPT (C/E, affaissement) → dosage en ciment
+# ============================================
+
+@dataclass(eq=False)
+class CalibrationCopt:
+    """Table de calibration Copt : points (C/E, affaissement en cm) et Copt (kg/m³)."""
+    points: np.ndarray
+    valeurs: np.ndarray
+    nom: str = "Dreux (3 points)"
+
+    @property
+    def cle(self):
+        donnees = np.ascontiguousarray(self.points, dtype=float).tobytes() + np.ascontiguousarray(self.valeurs, dtype=float).tobytes()
+        return hashlib.sha1(donnees).hexdigest()
+
+CALIBRATION_COPT_DEFAUT = CalibrationCopt(np.array([[1.6, 8], [2.0, 10], [2.4, 2]]),
+                                          np.array([327.27, 427.27, 425.00]))
+# Au-delà de SEUIL_VOISINS_COPT points, l'interpolation est locale (VOISINS_COPT plus proches)
+SEUIL_VOISINS_COPT = 5000
+VOISINS_COPT = 50
+MAX_MODELES_COPT = 8
+_MODELES_COPT = {}  # LRU : le modèle le plus récemment servi en dernier
+
+def modele_Copt(calibration=None):
+    """
+    RBF thin-plate de la table, ajustée au premier appel puis servie depuis un cache
+    LRU du module (MAX_MODELES_COPT calibrations).
+    """
+    calibration = calibration or CALIBRATION_COPT_DEFAUT
+    cle = calibration.cle
+    modele = _MODELES_COPT.pop(cle, None)
+    if modele is None:
+        points = np.asarray(calibration.points, dtype=float)
+        voisins = VOISINS_COPT if len(points) > SEUIL_VOISINS_COPT else None
+        modele = RBFInterpolator(points, np.asarray(calibration.valeurs, dtype=float),
+                                 kernel='thin_plate_spline', neighbors=voisins)
+    _MODELES_COPT[cle] = modele
+    while len(_MODELES_COPT) > MAX_MODELES_COPT:
+        _MODELES_COPT.pop(next(iter(_MODELES_COPT)), None)
+    return modele
+
+def copt_lot(rapport_CE, affaissement_cm, calibration=None):
+    """Copt (kg/m³) pour des tableaux de C/E et d'affaissements (cm) diffusables, en un appel."""
+    CE, aff = np.broadcast_arrays(np.asarray(rapport_CE, dtype=float), np.asarray(affaissement_cm, dtype=float))
+    return modele_Copt(calibration)(np.column_stack([CE.ravel(), aff.ravel()])).reshape(CE.shape)
+
+def lire_calibration_Copt(source, nom=None):
+    """
+    Charge une table de calibration propre à la centrale (CSV ou XLSX, chemin ou fichier
+    téléversé) avec les colonnes « C/E », « Affaissement (cm) » et « Copt (kg/m³) »,
+    et ajuste son modèle une fois pour toutes.
+    """
+    nom = nom or getattr(source, "name", str(source))
+    lecture = pd.read_excel if str(nom).lower().endswith((".xlsx", ".xls")) else pd.read_csv
+    df = lecture(source).dropna()
+    manquantes = {"C/E", "Affaissement (cm)", "Copt (kg/m³)"} - set(df.columns)
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes dans la table Copt : {', '.join(sorted(manquantes))}")
+    calibration = CalibrationCopt(df[["C/E", "Affaissement (cm)"]].to_numpy(dtype=float),
+                                  df["Copt (kg/m³)"].to_numpy(dtype=float), os.path.basename(str(nom)))
+    modele_Copt(calibration)
+    return calibration
+
+# ============================================
+# SÉRIES DE TAMIS ET GRILLE CANONIQUE
+# ============================================
+
+SERIES_TAMIS = {
+    "NF P18-540": (0.08, 0.16, 0.32, 0.63, 1.25, 2.5, 5.0, 6.3, 8, 10, 12.5, 16, 20, 25, 31.5),
+    "EN 933-2": (0.125, 0.25, 0.5, 1, 2, 4, 6.3, 8, 10, 12.5, 16, 20, 25, 31.5, 63),
+    "Complète": (63, 50, 40, 31.5, 25, 20, 16, 12.5, 10, 8, 6.3, 5, 4, 2.5, 2, 1.25, 1,
+                 0.63, 0.5, 0.315, 0.25, 0.16, 0.125, 0.08, 0.063),
+}
+# Grille canonique (ouvertures nominales décroissantes) : toutes les séries ci-dessus
+# et les tamis complémentaires EN 933-2 (5,6 – 11,2 – 14 – 22,4 – 45…)
+GRILLE_TAMIS = np.array(sorted({*SERIES_TAMIS["Complète"], 45, 22.4, 14, 11.2, 5.6, 2.8, 1.4, 0.71, 0.355},
+                               reverse=True), dtype=float)
+TOLERANCE_TAMIS = 0.03  # écart relatif admis avec l'ouverture nominale (0,32 ≡ 0,315)
+# Module de finesse : refus cumulés sur la série AFNOR de Dreux (base de Ks = 6·Mf − 15)
+TAMIS_MF = (0.16, 0.315, 0.63, 1.25, 2.5, 5.0)
+
+def normaliser_tamis(diams):
+    """Ouvertures ramenées à la valeur nominale de la grille à TOLERANCE_TAMIS près (inchangées sinon)."""
+    d = np.asarray(diams, dtype=float)
+    ecart = np.abs(np.log(d[..., None] / GRILLE_TAMIS))
+    j = np.argmin(ecart, axis=-1)
+    return np.where(np.take_along_axis(ecart, j[..., None], -1)[..., 0] <= np.log1p(TOLERANCE_TAMIS), GRILLE_TAMIS[j], d)
+
+@lru_cache(maxsize=64)
+def index_grille(diams):
+    """Position sur GRILLE_TAMIS de chaque tamis d'une série (tuple), calculée une fois par série."""
+    nominaux = normaliser_tamis(diams)
+    hors_grille = [d for d, n in zip(diams, nominaux) if n not in GRILLE_TAMIS]
+    if hors_grille:
+        raise ValueError(f"Tamis hors grille normalisée : {', '.join(map(str, hors_grille))} mm")
+    index = np.searchsorted(-GRILLE_TAMIS, -nominaux)
+    if len(set(index.tolist())) < len(index):
+        raise ValueError("Plusieurs tamis de la série correspondent à la même ouverture nominale")
+    index.setflags(write=False)
+    return index
+
+def sur_grille(passants, diams):
+    """Passants (…, T) saisis sur `diams` (None/NaN = non mesuré) → (…, G) sur GRILLE_TAMIS."""
+    index = index_grille(tuple(float(d) for d in diams))
+    v = np.asarray(passants, dtype=float)
+    grille = np.full(v.shape[:-1] + (len(GRILLE_TAMIS),), np.nan)
+    grille[..., index] = v
+    return grille
+
+_INDEX_MF = index_grille(TAMIS_MF)
+
+def module_finesse(passants, diams):
+    """
+    Mf = Σ refus cumulés (%) sur TAMIS_MF / 100, pour des courbes (…, T) sur `diams`.
+    Les tamis de TAMIS_MF absents de la série (EN 933-2…) sont interpolés en log d.
+    """
+    grille = completer_courbes(sur_grille(passants, diams), GRILLE_TAMIS)
+    return np.sum(100 - grille[..., _INDEX_MF], axis=-1) / 100
+
+def valeurs_D(passants, diams, pourcentages=(10, 50, 90)):
+    """Diamètres D_x (mm) où les courbes (…, T) passent x %, interpolés en log d ; NaN hors mesures."""
+    # Tamis croissants : sur un palier (0 % ou 100 %), l'encadrement retient le tamis le plus proche de D_x
+    grille = sur_grille(passants, diams)[..., ::-1]
+    resultats = []
+    for x in pourcentages:
+        log_d, _, statut = interpoler_lot(grille, np.log10(GRILLE_TAMIS[::-1]), x)
+        resultats.append(np.where(statut == 0, 10 ** log_d, np.nan))
+    return np.stack(resultats, axis=-1)
+
+# ============================================
+# API DE CALCUL (sans saisie ni affichage)
+# ============================================
+
+KP_POMPABILITE = {"non": 0, "pompable": 5, "très pompable": 10}
+RHO_CIMENT = 3100  # kg/m³
+MAX_GRANULATS = 6  # fractions granulaires d'une formulation (sable + graviers)
+
+@dataclass
+class ResultatDreux:
+    """Résultat complet d'une formulation Dreux-Gorisse (`calculer_dreux`)."""
+    Dmax: float
+    mfs: float
+    fcm: float
+    rapport_CE: float
+    Copt: float
+    dosage_standard: str
+    coefficients_K: dict          # {"K", "Ks", "Kp", "Kprime"}
+    proportions: dict             # {granulat: % volumique}
+    gamma: float
+    E_corrige: float
+    volumes: dict                 # litres : "ciment", "granulats", "eau", puis chaque granulat
+    masses: dict                  # kg : "ciment", "eau", puis chaque granulat
+    warnings: list = field(default_factory=list)
+    messages: list = field(default_factory=list)   # remplacements de points, valeurs par défaut…
+    donnees_graphique: dict = field(default_factory=dict)  # arguments de `tracer`
+
+    @property
+    def cle(self):
+        """Empreinte des données du graphique (clé du cache des exports)."""
+        return hashlib.sha1(repr(self.donnees_graphique).encode()).hexdigest()
+
+    def tableau(self):
+        """Tableau de synthèse (Description / Valeur) de la version console."""
+        noms = [n for n in self.volumes if n not in ("ciment", "granulats", "eau")]
+        description = (["Volume ciment (l)", "Volume granulats (l)", "Volume eau (l)"]
+                       + [f"Volume {n} (l)" for n in noms]
+                       + ["Masse ciment (kg)", "Masse eau (kg)"]
+                       + [f"Masse {n} (kg)" for n in noms] + ["Avertissements"])
+        valeur = ([round(self.volumes[k], 1) for k in ("ciment", "granulats", "eau", *noms)]
+                  + [round(self.masses[k], 1) for k in ("ciment", "eau", *noms)]
+                  + [" / ".join(self.warnings) if self.warnings else "✅ OK"])
+        return pd.DataFrame({"Description": description, "Valeur": valeur})
+
+def calculer_dreux(diams, granulats, fc28, denomination_ciment, affaissement_cm,
+                   type_sable, type_gravier, rho_granulats, vibration="normale",
+                   pompabilite="non", qualite_granulats="Bonne", mfs=None, calibration_Copt=None,
+                   cible_melange=None):
+    """
+    Formulation Dreux-Gorisse à partir d'entrées structurées, sans input() ni print().
+
+    `granulats` : {nom: % passants sur chaque tamis de `diams` (None si non mesuré)},
+    du plus fin (sable) au plus gros ; `rho_granulats` : {nom: kg/m³}. Le module de
+    finesse `mfs` est détecté sur le sable s'il n'est pas fourni. La forme retenue
+    pour K′ est celle du sable. `calibration_Copt` (CalibrationCopt) remplace la
+    table Copt par défaut. Avec `cible_melange` ("OAB", "fuller" ou "andreasen"), les
+    proportions sont ajustées par moindres carrés sur tous les tamis au lieu de la
+    méthode graphique des points 95 % / 5 %.
+    """
+    return GrapheDreux(**{nom: valeur for nom, valeur in locals().items() if nom in ENTREES_DREUX}).resultat()
+
+# ============================================
+# GRAPHE DE CALCUL INCRÉMENTAL
+# ============================================
+# Chaque étape est mise en cache ; modifier une entrée n'invalide que les étapes en aval.
+
+ENTREES_DREUX = ("diams", "granulats", "fc28", "denomination_ciment", "affaissement_cm",
+                 "type_sable", "type_gravier", "rho_granulats", "vibration", "pompabilite",
+                 "qualite_granulats", "mfs", "calibration_Copt", "cible_melange")
+DEFAUTS_DREUX = {"vibration": "normale", "pompabilite": "non", "qualite_granulats": "Bonne",
+                 "mfs": None, "calibration_Copt": None, "cible_melange": None}
+
+def _etape_Dmax(diams, granulats):
+    return max(d for g in granulats.values() for d, v in zip(diams, g) if v is not None)
+
+def _etape_mfs(granulats, diams, mfs):
+    return detecter_module_finesse(granulats, diams) if mfs is None else mfs
+
+def _etape_rapport_CE(fc28, denomination_ciment, qualite_granulats, Dmax):
+    fcm = fc28 * 1.15
+    G = determiner_G(Dmax, qualite_granulats)
+    return fcm, fcm / (G * classe_vraie_ciment(denomination_ciment)) + G
+
+def _etape_Copt(rapport_CE, affaissement_cm, calibration_Copt):
+    # Interpolation RBF (modèle ajusté une seule fois par table de calibration)
+    return float(copt_lot(rapport_CE[1], affaissement_cm, calibration_Copt))
+
+def _etape_coefficients_K(Copt, type_sable, vibration, mfs, pompabilite):
+    dosage_standard = determiner_dosage_standard(Copt)
+    return dosage_standard, coefficients_Kprime(type_sable, vibration, dosage_standard, mfs, KP_POMPABILITE[pompabilite])
+
+def _etape_points(granulats, diams):
+    messages = []
+    return paires_95_5(granulats, diams, messages), messages
+
+def _etape_courbe(Dmax, coefficients_K):
+    return courbe_reference(Dmax, coefficients_K[1]["Kprime"])
+
+def _etape_melange(points, courbe, granulats, diams, Dmax, coefficients_K, cible_melange):
+    noms = list(granulats)
+    if cible_melange is None:
+        paires, messages = points
+        return (*proportions_paires(paires, noms, courbe), {}, list(messages))
+    passants = np.array([[np.nan if v is None else v for v in g] for g in granulats.values()], dtype=float)
+    cible = courbe_cible(diams, Dmax, cible_melange, coefficients_K[1]["Kprime"])
+    p, melange, ecart = melange_moindres_carres(completer_courbes(passants, diams), cible)
+    return ([], [], dict(zip(noms, p.tolist())), {"cible": cible.tolist(), "melange": melange.tolist()},
+            [f"📐 Mélange par moindres carrés ({cible_melange}) : écart moyen {ecart:.2f} %"])
+
+def _etape_E_corrige(Copt, rapport_CE, Dmax):
+    return Copt / rapport_CE[1] * (1 + get_correction_Dmax(Dmax) / 100)
+
+def _etape_gamma(affaissement_cm, Dmax, type_sable, type_gravier):
+    messages = []
+    plasticite, serrage = evaluer_ouvrabilite(affaissement_cm)
+    gamma = interpoler_gamma(plasticite, serrage, Dmax, messages) + correction_gamma(type_sable, type_gravier)
+    return gamma, messages
+
+def _etape_volumes(Copt, gamma, E_corrige, melange, granulats):
+    # Volumes de base (m³), ramenés à 1 m³ si nécessaire
+    # puis répartis entre les N granulats en un seul calcul vectoriel
+    proportions = melange[2]
+    Vc = float(max(Copt / RHO_CIMENT, 0))
+    Vg = float(max(gamma[0] - Vc, 0))
+    Ve = float(max(E_corrige / 1000, 0))
+    total_vol = Vc + Vg + Ve
+    if total_vol > 1.0:
+        Vc, Vg, Ve = Vc / total_vol, Vg / total_vol, Ve / total_vol
+    p = np.array([proportions.get(nom, 0.0) for nom in granulats], dtype=float)
+    return (Vc, Vg, Ve), dict(zip(granulats, np.maximum(Vg * p / 100, 0).tolist()))
+
+def _etape_masses(volumes, Copt, E_corrige, rho_granulats):
+    noms = list(volumes[1])
+    V = np.fromiter(volumes[1].values(), dtype=float, count=len(noms))
+    rho = np.array([rho_granulats[nom] for nom in noms], dtype=float)
+    return {"ciment": float(max(Copt, 0)), "eau": float(max(E_corrige, 0)),
+            **dict(zip(noms, np.maximum(V * rho, 0).tolist()))}
+
+def _etape_warnings(affaissement_cm, rapport_CE, Copt, volumes, melange, rho_granulats):
+    Vc, Vg, Ve = volumes[0]
+    proportions = melange[2]
+    warnings = []
+    if not (0 <= affaissement_cm <= 12):
+        warnings.append("❌ Affaissement hors plage 0-12 cm")
+    if not (0.9 <= rapport_CE[1] <= 2.7):
+        warnings.append("❌ Rapport C/E hors plage 0.9-2.7")
+    if Copt > 400:
+        warnings.append("⚠️ Copt > 400 kg/m³ : adjuvant nécessaire")
+    if Copt < 200:
+        warnings.append("⚠️ Copt très faible")
+    if Vc <= 0 or Vg <= 0 or Ve <= 0:
+        warnings.append("⚠️ Volume(s) nul(s) ou négatif(s)")
+    if abs((Vc + Vg + Ve) - 1.0) > 0.01:
+        warnings.append(f"⚠️ Somme volumes = {(Vc + Vg + Ve)*1000:.1f} l")
+    if abs(sum(proportions.values()) - 100) > 1:
+        warnings.append(f"⚠️ Somme proportions = {sum(proportions.values()):.1f}%")
+    for nom, rho in rho_granulats.items():
+        if "sable" in nom.lower() and not (2400 <= rho <= 2800):
+            warnings.append(f"⚠️ ρ {nom} = {rho} kg/m³")
+        elif "gravier" in nom.lower() and not (2500 <= rho <= 2700):
+            warnings.append(f"⚠️ ρ {nom} = {rho} kg/m³")
+    return warnings
+
+def _etape_resultat(Dmax, mfs, rapport_CE, Copt, coefficients_K, courbe, melange, gamma, E_corrige,
+                    volumes, masses, warnings, granulats, diams):
+    lignes, inters, proportions, graphique, messages = melange
+    (Vc, Vg, Ve), V_granulats = volumes
+    V = np.fromiter(V_granulats.values(), dtype=float, count=len(V_granulats)) * 1000
+    volumes = {"ciment": Vc * 1000, "granulats": Vg * 1000, "eau": Ve * 1000,
+               **dict(zip(V_granulats, V.tolist()))}
+    return ResultatDreux(
+        Dmax=Dmax, mfs=mfs, fcm=rapport_CE[0], rapport_CE=rapport_CE[1], Copt=Copt,
+        dosage_standard=coefficients_K[0], coefficients_K=coefficients_K[1], proportions=proportions,
+        gamma=float(gamma[0]), E_corrige=float(E_corrige), volumes=volumes, masses=masses,
+        warnings=warnings, messages=messages + gamma[1],
+        donnees_graphique={"granulats": granulats, "diams": diams, "courbe": courbe,
+                           "lignes": lignes, "inters": inters, "proportions": proportions, **graphique},
+    )
+
+# étape : (dépendances (entrées ou étapes), fonction des dépendances dans cet ordre)
+ETAPES_DREUX = {
+    "Dmax": (("diams", "granulats"), _etape_Dmax),
+    "mfs_calcule": (("granulats", "diams", "mfs"), _etape_mfs),
+    "rapport_CE": (("fc28", "denomination_ciment", "qualite_granulats", "Dmax"), _etape_rapport_CE),
+    "Copt": (("rapport_CE", "affaissement_cm", "calibration_Copt"), _etape_Copt),
+    "coefficients_K": (("Copt", "type_sable", "vibration", "mfs_calcule", "pompabilite"), _etape_coefficients_K),
+    "points": (("granulats", "diams"), _etape_points),
+    "courbe": (("Dmax", "coefficients_K"), _etape_courbe),
+    "melange": (("points", "courbe", "granulats", "diams", "Dmax", "coefficients_K", "cible_melange"), _etape_melange),
+    "E_corrige": (("Copt", "rapport_CE", "Dmax"), _etape_E_corrige),
+    "gamma": (("affaissement_cm", "Dmax", "type_sable", "type_gravier"), _etape_gamma),
+    "volumes": (("Copt", "gamma", "E_corrige", "melange", "granulats"), _etape_volumes),
+    "masses": (("volumes", "Copt", "E_corrige", "rho_granulats"), _etape_masses),
+    "warnings": (("affaissement_cm", "rapport_CE", "Copt", "volumes", "melange", "rho_granulats"), _etape_warnings),
+    "resultat": (("Dmax", "mfs_calcule", "rapport_CE", "Copt", "coefficients_K", "courbe", "melange", "gamma",
+                  "E_corrige", "volumes", "masses", "warnings", "granulats", "diams"), _etape_resultat),
+}
+
+def _etapes_aval():
+    """{entrée ou étape : étapes qui en dépendent, directement ou non}."""
+    aval = {nom: set() for nom in (*ENTREES_DREUX, *ETAPES_DREUX)}
+    for etape, (dependances, _) in ETAPES_DREUX.items():
+        for dependance in dependances:
+            aval[dependance].add(etape)
+    def fermeture(nom):
+        return set().union(*({e} | fermeture(e) for e in aval[nom])) if aval[nom] else set()
+    return {nom: frozenset(fermeture(nom)) for nom in aval}
+
+AVAL_DREUX = _etapes_aval()
+
+def _identiques(a, b):
+    if hasattr(a, "cle") and hasattr(b, "cle"):  # tables de calibration relues à chaque exécution
+        return a.cle == b.cle
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return a is b
+
+class GrapheDreux:
+    """
+    Calcul Dreux-Gorisse incrémental pour les essais « et si… » : mêmes entrées que
+    `calculer_dreux`, étapes évaluées à la demande et gardées en cache. `modifier`
+    n'invalide que les étapes en aval des entrées réellement changées (ρ → masses ;
+    affaissement → Copt, K′, courbe, gamma… mais pas les points 95 % / 5 %).
+
+        graphe = GrapheDreux(diams=..., granulats=..., ...)
+        res = graphe.resultat()
+        res = graphe.modifier(affaissement_cm=10).resultat()   # graphe.recalculees : étapes refaites
+    """
+
+    def __init__(self, **entrees):
+        self._valeurs = {}
+        self.recalculees = []
+        manquantes = set(ENTREES_DREUX) - set(DEFAUTS_DREUX) - set(entrees)
+        if manquantes:
+            raise TypeError(f"Entrées manquantes : {', '.join(sorted(manquantes))}")
+        self.modifier(**{**DEFAUTS_DREUX, **entrees})
+
+    def modifier(self, **entrees):
+        inconnues = set(entrees) - set(ENTREES_DREUX)
+        if inconnues:
+            raise TypeError(f"Entrées inconnues : {', '.join(sorted(inconnues))}")
+        for nom, valeur in entrees.items():
+            if nom in self._valeurs and _identiques(self._valeurs[nom], valeur):
+                continue
+            self._valeurs[nom] = valeur
+            for etape in AVAL_DREUX[nom]:
+                self._valeurs.pop(etape, None)
+        return self
+
+    def __getitem__(self, nom):
+        if nom not in self._valeurs:
+            dependances, fonction = ETAPES_DREUX[nom]
+            self._valeurs[nom] = fonction(*(self[d] for d in dependances))
+            self.recalculees.append(nom)
+        return self._valeurs[nom]
+
+    def resultat(self):
+        """ResultatDreux à jour ; `recalculees` liste les étapes refaites pour l'obtenir."""
+        self.recalculees = []
+        return self["resultat"]
+
+# ============================================
+# CALCUL PAR LOTS (échantillons × granulats × tamis)
+# ============================================
+
+def _par_valeur(fonction, *colonnes):
+    """Applique `fonction` une fois par combinaison distincte des colonnes (catégories, chaînes)."""
+    cache = {}
+    return np.array([cache[cle] if cle in cache else cache.setdefault(cle, fonction(*cle))
+                     for cle in zip(*colonnes)])
+
+def interpoler_lot(passants, diams, cible):
+    """
+    Version vectorisée d'`interpoler` : passants (… × T, NaN = tamis non mesuré).
+    Retourne le diamètre où le passant vaut `cible`, la valeur de passant utilisée
+    et un statut (0 exact, 1 remplacé par la valeur la plus proche à ±10 %,
+    2 introuvable, 3 aucune mesure), chacun de forme (…).
+    """
+    v = np.asarray(passants, dtype=float)
+    d = np.broadcast_to(np.asarray(diams, dtype=float), v.shape)
+    ordre = np.argsort(v, axis=-1, kind="stable")          # NaN en dernier
+    xp = np.take_along_axis(v, ordre, axis=-1)
+    fp = np.take_along_axis(d, ordre, axis=-1)
+    n = np.sum(~np.isnan(v), axis=-1)
+    dernier = np.maximum(n - 1, 0)[..., None]
+    v_min = xp[..., 0]
+    v_max = np.take_along_axis(xp, dernier, axis=-1)[..., 0]
+
+    c = np.clip(np.full(v.shape[:-1], float(cible)), v_min, v_max)
+    statut = np.where(n == 0, 3, np.where(c != cible, np.where(np.abs(c - cible) <= 10, 1, 2), 0))
+
+    # Même convention que np.interp : xp[j] ≤ c < xp[j+1], valeur finale si c = max
+    j = np.clip(np.sum(xp <= c[..., None], axis=-1) - 1, 0, dernier[..., 0])
+    j1 = np.minimum(j + 1, dernier[..., 0])
+    x0, x1 = (np.take_along_axis(xp, k[..., None], axis=-1)[..., 0] for k in (j, j1))
+    f0, f1 = (np.take_along_axis(fp, k[..., None], axis=-1)[..., 0] for k in (j, j1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        diametre = np.where(j == dernier[..., 0], f0, (f1 - f0) / (x1 - x0) * (c - x0) + f0)
+    valide = statut < 2
+    return np.where(valide, diametre, np.nan), np.where(valide, c, np.nan), statut
+
+def calculer_dreux_lot(diams, passants, fc28, denomination_ciment, affaissement_cm,
+                       type_sable, type_gravier, rho_granulats, vibration="normale",
+                       pompabilite="non", qualite_granulats="Bonne", mfs=None,
+                       noms_granulats=None, noms_echantillons=None, calibration_Copt=None, cible_melange=None,
+                       tableau=True):
+    """
+    Dreux-Gorisse pour S échantillons à la fois.
+
+    `passants` : tableau S × A × T (% passants, NaN = tamis non mesuré), granulats du
+    plus fin au plus gros. Les paramètres (fc28, ciment, affaissement, types, vibration,
+    pompabilité, qualité, Mf) sont scalaires ou de taille S ; `rho_granulats` est de
+    forme A ou S × A. Sans `mfs`, le module de finesse est calculé sur le granulat dont
+    le nom contient « sable » (le premier à défaut). `cible_melange` : voir `calculer_dreux`.
+
+    Retourne un DataFrame (une ligne par échantillon : D10/D50/D90 de chaque granulat,
+    point A de la courbe OAB et γ compris) ou, avec `tableau=False`, le dict
+    des tableaux numpy intermédiaires. Chaque ligne est identique au résultat de
+    `calculer_dreux` sur l'échantillon correspondant.
+    """
+    passants = np.asarray(passants, dtype=float)
+    S, A, T = passants.shape
+    diams_arr = np.asarray(diams, dtype=float)
+    noms = list(noms_granulats or ["Sable", *[f"Gravier {i}" for i in range(1, A)]])
+    echantillons = list(noms_echantillons if noms_echantillons is not None else range(1, S + 1))
+    num = lambda x: np.broadcast_to(np.asarray(x, dtype=float), (S,))
+    cat = lambda x: np.broadcast_to(np.asarray(x, dtype=object), (S,))
+    fc28, affaissement_cm = num(fc28), num(affaissement_cm)
+    ciment, type_sable, type_gravier = cat(denomination_ciment), cat(type_sable), cat(type_gravier)
+    vibration, pompabilite, qualite = cat(vibration), cat(pompabilite), cat(qualite_granulats)
+    rho = np.broadcast_to(np.asarray(rho_granulats, dtype=float), (S, A))
+
+    # Dmax et module de finesse
+    mesure = ~np.isnan(passants)
+    Dmax = np.max(np.where(mesure.any(axis=1), diams_arr, -np.inf), axis=-1)
+    if mfs is None:
+        mfs = module_finesse(passants[:, noms.index(nom_sable(noms))], diams_arr)
+    mfs = num(mfs)
+    D = valeurs_D(passants, diams_arr)  # S × A × (D10, D50, D90)
+
+    # C/E, Copt, K'
+    fcm = fc28 * 1.15
+    sigma_c28 = _par_valeur(classe_vraie_ciment, ciment).astype(float)
+    G = _par_valeur(determiner_G, Dmax, qualite).astype(float)
+    rapport_CE = fcm / (G * sigma_c28) + G
+    Copt = copt_lot(rapport_CE, affaissement_cm, calibration_Copt)
+    dosage = np.select([Copt >= 400, Copt >= 350, Copt >= 300, Copt >= 250, Copt >= 200],
+                       ["400+fluid", "400", "350", "300", "250"], "200")
+    K = _par_valeur(lambda v, f, d: TABLEAU_K[v][f][d], vibration, type_sable, dosage).astype(float)
+    Ks = 6 * mfs - 15
+    Kp = _par_valeur(KP_POMPABILITE.get, pompabilite).astype(float)
+    Kprime = K + Ks + Kp
+
+    # Point de brisure A de la courbe de référence OAB
+    XA = np.where(Dmax <= 20, Dmax / 2, (np.log10(Dmax) + 38) / 2)
+    YA = 50 - np.sqrt(Dmax) + Kprime
+
+    if cible_melange is None:
+        # Courbe OAB et croisements avec les droites des paires de granulats
+        courbe_x = np.stack([np.full(S, 0.08), XA, Dmax], axis=-1)
+        courbe_y = np.stack([np.zeros(S), YA, np.full(S, 100.0)], axis=-1)
+        d1, p1, statut1 = interpoler_lot(passants[:, :-1], diams_arr, 95)
+        d2, p2, statut2 = interpoler_lot(passants[:, 1:], diams_arr, 5)
+        paire_valide = (statut1 < 2) & (statut2 < 2) & (d1 != d2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            a = (p2 - p1) / (np.log10(d2) - np.log10(d1))
+            b = p1 - a * np.log10(d1)
+            xC = intersections_OAB(a, b, np.log10(np.minimum(d1, d2)), np.log10(np.maximum(d1, d2)),
+                                   courbe_x[:, None, :], courbe_y[:, None, :])
+        yC = np.where(paire_valide, a * xC + b, np.nan)
+
+        # Proportions : projections valides tassées à gauche (même convention que calcul_proportions)
+        k = paire_valide.sum(axis=-1)
+        projections = np.take_along_axis(yC, np.argsort(~paire_valide, axis=-1, kind="stable"), axis=-1)
+        cumul = np.concatenate([projections, np.full((S, 1), np.nan)], axis=-1)
+        cumul[np.arange(S), k] = 100.0
+        proportions = np.diff(np.concatenate([np.zeros((S, 1)), cumul], axis=-1), axis=-1)
+        proportions = np.where((np.arange(A) <= k[:, None]) & (k[:, None] > 0), proportions, 0.0)
+        proportions = np.nan_to_num(proportions)
+    else:
+        cible = courbe_cible(diams_arr, Dmax, cible_melange, Kprime)
+        proportions, _, ecart_melange = melange_moindres_carres(completer_courbes(passants, diams_arr), cible)
+
+    # Eau, gamma, volumes et masses
+    E_corrige = Copt / rapport_CE * (1 + get_correction_Dmax(Dmax) / 100)
+    ouvrabilite = _par_valeur(lambda s: "|".join(evaluer_ouvrabilite(s)), affaissement_cm)
+    gamma = np.empty(S)
+    for combinaison in np.unique(ouvrabilite):
+        sel = ouvrabilite == combinaison
+        gamma[sel] = interpoler_gamma(*combinaison.split("|"), Dmax[sel])
+    gamma += _par_valeur(correction_gamma, type_sable, type_gravier).astype(float)
+
+    Vc = np.maximum(Copt / RHO_CIMENT, 0)
+    Vg = np.maximum(gamma - Vc, 0)
+    Ve = np.maximum(E_corrige / 1000, 0)
+    total = Vc + Vg + Ve
+    echelle = np.where(total > 1.0, 1.0 / total, 1.0)
+    Vc, Vg, Ve = Vc * echelle, Vg * echelle, Ve * echelle
+    V_granulats = np.maximum(Vg[:, None] * proportions / 100, 0)
+    M_granulats = np.maximum(V_granulats * rho, 0)
+
+    # Contrôles et journal (mêmes libellés que calculer_dreux)
+    controles = [
+        (~((0 <= affaissement_cm) & (affaissement_cm <= 12)), lambda i: "❌ Affaissement hors plage 0-12 cm"),
+        (~((0.9 <= rapport_CE) & (rapport_CE <= 2.7)), lambda i: "❌ Rapport C/E hors plage 0.9-2.7"),
+        (Copt > 400, lambda i: "⚠️ Copt > 400 kg/m³ : adjuvant nécessaire"),
+        (Copt < 200, lambda i: "⚠️ Copt très faible"),
+        ((Vc <= 0) | (Vg <= 0) | (Ve <= 0), lambda i: "⚠️ Volume(s) nul(s) ou négatif(s)"),
+        (np.abs((Vc + Vg + Ve) - 1.0) > 0.01, lambda i: f"⚠️ Somme volumes = {(Vc[i] + Vg[i] + Ve[i])*1000:.1f} l"),
+        (np.abs(proportions.sum(axis=-1) - 100) > 1, lambda i: f"⚠️ Somme proportions = {proportions[i].sum():.1f}%"),
+    ]
+    for j, nom in enumerate(noms):
+        if "sable" in nom.lower():
+            controles.append((~((2400 <= rho[:, j]) & (rho[:, j] <= 2800)), lambda i, j=j, nom=nom: f"⚠️ ρ {nom} = {rho[i, j]} kg/m³"))
+        elif "gravier" in nom.lower():
+            controles.append((~((2500 <= rho[:, j]) & (rho[:, j] <= 2700)), lambda i, j=j, nom=nom: f"⚠️ ρ {nom} = {rho[i, j]} kg/m³"))
+    warnings = [[message(i) for masque, message in controles if masque[i]] for i in range(S)]
+
+    def journal(i):
+        if cible_melange is not None:
+            return f"📐 Mélange par moindres carrés ({cible_melange}) : écart moyen {ecart_melange[i]:.2f} %"
+        lignes = []
+        for j in range(A - 1):
+            for statut, valeur, cible, nom in ((statut1, p1, 95, noms[j]), (statut2, p2, 5, noms[j + 1])):
+                if statut[i, j] == 1:
+                    lignes.append(f"🔄 Point {cible}% remplacé par {valeur[i, j]}% pour '{nom}'")
+                elif statut[i, j] == 2:
+                    lignes.append(f"⚠️ Point {cible}% introuvable pour '{nom}'")
+        return " / ".join(lignes)
+
+    resultats = {
+        "Dmax": Dmax, "mfs": mfs, "valeurs_D": D, "rapport_CE": rapport_CE, "Copt": Copt, "dosage_standard": dosage,
+        "K": K, "Ks": Ks, "Kp": Kp, "Kprime": Kprime, "XA": XA, "YA": YA, "proportions": proportions, "gamma": gamma,
+        "E_corrige": E_corrige, "Vc": Vc * 1000, "Vg": Vg * 1000, "Ve": Ve * 1000,
+        "V_granulats": V_granulats * 1000, "M_granulats": M_granulats,
+        "warnings": warnings, "messages": [journal(i) for i in range(S)], "noms": noms,
+    }
+    if not tableau:
+        return resultats
+
+    colonnes = {
+        "Échantillon": echantillons, "Dmax (mm)": Dmax, "Mf": mfs,
+        **{f"D{x} {nom} (mm)": D[:, j, k] for j, nom in enumerate(noms) for k, x in enumerate((10, 50, 90))},
+        "C/E": rapport_CE,
+        "Copt (kg/m³)": Copt, "K": K, "Ks": Ks, "Kp": Kp, "K′": Kprime, "X_A (mm)": XA, "Y_A (%)": YA,
+        **{f"Proportion {nom} (%)": proportions[:, j] for j, nom in enumerate(noms)}, "γ": gamma,
+        "Volume ciment (l)": Vc * 1000, "Volume granulats (l)": Vg * 1000, "Volume eau (l)": Ve * 1000,
+        **{f"Volume {nom} (l)": V_granulats[:, j] * 1000 for j, nom in enumerate(noms)},
+        "Masse ciment (kg)": np.maximum(Copt, 0), "Masse eau (kg)": np.maximum(E_corrige, 0),
+        **{f"Masse {nom} (kg)": M_granulats[:, j] for j, nom in enumerate(noms)},
+        "Avertissements": [" / ".join(w) if w else "✅ OK" for w in warnings],
+        "Messages": resultats["messages"],
+    }
+    return pd.DataFrame(colonnes)
+
+# ============================================
+# MATRICE DE SCÉNARIOS (« ET SI… »)
+# ============================================
+
+AFFAISSEMENTS_SCENARIOS = (2.0, 4.0, 6.0, 8.0, 10.0, 12.0)  # cm
+FORMES_GRANULATS = ("roulé", "concassé")
+VIBRATIONS = ("faible", "normale", "puissante")
+
+def matrice_scenarios(diams, granulats, fc28, denomination_ciment, rho_granulats,
+                      affaissements=AFFAISSEMENTS_SCENARIOS, vibrations=VIBRATIONS,
+                      pompabilites=tuple(KP_POMPABILITE), formes_sable=FORMES_GRANULATS,
+                      formes_gravier=FORMES_GRANULATS, **parametres):
+    """
+    Produit cartésien vibration × pompabilité × forme du sable × forme du gravier ×
+    affaissement pour une même granulométrie, calculé en un seul appel à `calculer_dreux_lot`.
+
+    Mêmes entrées que `calculer_dreux` (`granulats` {nom: passants}, `rho_granulats`
+    {nom: kg/m³}, autres paramètres en mots-clés), chaque axe étant une liste de valeurs
+    (une seule valeur pour le figer). Retourne un tableau de comparaison : une ligne
+    par scénario (colonnes des axes puis résultats de `calculer_dreux_lot`), chaque ligne
+    identique au calcul unitaire correspondant.
+    """
+    noms = list(granulats)
+    axes = {"Vibration": list(vibrations), "Pompabilité": list(pompabilites),
+            "Forme sable": list(formes_sable), "Forme gravier": list(formes_gravier),
+            "Affaissement (cm)": [float(a) for a in affaissements]}
+    grille = np.meshgrid(*(np.arange(len(v)) for v in axes.values()), indexing="ij")
+    scenarios = {axe: np.array(valeurs, dtype=object)[g.ravel()] for (axe, valeurs), g in zip(axes.items(), grille)}
+    S = grille[0].size
+
+    base = np.array([[np.nan if v is None else v for v in granulats[nom]] for nom in noms], dtype=float)
+    resultats = calculer_dreux_lot(
+        diams, np.broadcast_to(base, (S,) + base.shape), fc28, denomination_ciment,
+        scenarios["Affaissement (cm)"].astype(float), scenarios["Forme sable"], scenarios["Forme gravier"],
+        np.array([rho_granulats[nom] for nom in noms], dtype=float),
+        vibration=scenarios["Vibration"], pompabilite=scenarios["Pompabilité"],
+        noms_granulats=noms, **parametres)
+    return pd.concat([pd.DataFrame(scenarios), resultats.drop(columns="Échantillon")], axis=1)
+
+# ============================================
+# INCERTITUDES (MONTE CARLO)
+# ============================================
+
+SIGMA_PASSANT = 1.0   # écart-type de lecture d'un tamis (points de %)
+SIGMA_RHO = 0.01      # écart-type relatif des masses volumiques
+
+def incertitude_dreux(diams, granulats, fc28, denomination_ciment, affaissement_cm,
+                      type_sable, type_gravier, rho_granulats, n=10000, sigma_passant=SIGMA_PASSANT,
+                      sigma_rho=SIGMA_RHO, niveau=0.95, seed=None, **parametres):
+    """
+    Propagation Monte Carlo des erreurs de mesure à travers toute la chaîne Dreux-Gorisse.
+
+    Les passants mesurés reçoivent un bruit normal (écart-type `sigma_passant`, en points,
+    borné à [0, 100]) et les masses volumiques un bruit relatif `sigma_rho` ; les `n`
+    tirages sont calculés en un seul appel à `calculer_dreux_lot` (Mf recalculé sur le
+    sable bruité sauf si `mfs` est imposé). Mêmes entrées que `calculer_dreux`.
+
+    Retourne {"nominal": ResultatDreux, "tableau": DataFrame (nominal, moyenne, écart-type
+    et intervalle de confiance au `niveau` par grandeur), "tirages": dict de tableaux}.
+    """
+    rng = np.random.default_rng(seed)
+    noms = list(granulats)
+    nominal = calculer_dreux(diams, granulats, fc28, denomination_ciment, affaissement_cm,
+                             type_sable, type_gravier, rho_granulats, **parametres)
+
+    base = np.array([[np.nan if v is None else v for v in g] for g in granulats.values()], dtype=float)
+    passants = np.clip(base + sigma_passant * rng.standard_normal((n,) + base.shape), 0, 100)
+    rho = np.array([rho_granulats[nom] for nom in noms], dtype=float)
+    rho = rho * (1 + sigma_rho * rng.standard_normal((n, len(noms))))
+    tirages = calculer_dreux_lot(diams, passants, fc28, denomination_ciment, affaissement_cm,
+                                 type_sable, type_gravier, rho, noms_granulats=noms, tableau=False, **parametres)
+
+    grandeurs = {
+        "Mf": (nominal.mfs, tirages["mfs"]),
+        "K′": (nominal.coefficients_K["Kprime"], tirages["Kprime"]),
+        **{f"Proportion {nom} (%)": (nominal.proportions.get(nom, 0.0), tirages["proportions"][:, j])
+           for j, nom in enumerate(noms)},
+        "Gamma": (nominal.gamma, tirages["gamma"]),
+        "Volume granulats (l)": (nominal.volumes["granulats"], tirages["Vg"]),
+        **{f"Masse {nom} (kg)": (nominal.masses[nom], tirages["M_granulats"][:, j]) for j, nom in enumerate(noms)},
+    }
+    alpha = (1 - niveau) / 2
+    valeurs = np.array([np.broadcast_to(v, (n,)) for _, v in grandeurs.values()])
+    bas, haut = np.quantile(valeurs, [alpha, 1 - alpha], axis=1)
+    tableau = pd.DataFrame({
+        "Grandeur": list(grandeurs),
+        "Nominal": [float(v) for v, _ in grandeurs.values()],
+        "Moyenne": valeurs.mean(axis=1),
+        "Écart-type": valeurs.std(axis=1),
+        f"IC {niveau:.0%} bas": bas,
+        f"IC {niveau:.0%} haut": haut,
+    })
+    return {"nominal": nominal, "tableau": tableau, "tirages": tirages}
+
+# ============================================
+# VERSION CONSOLE
+# ============================================
+
 def main():
     # ============================================
     # PHASE 1 : COLLECTE DE TOUTES LES ENTREES
@@ -20,7 +712,8 @@ def main():
     diams = choisir_diametres()
     granulats = saisir_granulats(diams)
     mf_auto = detecter_module_finesse(granulats, diams)
-    Dmax = max(d for g in granulats.values() for d,v in zip(diams, g) if v is not None)
+    if mf_auto is not None:
+        print(f"✅ Module de finesse (détecté sur '{nom_sable(granulats)}') : Mf = {mf_auto:.2f}")
     
     # 1.2 Paramètres béton
     print("\n🧱 CARACTÉRISTIQUES DU BÉTON")
@@ -65,176 +758,46 @@ def main():
     # 1.5 Paramètres méthode Dreux
     print("\n⚙ PARAMÈTRES MÉTHODE DREUX-GORISSE")
     forme, vibration, mfs, kp = demander_parametres_Kprime(mfs_auto=mf_auto, forme_defaut=type_sable)
+    pompabilite = {v: k for k, v in KP_POMPABILITE.items()}[kp]
     
     # ============================================
     # PHASE 2 : CALCULS
     # ============================================
     
-    # 2.1 Calcul préliminaire
-    fcm = fc28 * 1.15
-    sigma_c28 = classe_vraie_ciment(denomination_ciment)
-    G = determiner_G(Dmax, qualite_granulats)
-    rapport_CE = fcm / (G * sigma_c28) + G
-    
-    # Interpolation RBF pour Copt
-    points = np.array([[1.6, 8], [2.0, 10], [2.4, 2]])
-    copt_values = np.array([327.27, 427.27, 425.00])
-    rbf_model = RBFInterpolator(points, copt_values, kernel='thin_plate_spline')
-    Copt = float(rbf_model([[rapport_CE, affaissement_cm]])[0])
-    
-    # 2.2 Calcul K'
-    dosage_standard = determiner_dosage_standard(Copt)
-    Kp = calcul_Kprime(forme, vibration, dosage_standard, mfs, kp)
-    
-    # 2.3 Suite des calculs
-    courbe = courbe_reference(Dmax, Kp)
-    lignes, inters, proportions = calcul_proportions(granulats, diams, courbe)
-    
-    # Calcul des proportions
-    n_granulats = len(granulats)
-    p_sable_vol = proportions[list(proportions.keys())[0]]/100
-    p_g1_vol = proportions[list(proportions.keys())[1]]/100
-    p_g2_vol = proportions[list(proportions.keys())[2]]/100 if n_granulats > 2 else 0.0
-    p_g3_vol = proportions[list(proportions.keys())[3]]/100 if n_granulats > 3 else 0.0
-    
-    # Calculs eau corrigée
-    correction_pct = get_correction_Dmax(Dmax)
-    E = Copt / rapport_CE
-    E_corrige = E * (1 + correction_pct / 100)
-    
-    # Plasticité/serrage
-    plasticite, serrage = evaluer_ouvrabilite(affaissement_cm)
-    
-    # Calcul gamma
-    gamma_brut = interpoler_gamma(plasticite, serrage, Dmax)
-    gamma_corrige = gamma_brut + correction_gamma(type_sable, type_gravier)
-    
-    # ============================================
-    # CALCULS VOLUMES ET MASSES
-    # ============================================
-    
-    rho_ciment = 3100  # kg/m³
-    
-    # Volumes de base
-    Vc = max(Copt / rho_ciment, 0)
-    Vg = max(gamma_corrige - Vc, 0)
-    Ve = max(E_corrige / 1000, 0)
-    
-    # Ajustement volume total
-    total_vol = Vc + Vg + Ve
-    if total_vol > 1.0:
-        ratio = 1.0 / total_vol
-        Vc *= ratio
-        Vg *= ratio
-        Ve *= ratio
-    
-    # Conversion en litres
-    Vc_l = Vc * 1000
-    Vg_l = Vg * 1000
-    Ve_l = Ve * 1000
-    
-    # Volumes spécifiques
-    Vs = max(Vg * p_sable_vol, 0)
-    Vg1 = max(Vg * p_g1_vol, 0)
-    Vg2 = max(Vg * p_g2_vol, 0) if n_granulats > 2 else 0.0
-    Vg3 = max(Vg * p_g3_vol, 0) if n_granulats > 3 else 0.0
-    
-    # Conversion en litres
-    Vs_l = Vs * 1000
-    Vg1_l = Vg1 * 1000
-    Vg2_l = Vg2 * 1000 if n_granulats > 2 else 0.0
-    Vg3_l = Vg3 * 1000 if n_granulats > 3 else 0.0
-    
-    # Masses
-    Ms = max(Vs * rho_granulats[list(granulats.keys())[0]], 0)
-    Mg1 = max(Vg1 * rho_granulats[list(granulats.keys())[1]], 0)
-    Mg2 = max(Vg2 * rho_granulats[list(granulats.keys())[2]], 0) if n_granulats > 2 else 0.0
-    Mg3 = max(Vg3 * rho_granulats[list(granulats.keys())[3]], 0) if n_granulats > 3 else 0.0
-    Mc = max(Copt, 0)
-    Me = max(E_corrige, 0)
-    
-    # Contrôles
-    warnings = []
-    if not (0 <= affaissement_cm <= 12):
-        warnings.append("❌ Affaissement hors plage 0-12 cm")
-    if not (0.9 <= rapport_CE <= 2.7):
-        warnings.append("❌ Rapport C/E hors plage 0.9-2.7")
-    if Copt > 400:
-        warnings.append("⚠️ Copt > 400 kg/m³ : adjuvant nécessaire")
-    if Copt < 200:
-        warnings.append("⚠️ Copt très faible")
-    
-    if Vc <= 0 or Vg <= 0 or Ve <= 0:
-        warnings.append("⚠️ Volume(s) nul(s) ou négatif(s)")
-    
-    if abs((Vc + Vg + Ve) - 1.0) > 0.01:
-        warnings.append(f"⚠️ Somme volumes = {(Vc + Vg + Ve)*1000:.1f} l")
-    
-    if abs(sum(proportions.values()) - 100) > 1:
-        warnings.append(f"⚠️ Somme proportions = {sum(proportions.values()):.1f}%")
-    
-    for nom, rho in rho_granulats.items():
-        if "sable" in nom.lower() and not (2400 <= rho <= 2800):
-            warnings.append(f"⚠️ ρ {nom} = {rho} kg/m³")
-        elif "gravier" in nom.lower() and not (2500 <= rho <= 2700):
-            warnings.append(f"⚠️ ρ {nom} = {rho} kg/m³")
+    res = calculer_dreux(diams, granulats, fc28, denomination_ciment, affaissement_cm,
+                         type_sable, type_gravier, rho_granulats, vibration=vibration,
+                         pompabilite=pompabilite, qualite_granulats=qualite_granulats, mfs=mfs)
     
     # ============================================
     # PHASE 3 : RESULTATS
     # ============================================
     
+    for message in res.messages:
+        print(message)
+    k = res.coefficients_K
+    print(f"Coefficients : K={k['K']}, Ks={k['Ks']:.2f}, Kp={k['Kp']} → K'={k['Kprime']:.2f}")
+    
     print("\n📊 PROPORTIONS CALCULÉES :")
-    for nom, pr in proportions.items():
+    for nom, pr in res.proportions.items():
         print(f"- {nom} : {pr:.1f}%")
     
     print("\n🔍 SYNTHÈSE DES PARAMÈTRES :")
     print(f"- Forme : Sable={type_sable}, Gravier={type_gravier}")
-    print(f"- Copt : {Copt:.1f} kg/m³")
-    print(f"- Catégorie K' : {dosage_standard}")
-    print(f"- K' final : {Kp:.2f}")
+    print(f"- Copt : {res.Copt:.1f} kg/m³")
+    print(f"- Catégorie K' : {res.dosage_standard}")
+    print(f"- K' final : {k['Kprime']:.2f}")
     print("\n📏 MASSE VOLUMIQUE UTILISÉE :")
     for nom, rho in rho_granulats.items():
         print(f"- {nom} : {rho:.0f} kg/m³")
     
-    # Préparation des résultats
-    resultats = {
-        "Description": [
-            "Volume ciment (l)", "Volume granulats (l)", "Volume eau (l)",
-            f"Volume {list(granulats.keys())[0]} (l)",
-            f"Volume {list(granulats.keys())[1]} (l)",
-            f"Volume {list(granulats.keys())[2]} (l)" if n_granulats > 2 else None,
-            f"Volume {list(granulats.keys())[3]} (l)" if n_granulats > 3 else None,
-            "Masse ciment (kg)", "Masse eau (kg)",
-            f"Masse {list(granulats.keys())[0]} (kg)",
-            f"Masse {list(granulats.keys())[1]} (kg)",
-            f"Masse {list(granulats.keys())[2]} (kg)" if n_granulats > 2 else None,
-            f"Masse {list(granulats.keys())[3]} (kg)" if n_granulats > 3 else None,
-            "Avertissements"
-        ],
-        "Valeur": [
-            round(Vc_l, 1), round(Vg_l, 1), round(Ve_l, 1),
-            round(Vs_l, 1), round(Vg1_l, 1),
-            round(Vg2_l, 1) if n_granulats > 2 else None,
-            round(Vg3_l, 1) if n_granulats > 3 else None,
-            round(Mc, 1), round(Me, 1),
-            round(Ms, 1), round(Mg1, 1),
-            round(Mg2, 1) if n_granulats > 2 else None,
-            round(Mg3, 1) if n_granulats > 3 else None,
-            " / ".join(warnings) if warnings else "✅ OK"
-        ]
-    }
-    
-    # Nettoyage des valeurs None
-    resultats["Description"] = [x for x in resultats["Description"] if x is not None]
-    resultats["Valeur"] = [x for x in resultats["Valeur"] if x is not None]
-    
-    df = pd.DataFrame(resultats)
-    
     print("\n📊 RÉSULTATS FINAUX :")
-    print(df.to_string(index=False))
+    print(res.tableau().to_string(index=False))
     
     # Visualisation
-    tracer(granulats, diams, courbe, lignes, inters, proportions)
+    fig, ax = plt.subplots(figsize=(10, 7))
+    tracer(**res.donnees_graphique, ax=ax)
+    plt.show()
+    plt.close(fig)
 
 # ============================================
 # FONCTIONS AUXILIAIRES
@@ -275,17 +838,14 @@ def choisir_diametres():
     print("2 - 🇪🇺 EN 933-2 (EN 12620)")
     print("3 - ✅ Tous les tamis disponibles")
     choix = input("Votre choix (1/2/3) : ").strip()
-    if choix == "1":
-        return [0.08, 0.16, 0.32, 0.63, 1.25, 2.5, 5.0, 6.3, 8, 10, 12.5, 16, 20, 25, 31.5]
-    elif choix == "2":
-        return [0.125, 0.25, 0.5, 1, 2, 4, 6.3, 8, 10, 12.5, 16, 20, 25, 31.5, 63]
-    else:
-        return [63, 50, 40, 31.5, 25, 20, 16, 12.5, 10, 8, 6.3, 5, 4, 2.5, 2, 1.25, 1,
-                0.63, 0.5, 0.315, 0.25, 0.16, 0.125, 0.08, 0.063]
+    serie = {"1": "NF P18-540", "2": "EN 933-2"}.get(choix, "Complète")
+    return list(SERIES_TAMIS[serie])
 
 def saisir_granulats(diams):
     granulats = {}
-    n = int(input("Nombre de granulats (2 à 4) : "))
+    n = int(input(f"Nombre de granulats (2 à {MAX_GRANULATS}) : "))
+    while not 2 <= n <= MAX_GRANULATS:
+        n = int(input(f"Entrez un nombre entre 2 et {MAX_GRANULATS} : "))
     for i in range(n):
         nom = input(f"Nom granulat {i+1} : ") or f"Granulat_{i+1}"
         refus = []
@@ -295,84 +855,137 @@ def saisir_granulats(diams):
         granulats[nom] = refus
     return granulats
 
+def nom_sable(granulats):
+    """Granulat dont le nom contient « sable » (le premier à défaut)."""
+    return next((n for n in granulats if "sable" in n.lower()), next(iter(granulats), None))
+
 def detecter_module_finesse(granulats, diams):
-    tamis_mf = [0.08, 0.16, 0.315, 0.63, 1.25, 2.5, 5.0]
-    for nom, valeurs in granulats.items():
-        if "sable" in nom.lower():
-            total = 0
-            for tm in tamis_mf:
-                if tm in diams:
-                    idx = diams.index(tm)
-                    if idx < len(valeurs) and valeurs[idx] is not None:
-                        total += 100 - valeurs[idx]
-            mf = total / 100
-            print(f"✅ Module de finesse (détecté sur '{nom}') : Mf = {mf:.2f}")
-            return mf
-    return None
+    """Mf (`module_finesse`) du sable ; None sans granulat."""
+    nom = nom_sable(granulats)
+    if nom is None:
+        return None
+    return float(module_finesse(granulats[nom], diams))
 
-def calcul_Kprime(forme, vibration, dosage, mfs, kp):
-    tableau_K = {
-        "faible": {
-            "roulé": {"400+fluid":-2,"400":0,"350":2,"300":4,"250":6,"200":8},
-            "concassé": {"400+fluid":0,"400":2,"350":4,"300":6,"250":8,"200":10}
-        },
-        "normale": {
-            "roulé": {"400+fluid":-4,"400":-2,"350":0,"300":2,"250":4,"200":8},
-            "concassé": {"400+fluid":-2,"400":0,"350":2,"300":4,"250":6,"200":8}
-        },
-        "puissante": {
-            "roulé": {"400+fluid":-6,"400":-4,"350":-2,"300":0,"250":2,"200":4},
-            "concassé": {"400+fluid":-4,"400":-2,"350":0,"300":2,"250":4,"200":6}
-        }
+TABLEAU_K = {
+    "faible": {
+        "roulé": {"400+fluid":-2,"400":0,"350":2,"300":4,"250":6,"200":8},
+        "concassé": {"400+fluid":0,"400":2,"350":4,"300":6,"250":8,"200":10}
+    },
+    "normale": {
+        "roulé": {"400+fluid":-4,"400":-2,"350":0,"300":2,"250":4,"200":8},
+        "concassé": {"400+fluid":-2,"400":0,"350":2,"300":4,"250":6,"200":8}
+    },
+    "puissante": {
+        "roulé": {"400+fluid":-6,"400":-4,"350":-2,"300":0,"250":2,"200":4},
+        "concassé": {"400+fluid":-4,"400":-2,"350":0,"300":2,"250":4,"200":6}
     }
-    K = tableau_K[vibration][forme][dosage]
+}
+
+def coefficients_Kprime(forme, vibration, dosage, mfs, kp):
+    """Composantes de K′ : {"K", "Ks", "Kp", "Kprime"}."""
+    K = TABLEAU_K[vibration][forme][dosage]
     Ks = 6 * mfs - 15
-    Kprime = K + Ks + kp
-    print(f"Coefficients : K={K}, Ks={Ks:.2f}, Kp={kp} → K'={Kprime:.2f}")
-    return Kprime
+    return {"K": K, "Ks": Ks, "Kp": kp, "Kprime": K + Ks + kp}
+
+def calcul_Kprime(forme, vibration, dosage, mfs, kp):
+    return coefficients_Kprime(forme, vibration, dosage, mfs, kp)["Kprime"]
 
-def interpoler(gr, cible, diams, nom="", role=""):
+def interpoler(gr, cible, diams, nom="", role="", messages=None):
     di = [d for d, v in zip(diams, gr) if v is not None]
     va = [v for v in gr if v is not None]
     if not va:
         return None, None
-    if min(va) <= cible <= max(va):
-        f = interp1d(va, di, kind='linear')
-        return float(f(cible)), cible
-    else:
+    if not (min(va) <= cible <= max(va)):
         candidats = [v for v in va if abs(v - cible) <= 10]
         if not candidats:
-            print(f"⚠️ Point {cible}% introuvable pour '{nom}'")
+            if messages is not None:
+                messages.append(f"⚠️ Point {cible}% introuvable pour '{nom}'")
             return None, None
         v_proche = min(candidats, key=lambda v: abs(v - cible))
-        print(f"🔄 Point {cible}% remplacé par {v_proche}% pour '{nom}'")
-        f = interp1d(va, di, kind='linear')
-        return float(f(v_proche)), v_proche
+        if messages is not None:
+            messages.append(f"🔄 Point {cible}% remplacé par {v_proche}% pour '{nom}'")
+        cible = v_proche
+    # Interpolation linéaire % passant → diamètre (points triés par % passant croissant)
+    ordre = np.argsort(va, kind="stable")
+    return float(np.interp(cible, np.asarray(va, dtype=float)[ordre], np.asarray(di, dtype=float)[ordre])), cible
 
 def courbe_reference(Dmax, Kprime):
     XA = Dmax/2 if Dmax <= 20 else (math.log10(Dmax)+38)/2
     YA = 50 - math.sqrt(Dmax) + Kprime
     return [(0.08, 0), (XA, YA), (Dmax, 100)]
 
-def calcul_proportions(granulats, diams, courbe):
+def intersections_OAB(a, b, x_lo, x_hi, courbe_x, courbe_y):
+    """
+    Abscisses (log10 d) des croisements exacts des droites y = a·x + b avec la courbe
+    de référence OAB, linéaire par morceaux en log10 d et prolongée par ses segments
+    extrêmes, sur l'intervalle [x_lo, x_hi].
+
+    Chaque segment donne un croisement en forme close ; sans croisement dans
+    l'intervalle, on retient le point de l'intervalle le plus proche de la courbe
+    (borne ou point anguleux). Vectorisé : a, b, x_lo, x_hi de forme (…) et
+    courbe_x, courbe_y (diamètres en mm, % passants) de forme (…, K).
+    """
+    a, b, x_lo, x_hi = (np.asarray(v, dtype=float)[..., None] for v in (a, b, x_lo, x_hi))
+    xs = np.log10(np.asarray(courbe_x, dtype=float))
+    ys = np.asarray(courbe_y, dtype=float)
+    pente = np.diff(ys, axis=-1) / np.diff(xs, axis=-1)
+    origine = ys[..., :-1] - pente * xs[..., :-1]
+    inf = np.full(xs.shape[:-1] + (1,), np.inf)
+    seg_lo = np.concatenate([-inf, xs[..., 1:-1]], axis=-1)
+    seg_hi = np.concatenate([xs[..., 1:-1], inf], axis=-1)
+
+    def ecart(x):
+        # Segment de chaque abscisse (les extrêmes couvrent les prolongements)
+        j = np.sum(x[..., :, None] >= xs[..., None, 1:-1], axis=-1)
+        p = np.take_along_axis(np.broadcast_to(pente, x.shape[:-1] + pente.shape[-1:]), j, axis=-1)
+        o = np.take_along_axis(np.broadcast_to(origine, x.shape[:-1] + origine.shape[-1:]), j, axis=-1)
+        return np.abs(a * x + b - (p * x + o))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        racines = (origine - b) / (a - pente)
+    racines = np.where((racines >= seg_lo) & (racines <= seg_hi), racines, np.nan)
+    shape = np.broadcast_shapes(a.shape[:-1], xs.shape[:-1])
+    candidats = np.concatenate([np.broadcast_to(v, shape + (v.shape[-1],))
+                                for v in (racines, x_lo, x_hi, xs[..., 1:-1])], axis=-1)
+    candidats = np.where((candidats >= x_lo) & (candidats <= x_hi), candidats, np.nan)
+
+    e = ecart(np.nan_to_num(candidats))
+    e = np.where(np.isnan(candidats), np.inf, e)
+    # Croisement exact le plus à gauche, sinon point le plus proche de la courbe
+    exact = e <= 1e-9 * (1 + np.abs(b))
+    e = np.where(exact.any(axis=-1, keepdims=True), np.where(exact, candidats, np.inf), e)
+    return np.take_along_axis(candidats, np.argmin(e, axis=-1)[..., None], axis=-1)[..., 0]
+
+def paires_95_5(granulats, diams, messages=None):
+    """Points (d95, p95) du granulat i et (d5, p5) du suivant, pour chaque paire exploitable."""
     noms = list(granulats.keys())
-    fO = interp1d(np.log10([x for x, _ in courbe]), 
-                  [y for _, y in courbe], fill_value="extrapolate")
-    inters, lignes, projections = [], [], []
+    paires = []
     for i in range(len(noms) - 1):
         g1, g2 = granulats[noms[i]], granulats[noms[i+1]]
-        d1, p1 = interpoler(g1, 95, diams, noms[i], "95")
-        d2, p2 = interpoler(g2, 5, diams, noms[i+1], "5")
+        d1, p1 = interpoler(g1, 95, diams, noms[i], "95", messages)
+        d2, p2 = interpoler(g2, 5, diams, noms[i+1], "5", messages)
         if None in [d1, p1, d2, p2] or d1 == d2:
             continue
+        paires.append((d1, p1, d2, p2))
+    return paires
+
+def calcul_proportions(granulats, diams, courbe, messages=None):
+    return proportions_paires(paires_95_5(granulats, diams, messages), list(granulats), courbe)
+
+def proportions_paires(paires, noms, courbe):
+    """Croisements des droites des paires avec la courbe OAB et proportions qui en découlent."""
+    inters, lignes, projections = [], [], []
+    if paires:
+        d1, p1, d2, p2 = np.array(paires, dtype=float).T
         a = (p2 - p1) / (np.log10(d2) - np.log10(d1))
         b = p1 - a * np.log10(d1)
-        xlog = np.linspace(np.log10(min(d1,d2)), np.log10(max(d1,d2)), 1000)
-        xC_log = xlog[np.argmin(np.abs(a * xlog + b - fO(xlog)))]
-        xC, yC = 10 ** xC_log, a * xC_log + b
-        lignes.append(((d1,p1),(d2,p2)))
-        inters.append((xC, yC))
-        projections.append(yC)
+        xC_log = intersections_OAB(a, b, np.log10(np.minimum(d1, d2)), np.log10(np.maximum(d1, d2)),
+                                   [x for x, _ in courbe], [y for _, y in courbe])
+        for (d1_, p1_, d2_, p2_), xl, ai, bi in zip(paires, xC_log, a, b):
+            xC, yC = float(10 ** xl), float(ai * xl + bi)
+            lignes.append(((d1_, p1_), (d2_, p2_)))
+            inters.append((xC, yC))
+            projections.append(yC)
     proportions = {}
     if projections:
         noms_util = noms[:len(projections)+1]
@@ -382,8 +995,116 @@ def calcul_proportions(granulats, diams, courbe):
         proportions[noms_util[-1]] = 100 - projections[-1]
     return lignes, inters, proportions
 
-def tracer(granulats, diams, courbe, lignes, inters, proportions):
-    fig, ax = plt.subplots(figsize=(10, 7))
+# ============================================
+# MÉLANGE OPTIMAL PAR MOINDRES CARRÉS (toute la courbe)
+# ============================================
+
+CIBLES_MELANGE = ("OAB", "fuller", "andreasen")
+EXPOSANT_FULLER = 0.5
+EXPOSANT_ANDREASEN = 0.37
+
+def courbe_cible(diams, Dmax, modele="OAB", Kprime=0.0, exposant=None, dmin=0.0):
+    """
+    % passants visés sur chaque tamis, de forme (…, T) pour Dmax et Kprime de forme (…) :
+    - "OAB" : courbe de référence Dreux (linéaire en log d, 0 % à 0,08 mm, 100 % à Dmax) ;
+    - "fuller" : 100·(d/Dmax)^0,5 ;
+    - "andreasen" : Andreasen modifiée 100·(d^q − dmin^q)/(Dmax^q − dmin^q), q = 0,37.
+    """
+    d = np.asarray(diams, dtype=float)
+    Dmax, Kprime = np.broadcast_arrays(np.asarray(Dmax, dtype=float), np.asarray(Kprime, dtype=float))
+    D = Dmax[..., None]
+    if modele == "OAB":
+        XA = np.where(Dmax <= 20, Dmax / 2, (np.log10(Dmax) + 38) / 2)
+        YA = 50 - np.sqrt(Dmax) + Kprime
+        xs = np.log10(np.stack([np.full(Dmax.shape, 0.08), XA, Dmax], axis=-1))
+        ys = np.stack([np.zeros(Dmax.shape), YA, np.full(Dmax.shape, 100.0)], axis=-1)
+        x = np.log10(d)
+        # Interpolation par morceaux (bornée à 0 et 100 hors de [0,08 ; Dmax])
+        j = np.clip(np.sum(x[..., None] >= xs[..., None, 1:-1], axis=-1), 0, 1)
+        x0, x1 = np.take_along_axis(xs, j, -1), np.take_along_axis(xs, j + 1, -1)
+        y0, y1 = np.take_along_axis(ys, j, -1), np.take_along_axis(ys, j + 1, -1)
+        cible = y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+        cible = np.where(x <= xs[..., :1], 0.0, np.where(x >= xs[..., 2:], 100.0, cible))
+    elif modele == "fuller":
+        cible = 100 * (d / D) ** (exposant or EXPOSANT_FULLER)
+    elif modele == "andreasen":
+        q = exposant or EXPOSANT_ANDREASEN
+        cible = 100 * (d ** q - dmin ** q) / (D ** q - dmin ** q)
+    else:
+        raise ValueError(f"Courbe cible inconnue : {modele} (choix : {', '.join(CIBLES_MELANGE)})")
+    return np.clip(cible, 0, 100)
+
+def completer_courbes(passants, diams):
+    """
+    Comble les tamis non mesurés (NaN) de courbes de forme (…, T) par interpolation
+    linéaire en log d entre tamis mesurés voisins (valeur extrême au-delà).
+    """
+    v = np.asarray(passants, dtype=float)
+    d = np.asarray(diams, dtype=float)
+    ordre = np.argsort(d, kind="stable")
+    x, v = np.log10(d[ordre]), v[..., ordre]
+    T = len(d)
+    rang = np.arange(T)
+    mesure = ~np.isnan(v)
+    avant = np.maximum.accumulate(np.where(mesure, rang, -1), axis=-1)
+    apres = np.flip(np.minimum.accumulate(np.flip(np.where(mesure, rang, T), axis=-1), axis=-1), axis=-1)
+    avant, apres = np.where(avant < 0, apres, avant), np.where(apres >= T, avant, apres)
+    avant, apres = np.clip(avant, 0, T - 1), np.clip(apres, 0, T - 1)
+    v0, v1 = np.take_along_axis(v, avant, -1), np.take_along_axis(v, apres, -1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(apres > avant, (x - x[avant]) / (x[apres] - x[avant]), 0.0)
+    complete = np.where(mesure, v, v0 + t * (v1 - v0))
+    return complete[..., np.argsort(ordre)]
+
+def melange_moindres_carres(passants, cible, poids=None):
+    """
+    Proportions (%) minimisant Σ_t w_t (Σ_a p_a·P_at/100 − cible_t)² sous p ≥ 0 et Σ p = 100.
+
+    `passants` : (…, A, T) sans NaN (voir `completer_courbes`), `cible` : (…, T), `poids` : (T,).
+    Le problème (petit QP convexe) est résolu exactement et en bloc pour tous les lots :
+    la solution est, parmi les 2^A − 1 supports possibles, la meilleure solution KKT
+    d'égalité restant positive. Retourne (proportions (…, A), courbe du mélange (…, T),
+    écart quadratique moyen pondéré (…)).
+    """
+    P = np.asarray(passants, dtype=float) / 100
+    c = np.asarray(cible, dtype=float) / 100
+    A, T = P.shape[-2:]
+    w = np.ones(T) if poids is None else np.asarray(poids, dtype=float)
+    G = np.einsum("...at,t,...bt->...ab", P, w, P)
+    h = np.einsum("...at,t,...t->...a", P, w, c)
+    cc = np.einsum("...t,t,...t->...", c, w, c)
+
+    supports = ((np.arange(1, 2 ** A)[:, None] >> np.arange(A)) & 1).astype(bool)   # (K, A)
+    libre = supports[:, :, None] & supports[:, None, :]
+    eye = np.eye(A, dtype=bool)
+    # Système KKT par support : variables hors support fixées à 0 (lignes identité)
+    kkt = np.zeros(G.shape[:-2] + (len(supports), A + 1, A + 1))
+    kkt[..., :A, :A] = np.where(libre, G[..., None, :, :], np.where(eye & ~supports[:, :, None], 1.0, 0.0))
+    kkt[..., :A, A] = supports
+    kkt[..., A, :A] = supports
+    second = np.zeros(G.shape[:-2] + (len(supports), A + 1))
+    second[..., :A] = np.where(supports, h[..., None, :], 0.0)
+    second[..., A] = 1.0
+    x = np.einsum("...ij,...j->...i", np.linalg.pinv(kkt), second)[..., :A]
+
+    residu = (np.einsum("...ka,...ab,...kb->...k", x, G, x) - 2 * np.einsum("...ka,...a->...k", x, h) + cc[..., None])
+    admissible = np.all(x >= -1e-10, axis=-1) & (np.abs(x.sum(axis=-1) - 1) < 1e-8)
+    meilleur = np.argmin(np.where(admissible, residu, np.inf), axis=-1)
+    p = np.clip(np.take_along_axis(x, meilleur[..., None, None], axis=-2)[..., 0, :], 0, None)
+    p = 100 * p / p.sum(axis=-1, keepdims=True)
+    melange = np.einsum("...a,...at->...t", p, P)
+    ecart = 100 * np.sqrt(np.einsum("...t,t->...", (melange / 100 - c) ** 2, w) / w.sum())
+    return p, melange, ecart
+
+def tracer(granulats, diams, courbe, lignes, inters, proportions, cible=None, melange=None, ax=None):
+    """
+    Graphique Dreux-Gorisse sur `ax`, ou sur une Figure autonome (hors de l'état
+    global de pyplot, donc utilisable depuis plusieurs sessions ou threads). Retourne la Figure.
+    """
+    if ax is None:
+        fig = Figure(figsize=(10, 7))
+        ax = fig.subplots()
+    fig = ax.figure
     ax.set_xscale("log")
     ax.set_xlabel("Tamis (mm)")
     ax.set_ylabel("% passant")
@@ -399,6 +1120,11 @@ def tracer(granulats, diams, courbe, lignes, inters, proportions):
     xref, yref = zip(*courbe)
     ax.plot(xref, yref, 'k--', label="OAB")
 
+    if cible is not None:
+        ax.plot(diams, cible, color="gray", linestyle="-.", label="Courbe cible")
+    if melange is not None:
+        ax.plot(diams, melange, color="purple", linewidth=2.5, label="Mélange")
+
     for (x1, y1), (x2, y2) in lignes:
         ax.plot([x1, x2], [y1, y2], 'r--')
 
@@ -408,8 +1134,40 @@ def tracer(granulats, diams, courbe, lignes, inters, proportions):
         ax.axhline(y, color='gray', linestyle=':', linewidth=1)
 
     ax.legend()
-    plt.tight_layout()
-    plt.show()
+    fig.tight_layout()
+    return fig
+
+FORMATS_FIGURE = {"png": "image/png", "svg": "image/svg+xml"}
+MAX_EXPORTS_FIGURE = 32
+_EXPORTS_FIGURE = OrderedDict()
+_VERROU_EXPORTS = threading.Lock()
+_VERROU_RENDU = threading.Lock()  # matplotlib (mise en page, mathtext) n'est pas thread-safe
+
+def exporter_figure(res, format="png", dpi=300):
+    """
+    Octets du graphique d'un ResultatDreux au format PNG ou SVG, rendus au premier
+    appel puis servis depuis un cache LRU (MAX_EXPORTS_FIGURE entrées) indexé par
+    l'empreinte du résultat. Les rendus sont sérialisés (appel possible depuis les
+    threads de téléchargement) et la Figure est vidée dès l'export terminé.
+    """
+    cle = (res.cle, format, dpi)
+    with _VERROU_EXPORTS:
+        if cle in _EXPORTS_FIGURE:
+            _EXPORTS_FIGURE.move_to_end(cle)
+            return _EXPORTS_FIGURE[cle]
+    tampon = BytesIO()
+    with _VERROU_RENDU:
+        fig = tracer(**res.donnees_graphique)
+        try:
+            fig.savefig(tampon, format=format, dpi=dpi, bbox_inches="tight")
+        finally:
+            fig.clear()
+    donnees = tampon.getvalue()
+    with _VERROU_EXPORTS:
+        _EXPORTS_FIGURE[cle] = donnees
+        while len(_EXPORTS_FIGURE) > MAX_EXPORTS_FIGURE:
+            _EXPORTS_FIGURE.popitem(last=False)
+    return donnees
 
 def classe_vraie_ciment(denomination):
     mapping = {"32.5": 45, "42.5": 55, "52.5": 60}
@@ -448,34 +1206,35 @@ def evaluer_ouvrabilite(affaissement_cm):
         return "Mou", "Piquage"
 
 
-def interpoler_gamma(plasticite, serrage, Dmax):
-    gamma_table = {
-        "Mou": {
-            "Piquage": {5:0.750, 8:0.780, 12.5:0.795, 20:0.805, 31.5:0.810, 50:0.815, 80:0.820},
-            "Vibration faible": {5:0.755, 8:0.785, 12.5:0.800, 20:0.810, 31.5:0.815, 50:0.820, 80:0.825},
-            "Vibration normale": {5:0.760, 8:0.790, 12.5:0.805, 20:0.815, 31.5:0.820, 50:0.825, 80:0.830},
-        },
-        "Plastique": {
-            "Piquage": {5:0.760, 8:0.790, 12.5:0.805, 20:0.815, 31.5:0.820, 50:0.825, 80:0.830},
-            "Vibration faible": {5:0.765, 8:0.795, 12.5:0.810, 20:0.820, 31.5:0.825, 50:0.830, 80:0.835},
-            "Vibration normale": {5:0.770, 8:0.800, 12.5:0.815, 20:0.825, 31.5:0.830, 50:0.835, 80:0.840},
-            "Vibration puissante": {5:0.775, 8:0.805, 12.5:0.820, 20:0.830, 31.5:0.835, 50:0.840, 80:0.845},
-        },
-        "Ferme": {
-            "Vibration faible": {5:0.775, 8:0.805, 12.5:0.820, 20:0.830, 31.5:0.835, 50:0.840, 80:0.845},
-            "Vibration normale": {5:0.780, 8:0.810, 12.5:0.825, 20:0.835, 31.5:0.840, 50:0.845, 80:0.850},
-            "Vibration puissante": {5:0.785, 8:0.815, 12.5:0.830, 20:0.840, 31.5:0.845, 50:0.850, 80:0.855},
-        }
+TABLE_GAMMA = {
+    "Mou": {
+        "Piquage": {5:0.750, 8:0.780, 12.5:0.795, 20:0.805, 31.5:0.810, 50:0.815, 80:0.820},
+        "Vibration faible": {5:0.755, 8:0.785, 12.5:0.800, 20:0.810, 31.5:0.815, 50:0.820, 80:0.825},
+        "Vibration normale": {5:0.760, 8:0.790, 12.5:0.805, 20:0.815, 31.5:0.820, 50:0.825, 80:0.830},
+    },
+    "Plastique": {
+        "Piquage": {5:0.760, 8:0.790, 12.5:0.805, 20:0.815, 31.5:0.820, 50:0.825, 80:0.830},
+        "Vibration faible": {5:0.765, 8:0.795, 12.5:0.810, 20:0.820, 31.5:0.825, 50:0.830, 80:0.835},
+        "Vibration normale": {5:0.770, 8:0.800, 12.5:0.815, 20:0.825, 31.5:0.830, 50:0.835, 80:0.840},
+        "Vibration puissante": {5:0.775, 8:0.805, 12.5:0.820, 20:0.830, 31.5:0.835, 50:0.840, 80:0.845},
+    },
+    "Ferme": {
+        "Vibration faible": {5:0.775, 8:0.805, 12.5:0.820, 20:0.830, 31.5:0.835, 50:0.840, 80:0.845},
+        "Vibration normale": {5:0.780, 8:0.810, 12.5:0.825, 20:0.835, 31.5:0.840, 50:0.845, 80:0.850},
+        "Vibration puissante": {5:0.785, 8:0.815, 12.5:0.830, 20:0.840, 31.5:0.845, 50:0.850, 80:0.855},
     }
+}
 
+def interpoler_gamma(plasticite, serrage, Dmax, messages=None):
     try:
-        d_vals = np.array(list(gamma_table[plasticite][serrage].keys()))
-        gamma_vals = np.array(list(gamma_table[plasticite][serrage].values()))
+        d_vals = np.array(list(TABLE_GAMMA[plasticite][serrage].keys()))
+        gamma_vals = np.array(list(TABLE_GAMMA[plasticite][serrage].values()))
         return np.interp(Dmax, d_vals, gamma_vals)
     except KeyError:
-        print(f"⚠️ Combinaison non trouvée: {plasticite}/{serrage} - Valeurs par défaut utilisées")
-        d_vals = np.array(list(gamma_table["Plastique"]["Vibration normale"].keys()))
-        gamma_vals = np.array(list(gamma_table["Plastique"]["Vibration normale"].values()))
+        if messages is not None:
+            messages.append(f"⚠️ Combinaison non trouvée: {plasticite}/{serrage} - Valeurs par défaut utilisées")
+        d_vals = np.array(list(TABLE_GAMMA["Plastique"]["Vibration normale"].keys()))
+        gamma_vals = np.array(list(TABLE_GAMMA["Plastique"]["Vibration normale"].values()))
         return np.interp(Dmax, d_vals, gamma_vals)
 
 def correction_gamma(type_sable, type_gravier):
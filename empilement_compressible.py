@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# Modèle d'empilement compressible (MEC, de Larrard) du squelette granulaire
+#
+# Chaque granulat est découpé en classes granulaires (tranches entre tamis successifs de
+# son analyse). Pour un mélange de fractions volumiques y (classes), la compacité virtuelle
+# γ_i quand la classe i est dominante tient compte des effets de paroi (grains plus gros)
+# et de desserrement (grains plus fins) :
+#
+#   γ_i = β_i / (1 − Σ_j C_ij · y_j)
+#   C_ij = 1 − β_i + b_ij·β_i·(1 − 1/β_j)   si d_j ≥ d_i   (paroi,   b_ij = 1 − (1 − d_i/d_j)^1,50)
+#   C_ij = 1 − a_ij·β_i/β_j                  si d_j < d_i   (desserrement, a_ij = √(1 − (1 − d_j/d_i)^1,02))
+#
+# La compacité réelle Φ résout Σ_i (y_i/β_i) / (1/Φ − 1/γ_i) = K (indice de serrage).
+# La matrice C est calculée une fois par squelette : un lot de B mélanges coûte un produit
+# matriciel (B × n) @ (n × n) et quelques itérations de Newton vectorisées.
+#
+from dataclasses import dataclass
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+import code_dreux_gorisse_final as dreux
+
+# Indice de serrage K selon le mode de mise en place (de Larrard)
+INDICES_SERRAGE = {"déversé": 4.1, "piqué": 4.5, "vibré": 4.75, "vibré + compression": 9.0}
+K_DEFAUT = INDICES_SERRAGE["vibré + compression"]  # conditions de l'essai de compacité
+# Compacité propre β par défaut d'une classe granulaire selon la forme des grains
+COMPACITE_PROPRE = {"roulé": 0.64, "concassé": 0.57}
+PAS_MELANGES = 0.05  # pas (fraction volumique) de la grille des mélanges candidats
+
+# =============================================
+# SQUELETTE GRANULAIRE
+# =============================================
+def _classes(diams, passants):
+    """
+    Fractions volumiques (A × T+1) et diamètres moyens (T+1) des classes comprises entre
+    tamis successifs : refus sur le plus gros tamis, tranches intermédiaires, passant au plus fin.
+    """
+    d = np.asarray(diams, dtype=float)
+    ordre = np.argsort(-d, kind="stable")
+    d, P = d[ordre], np.clip(dreux.completer_courbes(passants, diams)[:, ordre], 0, 100)
+    bornes = np.concatenate([np.full((len(P), 1), 100.0), P, np.zeros((len(P), 1))], axis=1)
+    fractions = np.maximum(bornes[:, :-1] - bornes[:, 1:], 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fractions = fractions / fractions.sum(axis=1, keepdims=True)
+    diametres = np.concatenate([[d[0]], np.sqrt(d[:-1] * d[1:]), [d[-1] / 2]])
+    return np.nan_to_num(fractions), diametres
+
+@dataclass
+class SqueletteGranulaire:
+    """
+    Granulats découpés en n classes (d, β) et matrice d'interaction C (n × n) du MEC.
+    `repartition[a, i]` est la part du granulat a dans la classe i (lignes de somme 1).
+    """
+    noms: list
+    diametres: np.ndarray
+    beta: np.ndarray
+    repartition: np.ndarray
+    interactions: np.ndarray
+
+    def fractions(self, X):
+        """Fractions volumiques des classes (… × n) pour des proportions de granulats X (… × A)."""
+        X = np.asarray(X, dtype=float)
+        return (X / X.sum(axis=-1, keepdims=True)) @ self.repartition
+
+    def compacites_virtuelles(self, X):
+        """γ_i de chaque classe dominante (… × n)."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.beta / (1 - self.fractions(X) @ self.interactions.T)
+
+    def compacite(self, X, K=K_DEFAUT, details=False):
+        """
+        Compacité réelle Φ (…) des mélanges X (proportions volumiques des granulats, … × A).
+        Avec `details`, renvoie aussi les indices de serrage partiels K_i (… × n, somme K).
+        """
+        y = self.fractions(X)
+        w = y / self.beta
+        g = (1 - y @ self.interactions.T) / self.beta          # 1/γ_i
+        presente = y > 0
+        g_max = np.where(presente, g, -np.inf).max(axis=-1, keepdims=True)
+        w_max = np.take_along_axis(w, np.where(presente, g, -np.inf).argmax(axis=-1)[..., None], axis=-1)
+        # Σ w_i/(t − g_i) − K est convexe décroissante en t = 1/Φ : Newton depuis t0 ≤ racine
+        # (t0 = g_max + w_max/K) converge de façon monotone
+        t = g_max + w_max / K
+        for _ in range(100):
+            e = np.where(presente, t - g, 1.0)
+            f = (w / e).sum(axis=-1, keepdims=True) - K
+            pas = f / (w / e ** 2).sum(axis=-1, keepdims=True)
+            t = t + pas
+            if np.all(np.abs(pas) <= 1e-13 * t):
+                break
+        phi = 1 / t[..., 0]
+        if details:
+            return phi, np.where(presente, w / np.where(presente, t - g, 1.0), 0.0)
+        return phi
+
+    def empreinte(self):
+        """Contenu du squelette en types JSON (signatures de points de reprise et de cartes)."""
+        return {"noms": list(self.noms), "diametres": self.diametres.tolist(),
+                "beta": self.beta.tolist(), "repartition": self.repartition.tolist()}
+
+    def diametre_moyen(self):
+        """Diamètre moyen géométrique (mm) des grains de chaque granulat (A)."""
+        return np.exp(self.repartition @ np.log(self.diametres))
+
+def squelette_granulaire(diams, granulats, beta=None, formes=None):
+    """
+    Squelette MEC de granulats {nom: % passants sur `diams`, None si non mesuré}.
+
+    `beta` : compacité propre {nom: β} (mesurée) ; à défaut, COMPACITE_PROPRE selon
+    `formes` {nom: "roulé"/"concassé"} (roulé par défaut). Les classes vides de tous
+    les granulats sont écartées.
+    """
+    noms = list(granulats)
+    passants = np.array([[np.nan if v is None else v for v in granulats[n]] for n in noms], dtype=float)
+    fractions, diametres = _classes(diams, passants)
+    beta = beta or {}
+    formes = formes or {}
+    beta_granulat = np.array([beta.get(n, COMPACITE_PROPRE[formes.get(n, "roulé")]) for n in noms], dtype=float)
+
+    # Une classe par couple (granulat, tranche non vide) : même taille, β propre au granulat
+    a, k = np.nonzero(fractions > 0)
+    d, b = diametres[k], beta_granulat[a]
+    repartition = np.zeros((len(noms), len(k)))
+    repartition[a, np.arange(len(k))] = fractions[a, k]
+
+    di, dj = d[:, None], d[None, :]
+    bi, bj = b[:, None], b[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        paroi = 1 - (1 - np.minimum(di / dj, 1)) ** 1.50
+        desserrement = np.sqrt(1 - (1 - np.minimum(dj / di, 1)) ** 1.02)
+    interactions = np.where(dj >= di, 1 - bi + paroi * bi * (1 - 1 / bj), 1 - desserrement * bi / bj)
+    return SqueletteGranulaire(noms, d, b, repartition, interactions)
+
+# =============================================
+# CLASSEMENT DE MÉLANGES
+# =============================================
+def grille_melanges(n_granulats, pas=PAS_MELANGES):
+    """Toutes les proportions (fractions de somme 1, multiples de `pas`) de n granulats, chacun > 0."""
+    m = int(round(1 / pas))
+    # Compositions de m en n parts ≥ 1 : barres placées entre les m unités
+    barres = np.array(list(combinations(range(1, m), n_granulats - 1)), dtype=int).reshape(-1, n_granulats - 1)
+    bornes = np.hstack([np.zeros((len(barres), 1), dtype=int), barres, np.full((len(barres), 1), m)])
+    return np.diff(bornes, axis=1) / m
+
+def classer_melanges(squelette, X=None, K=K_DEFAUT, pas=PAS_MELANGES, n=None):
+    """
+    Mélanges classés par compacité décroissante (DataFrame : proportions volumiques en %,
+    compacité Φ, porosité 1 − Φ, classe la plus serrée et sa part de K).
+    Sans `X`, toute la grille de `grille_melanges` est évaluée.
+    """
+    X = grille_melanges(len(squelette.noms), pas) if X is None else np.atleast_2d(np.asarray(X, dtype=float))
+    phi, Ki = squelette.compacite(X, K, details=True)
+    dominante = Ki.argmax(axis=1)
+    tableau = pd.DataFrame({
+        **{f"{nom} (%)": 100 * X[:, a] / X.sum(axis=1) for a, nom in enumerate(squelette.noms)},
+        "Compacité Φ": phi,
+        "Porosité": 1 - phi,
+        "Classe dominante (mm)": squelette.diametres[dominante],
+        "Part de K": Ki[np.arange(len(X)), dominante] / K,
+    })
+    tableau = tableau.sort_values("Compacité Φ", ascending=False, kind="stable").reset_index(drop=True)
+    return tableau if n is None else tableau.head(n)
+
+def rapport_GS_optimal(squelette, K=K_DEFAUT, n=2001, sable=0):
+    """
+    Rapport volumique gravier/sable de compacité maximale pour un squelette sable + graviers
+    (`sable` : indice ou nom du sable, qui doit être le granulat le plus fin ; les graviers
+    gardent des parts égales).
+    Peut remplacer `compute_GS_target` dans `optimiser_formulation(..., GS_target=...)`.
+    """
+    A = len(squelette.noms)
+    if A < 2:
+        raise ValueError("Le squelette doit compter un sable et au moins un gravier")
+    i_sable = squelette.noms.index(sable) if isinstance(sable, str) else int(sable)
+    diametres = squelette.diametre_moyen()
+    if np.argmin(diametres) != i_sable:
+        raise ValueError(f"'{squelette.noms[i_sable]}' n'est pas le granulat le plus fin du squelette "
+                         f"(plus fin : '{squelette.noms[int(np.argmin(diametres))]}') : préciser `sable`")
+    s = np.linspace(0, 1, n)[1:-1]
+    X = np.repeat(((1 - s) / (A - 1))[:, None], A, axis=1)
+    X[:, i_sable] = s
+    s_opt = s[np.argmax(squelette.compacite(X, K))]
+    return float((1 - s_opt) / s_opt)
+
+def compacite_population(X, constraints, squelette, K=K_DEFAUT):
+    """
+    Compacité du squelette sable + gravier de chaque individu du GA (X n × 4 : ciment,
+    eau, sable, gravier en kg/m³). `squelette` : exactement deux granulats, le sable
+    puis le gravier. Utilisée par `optimiser_formulation(..., squelette, poids_compacite)`.
+    """
+    if len(squelette.noms) != 2:
+        raise ValueError(f"Squelette sable + gravier attendu (2 granulats), reçu {len(squelette.noms)} : "
+                         f"{', '.join(squelette.noms)}")
+    diametres = squelette.diametre_moyen()
+    if diametres[0] > diametres[1]:
+        raise ValueError(f"Le premier granulat du squelette ('{squelette.noms[0]}') doit être le sable (le plus fin)")
+    X = np.asarray(X, dtype=float)
+    volumes = np.stack([X[..., 2] / constraints["rho_sand"], X[..., 3] / constraints["rho_gravel"]], axis=-1)
+    return squelette.compacite(volumes, K)
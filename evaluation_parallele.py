@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# Évaluation parallèle maître–travailleurs de la fitness sur mémoire partagée
+#
+# La population est écrite une seule fois dans un bloc `multiprocessing.shared_memory` ;
+# chaque processus d'un pool persistant évalue sa tranche de lignes sur place et écrit
+# la fitness dans un second bloc partagé. Seules les bornes (début, fin) des tranches
+# transitent par les tubes : aucun individu n'est sérialisé.
+#
+import os
+import traceback
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+def _attacher(nom):
+    """Ouvre un bloc partagé existant sans en prendre la propriété (le maître le libère)."""
+    try:
+        return shared_memory.SharedMemory(name=nom, track=False)
+    except TypeError:  # Python < 3.13 : le resource tracker, partagé avec le maître, dédoublonne l'inscription
+        return shared_memory.SharedMemory(name=nom)
+
+def _travailleur(fonction, nom_x, nom_f, capacite, dimension, conn):
+    """Boucle d'un travailleur : reçoit (début, fin), évalue X[début:fin] et écrit F[début:fin]."""
+    shm_x, shm_f = _attacher(nom_x), _attacher(nom_f)
+    X = np.ndarray((capacite, dimension), dtype=np.float64, buffer=shm_x.buf)
+    F = np.ndarray((capacite,), dtype=np.float64, buffer=shm_f.buf)
+    try:
+        while (tache := conn.recv()) is not None:
+            debut, fin = tache
+            try:
+                F[debut:fin] = fonction(X[debut:fin])
+                conn.send(None)
+            except Exception:
+                conn.send(traceback.format_exc())
+    finally:
+        del X, F
+        shm_x.close()
+        shm_f.close()
+
+class EvaluateurParallele:
+    """
+    Objectif vectorisé (X n × d → fitness n) évalué par un pool persistant de processus.
+
+    `fonction` doit être sérialisable (fonction de module, `functools.partial`…) : elle
+    n'est transmise qu'une fois, au démarrage des travailleurs. Les populations plus
+    grandes que `capacite` sont évaluées par blocs successifs.
+
+        with EvaluateurParallele(partial(evaluer_population, ...), d, n_workers=8) as objectif:
+            fitness = objectif(X)
+    """
+
+    def __init__(self, fonction, dimension, n_workers=None, capacite=1024, contexte="spawn"):
+        self.dimension = int(dimension)
+        self.capacite = int(capacite)
+        self.n_workers = max(1, int(n_workers or os.cpu_count() or 1))
+        self._shm_x = shared_memory.SharedMemory(create=True, size=self.capacite * self.dimension * 8)
+        self._shm_f = shared_memory.SharedMemory(create=True, size=self.capacite * 8)
+        self._X = np.ndarray((self.capacite, self.dimension), dtype=np.float64, buffer=self._shm_x.buf)
+        self._F = np.ndarray((self.capacite,), dtype=np.float64, buffer=self._shm_f.buf)
+
+        ctx = mp.get_context(contexte)
+        self._conns, self._processus = [], []
+        for _ in range(self.n_workers):
+            maitre, travailleur = ctx.Pipe()
+            p = ctx.Process(target=_travailleur, daemon=True,
+                            args=(fonction, self._shm_x.name, self._shm_f.name, self.capacite, self.dimension, travailleur))
+            p.start()
+            travailleur.close()
+            self._conns.append(maitre)
+            self._processus.append(p)
+
+    def __call__(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        fitness = np.empty(len(X))
+        for debut in range(0, len(X), self.capacite):
+            bloc = X[debut:debut + self.capacite]
+            n = len(bloc)
+            self._X[:n] = bloc
+            bornes = np.linspace(0, n, min(self.n_workers, n) + 1).astype(int)
+            actifs = self._conns[:len(bornes) - 1]
+            for conn, a, b in zip(actifs, bornes[:-1], bornes[1:]):
+                conn.send((int(a), int(b)))
+            erreurs = [msg for msg in (conn.recv() for conn in actifs) if msg is not None]
+            if erreurs:
+                raise RuntimeError(f"Échec de l'évaluation dans un travailleur :\n{erreurs[0]}")
+            fitness[debut:debut + n] = self._F[:n]
+        return fitness
+
+    def fermer(self):
+        """Arrête les travailleurs et libère la mémoire partagée."""
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for p in self._processus:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        for conn in self._conns:
+            conn.close()
+        self._conns, self._processus = [], []
+        del self._X, self._F
+        for shm in (self._shm_x, self._shm_f):
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+# Stockage colonnaire des analyses granulométriques (échantillon × granulat × tamis)
+#
+# Les exports de laboratoire au format « long » (une ligne par mesure : échantillon,
+# granulat, tamis, % passant) sont lus par blocs, sans charger le fichier entier :
+# chaque bloc est réduit à trois colonnes de codes entiers et une colonne de passants,
+# puis le tout est assemblé en un cube S × A × T (NaN = tamis non mesuré) qui alimente
+# directement `calculer_dreux_lot`, sans repasser par des chaînes de caractères.
+#
+import io
+from dataclasses import dataclass
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+import code_dreux_gorisse_final as dreux
+
+COLONNES_GRANULO = {"echantillon": "Échantillon", "granulat": "Granulat",
+                    "tamis": "Tamis (mm)", "passant": "Passant (%)"}
+TAILLE_BLOC = 50_000  # lignes lues par bloc
+
+# =============================================
+# CUBE GRANULOMÉTRIQUE
+# =============================================
+@dataclass
+class StockGranulometrique:
+    """
+    Analyses granulométriques empilées : `passants[s, a, t]` est le % passant de
+    l'échantillon s, granulat a (du plus fin au plus gros), tamis t (décroissants).
+    """
+    echantillons: list
+    granulats: list
+    tamis: np.ndarray
+    passants: np.ndarray
+
+    def __len__(self):
+        return len(self.echantillons)
+
+    def granulats_echantillon(self, i):
+        """Granulométrie d'un échantillon au format de `calculer_dreux` ({nom: passants, None si non mesuré})."""
+        return {nom: [None if np.isnan(v) else float(v) for v in self.passants[i, a]]
+                for a, nom in enumerate(self.granulats)}
+
+    def calculer_dreux(self, **parametres):
+        """Dreux-Gorisse sur tous les échantillons (paramètres de `calculer_dreux_lot`)."""
+        return dreux.calculer_dreux_lot(self.tamis, self.passants, noms_granulats=self.granulats,
+                                        noms_echantillons=self.echantillons, **parametres)
+
+    def enregistrer(self, chemin):
+        """Sauvegarde binaire compacte (.npz) du cube et de ses index."""
+        np.savez_compressed(chemin, passants=self.passants, tamis=self.tamis,
+                            echantillons=np.array(self.echantillons, dtype=str),
+                            granulats=np.array(self.granulats, dtype=str))
+
+    @classmethod
+    def charger(cls, chemin):
+        with np.load(chemin) as f:
+            return cls(f["echantillons"].tolist(), f["granulats"].tolist(), f["tamis"], f["passants"])
+
+# =============================================
+# LECTURE PAR BLOCS (CSV / XLSX)
+# =============================================
+def _encoder(dictionnaire, valeurs):
+    """Codes entiers des valeurs, en complétant le dictionnaire {valeur: code} au fil des blocs."""
+    for v in pd.unique(valeurs):
+        dictionnaire.setdefault(v, len(dictionnaire))
+    return pd.Index(list(dictionnaire)).get_indexer(valeurs)
+
+def _nombres(colonne):
+    """Colonne numérique, virgule décimale acceptée."""
+    if colonne.dtype == object:
+        colonne = colonne.astype(str).str.replace(",", ".", regex=False)
+    return pd.to_numeric(colonne, errors="coerce").to_numpy(dtype=float)
+
+def _entete(source):
+    """Ligne d'en-tête d'un CSV (chemin ou fichier, dont la position est restaurée)."""
+    if hasattr(source, "read"):
+        position = source.tell()
+        ligne = source.readline()
+        source.seek(position)
+    else:
+        with open(source, encoding="utf-8-sig") as f:
+            ligne = f.readline()
+    if isinstance(ligne, bytes):
+        ligne = ligne.decode("utf-8-sig", "replace")
+    return ligne.lstrip("\ufeff")
+
+def _separateur(ligne):
+    """Séparateur et décimale d'un CSV d'après sa ligne d'en-tête (« ; » → export français)."""
+    return (";", ",") if ligne.count(";") > ligne.count(",") else (",", ".")
+
+def _blocs_xlsx(source, taille_bloc, feuille=None):
+    from openpyxl import load_workbook
+    classeur = load_workbook(source, read_only=True, data_only=True)
+    try:
+        lignes = (classeur[feuille] if feuille else classeur.active).iter_rows(values_only=True)
+        entete = [str(c).strip() if c is not None else "" for c in next(lignes)]
+        while bloc := list(islice(lignes, taille_bloc)):
+            yield pd.DataFrame(bloc, columns=entete, dtype=object)
+    finally:
+        classeur.close()
+
+def blocs_granulometrie(source, taille_bloc=TAILLE_BLOC, feuille=None, texte=()):
+    """
+    Itère sur les blocs (DataFrame) d'un export CSV ou XLSX, chemin ou fichier téléversé.
+    Les colonnes `texte` d'un CSV sont lues en chaînes : leur type ne dépend pas du bloc.
+    """
+    nom = str(getattr(source, "name", source)).lower()
+    if nom.endswith((".xlsx", ".xlsm")):
+        yield from _blocs_xlsx(source, taille_bloc, feuille)
+        return
+    ligne = _entete(source)
+    sep, decimal = _separateur(ligne)
+    entete = pd.read_csv(io.StringIO(ligne), sep=sep, nrows=0).columns
+    types = {c: str for c in entete if c.strip() in texte}
+    with pd.read_csv(source, sep=sep, decimal=decimal, chunksize=taille_bloc, encoding="utf-8-sig",
+                     dtype=types) as lecteur:
+        for bloc in lecteur:
+            yield bloc.rename(columns=str.strip)
+
+def _ordre_finesse(tamis, passants):
+    """Granulats triés du plus fin au plus gros (d50 médian sur les échantillons)."""
+    d50, _, _ = dreux.interpoler_lot(passants.transpose(1, 0, 2), tamis, 50)
+    with np.errstate(all="ignore"):
+        mediane = np.nanmedian(d50, axis=1)
+    return np.argsort(np.nan_to_num(mediane, nan=np.inf), kind="stable")
+
+def lire_granulometrie(source, colonnes=None, taille_bloc=TAILLE_BLOC, feuille=None, ordre_granulats=None):
+    """
+    Charge un export de laboratoire au format long dans un StockGranulometrique.
+
+    Colonnes attendues (renommables via `colonnes`, mêmes clés que COLONNES_GRANULO) :
+    Échantillon, Granulat, Tamis (mm), Passant (%). Échantillons et granulats sont lus
+    comme texte. Les lignes sans échantillon, sans tamis ou sans passant sont ignorées ;
+    les ouvertures sont ramenées à leur valeur nominale (0,32 → 0,315) et, pour une même
+    mesure répétée, la dernière l'emporte. Les granulats sont classés du plus fin au plus
+    gros, sauf si `ordre_granulats` (liste de noms) est fourni.
+    """
+    colonnes = {**COLONNES_GRANULO, **(colonnes or {})}
+    index = {cle: {} for cle in ("echantillon", "granulat", "tamis")}
+    codes = {cle: [] for cle in index}
+    valeurs = []
+
+    texte = (colonnes["echantillon"], colonnes["granulat"])
+    for bloc in blocs_granulometrie(source, taille_bloc, feuille, texte):
+        manquantes = set(colonnes.values()) - set(bloc.columns)
+        if manquantes:
+            raise ValueError(f"Colonnes manquantes dans l'export granulométrique : {', '.join(sorted(manquantes))}")
+        tamis = dreux.normaliser_tamis(np.round(_nombres(bloc[colonnes["tamis"]]), 4))
+        passant = _nombres(bloc[colonnes["passant"]])
+        echantillon = bloc[colonnes["echantillon"]]
+        garde = ~(np.isnan(tamis) | np.isnan(passant)) & echantillon.notna().to_numpy()
+        codes["echantillon"].append(_encoder(index["echantillon"], echantillon.astype(str).str.strip().to_numpy()[garde]))
+        codes["granulat"].append(_encoder(index["granulat"], bloc[colonnes["granulat"]].astype(str).str.strip().to_numpy()[garde]))
+        codes["tamis"].append(_encoder(index["tamis"], tamis[garde]))
+        valeurs.append(passant[garde])
+
+    if not valeurs or not sum(map(len, valeurs)):
+        raise ValueError("Aucune mesure granulométrique exploitable dans le fichier.")
+    s, a, t = (np.concatenate(codes[cle]) for cle in ("echantillon", "granulat", "tamis"))
+    cube = np.full((len(index["echantillon"]), len(index["granulat"]), len(index["tamis"])), np.nan)
+    cube[s, a, t] = np.concatenate(valeurs)
+
+    tamis = np.array(list(index["tamis"]), dtype=float)
+    ordre_t = np.argsort(-tamis, kind="stable")
+    tamis, cube = tamis[ordre_t], cube[:, :, ordre_t]
+    granulats = list(index["granulat"])
+    if ordre_granulats is None:
+        ordre_a = _ordre_finesse(tamis, cube)
+    else:
+        inconnus = set(ordre_granulats) - set(granulats)
+        if inconnus:
+            raise ValueError(f"Granulats absents du fichier : {', '.join(sorted(inconnus))}")
+        ordre_a = [granulats.index(nom) for nom in ordre_granulats]
+    return StockGranulometrique(list(index["echantillon"]), [granulats[i] for i in ordre_a], tamis, cube[:, ordre_a])
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+# Abaque ACI précalculé : grille de `aci_formulation` sur tout le domaine d'entrée, sur disque
+#
+# Chaque combinaison f'c × affaissement × Dmax × Mf × classe d'exposition × air entraîné est
+# calculée une fois (`aci_formulation_lot`) et stockée colonne par colonne en entiers exacts
+# (dixièmes, centièmes), avec pour chaque colonne la permutation qui la trie. Une requête par
+# plages (« f'c ≥ 30 et ciment ≤ 380 ») se réduit à des recherches dichotomiques dans ces
+# index, puis au filtrage de la plage la plus sélective. Le fichier porte l'empreinte des
+# tables normatives et du domaine : il est reconstruit dès que l'une d'elles change.
+#
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+import new_formulation_aci as aci
+
+FICHIER_INDEX_ACI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index_aci.npz")
+VERSION_INDEX = 1
+
+# Domaine d'entrée (Dmax et Mf : valeurs tabulées, les autres valeurs s'y ramènent)
+DOMAINE_ACI = {
+    "fc_mpa": np.arange(10.0, 80.5, 1.0),
+    "slump_mm": np.arange(0.0, 250.5, 10.0),
+    "dmax_mm": np.array(list(aci.TABLE_5_3_3_EAU_AIR["non_air_entraine"]), dtype=float),
+    "mf_sable": np.array(sorted(next(iter(aci.TABLE_5_3_6_VOL_GROS_GRANULATS.values()))), dtype=float),
+    "exposition": np.array(list(aci.TABLE_4_7_3_DURABILITE)),
+    "air_entraine": np.array([False, True]),
+}
+# Matériaux de référence de la grille (valeurs par défaut de la page Volumes Absolus)
+MATERIAUX_INDEX = {"densite_gros_granulats_tasse_sec_kg_m3": 1600.0, "sg_ciment": 3.15,
+                   "sg_sable": 2.63, "sg_gravier": 2.68, "absorption_gravier_pct": 1.0}
+
+# clé : (colonne de `aci_formulation_lot`, décimales du stockage entier)
+COLONNES_INDEX = {
+    "fc_mpa": ("f'c (MPa)", 1),
+    "slump_mm": ("Affaissement (mm)", 1),
+    "dmax_mm": ("Dmax (mm)", 1),
+    "mf_sable": ("Module de finesse", 2),
+    "exposition": ("Classe d'exposition", 0),   # code dans DOMAINE_ACI["exposition"]
+    "air_entraine": ("Air entraîné", 0),
+    "ec": ("Ratio E/C final", 2),
+    "air_pct": ("Teneur en air (%)", 1),
+    "eau_kg": ("Eau (kg)", 1),
+    "ciment_kg": ("Ciment (kg)", 1),
+    "sable_kg": ("Sable (kg)", 1),
+    "gravier_kg": ("Gravier (kg)", 1),
+}
+CATEGORIES_INDEX = ("exposition", "air_entraine")
+
+def empreinte_index(domaine=DOMAINE_ACI, materiaux=MATERIAUX_INDEX):
+    """SHA-256 des tables normatives ACI, du domaine, des matériaux et du format de l'index."""
+    tables = {nom: getattr(aci, nom) for nom in ("TABLE_5_3_3_EAU_AIR", "TABLE_5_3_4_RESISTANCE_EC",
+                                                 "TABLE_4_7_3_DURABILITE", "TABLE_5_3_6_VOL_GROS_GRANULATS")}
+    contenu = [VERSION_INDEX, tables, {k: np.asarray(v).tolist() for k, v in domaine.items()}, materiaux]
+    return hashlib.sha256(json.dumps(contenu, sort_keys=True, default=str).encode()).hexdigest()
+
+# =============================================
+# INDEX
+# =============================================
+@dataclass
+class IndexACI:
+    """
+    Grille ACI colonnaire : `entiers[clé]` (valeurs × 10^décimales, codes pour les catégories)
+    et `ordres[clé]`, permutation qui trie la colonne.
+    """
+    entiers: dict
+    ordres: dict
+    empreinte: str
+    domaine: dict = field(default_factory=lambda: DOMAINE_ACI)
+    _tries: dict = field(default_factory=dict, repr=False)
+
+    def __len__(self):
+        return len(self.entiers["fc_mpa"])
+
+    def _code(self, cle, valeur):
+        """Valeur de requête → entier stocké (code de catégorie ou valeur décimale mise à l'échelle)."""
+        if cle == "exposition":
+            codes = np.flatnonzero(self.domaine["exposition"] == str(valeur).upper())
+            return int(codes[0]) if len(codes) else -1
+        return int(round(float(valeur) * 10 ** COLONNES_INDEX[cle][1]))
+
+    def _plage(self, cle, bas, haut):
+        """Bornes [début, fin) dans l'ordre trié de la colonne pour bas ≤ valeur ≤ haut."""
+        if cle not in self._tries:
+            self._tries[cle] = self.entiers[cle][self.ordres[cle]]
+        tries = self._tries[cle]
+        debut = 0 if bas is None else np.searchsorted(tries, self._code(cle, bas), "left")
+        fin = len(tries) if haut is None else np.searchsorted(tries, self._code(cle, haut), "right")
+        return int(debut), int(max(fin, debut))
+
+    def lignes(self, **criteres):
+        """
+        Indices des lignes satisfaisant tous les critères : clé=(min, max) (None = ouvert)
+        ou clé=valeur / [valeurs] (égalité, catégories comprises).
+        """
+        inconnues = set(criteres) - set(COLONNES_INDEX)
+        if inconnues:
+            raise ValueError(f"Critères inconnus : {', '.join(sorted(inconnues))}")
+        intervalles, ensembles = {}, {}
+        for cle, critere in criteres.items():
+            if isinstance(critere, tuple):
+                intervalles[cle] = critere
+            else:
+                valeurs = np.atleast_1d(np.asarray(critere, dtype=object)).tolist()
+                ensembles[cle] = np.array([self._code(cle, v) for v in valeurs])
+                if len(valeurs) == 1:
+                    intervalles[cle] = (valeurs[0], valeurs[0])
+        if not intervalles:
+            candidats = np.arange(len(self))
+        else:
+            # Plage la plus sélective d'abord, les autres critères filtrent ses lignes
+            plages = {cle: self._plage(cle, *bornes) for cle, bornes in intervalles.items()}
+            pivot = min(plages, key=lambda cle: plages[cle][1] - plages[cle][0])
+            debut, fin = plages.pop(pivot)
+            candidats = np.sort(self.ordres[pivot][debut:fin])
+            for cle, (debut, fin) in plages.items():
+                tries = self._tries[cle]
+                if debut == fin:
+                    return candidats[:0]
+                valeurs = self.entiers[cle][candidats]
+                candidats = candidats[(valeurs >= tries[debut]) & (valeurs <= tries[fin - 1])]
+        for cle, codes in ensembles.items():
+            if len(codes) > 1:
+                candidats = candidats[np.isin(self.entiers[cle][candidats], codes)]
+        return candidats
+
+    def tableau(self, lignes=None):
+        """Lignes de la grille au format de `aci_formulation_lot` (valeurs décimales exactes)."""
+        lignes = slice(None) if lignes is None else lignes
+        colonnes = {}
+        for cle, (nom, decimales) in COLONNES_INDEX.items():
+            valeurs = self.entiers[cle][lignes]
+            if cle == "exposition":
+                colonnes[nom] = self.domaine["exposition"][valeurs]
+            elif cle == "air_entraine":
+                colonnes[nom] = valeurs.astype(bool)
+            else:
+                colonnes[nom] = valeurs / 10 ** decimales
+        return pd.DataFrame(colonnes)
+
+    def rechercher(self, **criteres):
+        """Formulations de la grille satisfaisant les critères de `lignes` (DataFrame)."""
+        return self.tableau(self.lignes(**criteres))
+
+    def combinaisons(self, par=("dmax_mm", "slump_mm", "exposition"), **criteres):
+        """
+        Recherche inverse : combinaisons distinctes des entrées `par` qui admettent au moins
+        une formulation satisfaisant les critères, avec leur nombre et les plages de f'c,
+        E/C et ciment correspondantes.
+        """
+        resultats = self.rechercher(**criteres)
+        groupes = [COLONNES_INDEX[cle][0] for cle in par]
+        return (resultats.groupby(groupes, sort=True)
+                .agg(**{"Formulations": ("Ciment (kg)", "size"),
+                        "f'c min (MPa)": ("f'c (MPa)", "min"), "f'c max (MPa)": ("f'c (MPa)", "max"),
+                        "E/C min": ("Ratio E/C final", "min"), "E/C max": ("Ratio E/C final", "max"),
+                        "Ciment min (kg)": ("Ciment (kg)", "min"), "Ciment max (kg)": ("Ciment (kg)", "max")})
+                .reset_index())
+
+# =============================================
+# CONSTRUCTION ET CHARGEMENT
+# =============================================
+def construire_index(domaine=DOMAINE_ACI, materiaux=MATERIAUX_INDEX):
+    """Calcule toute la grille en un appel à `aci_formulation_lot` et trie chaque colonne."""
+    axes = list(domaine)
+    grille = np.meshgrid(*(np.arange(len(domaine[axe])) for axe in axes), indexing="ij")
+    codes = {axe: g.ravel() for axe, g in zip(axes, grille)}
+    entrees = {axe: np.asarray(domaine[axe])[codes[axe]] for axe in axes}
+    resultats = aci.aci_formulation_lot(
+        entrees["fc_mpa"], entrees["exposition"], entrees["slump_mm"], entrees["dmax_mm"], entrees["mf_sable"],
+        materiaux["densite_gros_granulats_tasse_sec_kg_m3"], materiaux["sg_ciment"], materiaux["sg_sable"],
+        materiaux["sg_gravier"], materiaux["absorption_gravier_pct"], entrees["air_entraine"])
+    resultats["f'c (MPa)"], resultats["Affaissement (mm)"] = entrees["fc_mpa"], entrees["slump_mm"]
+
+    entiers = {}
+    for cle, (nom, decimales) in COLONNES_INDEX.items():
+        if cle in CATEGORIES_INDEX:
+            entiers[cle] = codes[cle].astype(np.int32)
+        else:
+            entiers[cle] = np.round(resultats[nom].to_numpy(dtype=float) * 10 ** decimales).astype(np.int32)
+    ordres = {cle: np.argsort(v, kind="stable").astype(np.int32) for cle, v in entiers.items()}
+    return IndexACI(entiers, ordres, empreinte_index(domaine, materiaux), dict(domaine))
+
+def enregistrer_index(index, chemin=FICHIER_INDEX_ACI):
+    """Écrit l'index (.npz non compressé : chargement en ~0,15 s) de façon atomique."""
+    temporaire = f"{chemin}.{os.getpid()}.tmp.npz"
+    np.savez(temporaire, empreinte=index.empreinte,
+                        **{f"valeurs_{cle}": v for cle, v in index.entiers.items()},
+                        **{f"ordre_{cle}": v for cle, v in index.ordres.items()})
+    os.replace(temporaire, chemin)
+
+def charger_index(chemin=FICHIER_INDEX_ACI, domaine=DOMAINE_ACI, materiaux=MATERIAUX_INDEX):
+    """
+    Index ACI depuis le disque ; reconstruit et réécrit si le fichier manque ou si son
+    empreinte ne correspond plus aux tables normatives, au domaine ou aux matériaux.
+    """
+    empreinte = empreinte_index(domaine, materiaux)
+    if os.path.exists(chemin):
+        with np.load(chemin, allow_pickle=False) as f:
+            if str(f["empreinte"]) == empreinte:
+                return IndexACI({cle: f[f"valeurs_{cle}"] for cle in COLONNES_INDEX},
+                                {cle: f[f"ordre_{cle}"] for cle in COLONNES_INDEX}, empreinte, dict(domaine))
+    index = construire_index(domaine, materiaux)
+    try:
+        enregistrer_index(index, chemin)
+    except OSError:
+        pass  # dossier en lecture seule : l'index reste en mémoire
+    return index
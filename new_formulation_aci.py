@@ -273,6 +273,118 @@ def aci_formulation(fc_mpa, exposition, slump_mm, dmax_mm, mf_sable,
         }
     }
 
+# =============================================
+# 🧮 CALCUL PAR LOTS (VECTORISÉ)
+# =============================================
+# Tables ACI sous forme de tableaux, dans l'ordre des clés des dictionnaires
+# (une recherche de clé la plus proche par argmin retient donc la même clé que min(..., key=abs))
+_DMAX_ACI = np.array(list(TABLE_5_3_3_EAU_AIR["non_air_entraine"]), dtype=float)
+_EAU_AIR_ACI = {  # type de béton → [eau, air F1 (ou air occlus), air F2/F3] par Dmax
+    type_beton: np.array([(v + v[-1:])[:3] for v in lignes.values()], dtype=float)
+    for type_beton, lignes in TABLE_5_3_3_EAU_AIR.items()
+}
+_MF_ACI = np.array(sorted(next(iter(TABLE_5_3_6_VOL_GROS_GRANULATS.values()))), dtype=float)
+_VOL_GG_ACI = np.array([[TABLE_5_3_6_VOL_GROS_GRANULATS[d][mf] for mf in _MF_ACI]
+                        for d in TABLE_5_3_3_EAU_AIR["non_air_entraine"]], dtype=float)
+
+def _cle_proche(cles, valeurs):
+    """Indice de la clé la plus proche (la première en cas d'égalité, comme min(..., key=abs))."""
+    return np.argmin(np.abs(cles[None, :] - valeurs[:, None]), axis=1)
+
+def _arrondi(x, decimales, flottant_python=True):
+    """
+    round() élément par élément, tel que l'applique `aci_formulation` : arrondi décimal exact
+    de Python pour les valeurs `flottant_python` (float), np.round pour les np.float64.
+    Les deux ne diffèrent qu'aux quasi-demis, seuls recalculés avec round().
+    """
+    x = np.asarray(x, dtype=float)
+    arrondi = np.round(x, decimales)
+    with np.errstate(invalid="ignore"):
+        ambigus = np.abs(np.abs(x * 10.0 ** decimales) % 1 - 0.5) < 1e-6
+    ambigus = np.flatnonzero(ambigus & flottant_python)
+    arrondi[ambigus] = [round(v, decimales) for v in x[ambigus].tolist()]
+    return arrondi
+
+def aci_formulation_lot(fc_mpa, exposition, slump_mm, dmax_mm, mf_sable,
+                        densite_gros_granulats_tasse_sec_kg_m3, sg_ciment,
+                        sg_sable, sg_gravier, absorption_gravier_pct, air_entraine=None):
+    """
+    `aci_formulation` pour N formulations à la fois (carnet de commandes, contrôles de masse).
+
+    Chaque paramètre est un scalaire ou un tableau de taille N ; sans `air_entraine`,
+    l'air est entraîné pour les classes F* (règle de la saisie console). Retourne un
+    DataFrame d'une ligne par formulation, colonnes des trois rubriques du résultat
+    scalaire (volumes préfixés « Volume »), valeurs identiques à `aci_formulation`.
+    """
+    exposition = np.asarray(exposition, dtype=object)
+    N = max(np.size(v) for v in (fc_mpa, exposition, slump_mm, dmax_mm, mf_sable,
+                                 densite_gros_granulats_tasse_sec_kg_m3, sg_ciment, sg_sable, sg_gravier,
+                                 absorption_gravier_pct, air_entraine if air_entraine is not None else 0))
+    num = lambda x: np.broadcast_to(np.asarray(x, dtype=float), (N,))
+    exposition = np.broadcast_to(exposition, (N,))
+    fc_mpa, slump_mm, dmax_mm, mf_sable = num(fc_mpa), num(slump_mm), num(dmax_mm), num(mf_sable)
+    densite_gg, sg_ciment, sg_sable, sg_gravier = (num(densite_gros_granulats_tasse_sec_kg_m3), num(sg_ciment),
+                                                   num(sg_sable), num(sg_gravier))
+    absorption_gravier_pct = num(absorption_gravier_pct)
+
+    # Classes d'exposition : une consultation de table par classe distincte
+    classes, code = np.unique(exposition.astype(str), return_inverse=True)
+    if air_entraine is None:
+        air_entraine = np.char.startswith(classes, "F")[code]
+    air_entraine = np.broadcast_to(np.asarray(air_entraine, dtype=bool), (N,))
+    classe_F23 = np.isin(classes, ["F2", "F3"])[code]
+    ec_table = np.array([np.nan if (v := TABLE_4_7_3_DURABILITE.get(c, [None])[0]) is None else v
+                         for c in classes.tolist()], dtype=float)[code]
+
+    # --- ÉTAPE 3: Eau de gâchage et teneur en air ---
+    i_dmax = _cle_proche(_DMAX_ACI, dmax_mm)
+    lignes = np.where(air_entraine[:, None], _EAU_AIR_ACI["air_entraine"][i_dmax],
+                      _EAU_AIR_ACI["non_air_entraine"][i_dmax])
+    eau_kg = lignes[:, 0] + ((slump_mm - 85.0) / 25.0) * 10.0
+    air_pct = np.where(air_entraine & classe_F23, lignes[:, 2], lignes[:, 1])
+
+    # --- ÉTAPE 4: Ratio E/C (minimum entre résistance & durabilité) ---
+    f_cr_mpa = fc_mpa + np.where(fc_mpa >= 35, 8.5, 7.0)
+    ec_resistance = {type_beton: np.interp(f_cr_mpa, *zip(*sorted(points.items())))
+                     for type_beton, points in TABLE_5_3_4_RESISTANCE_EC.items()}
+    ec_resistance = np.where(air_entraine, ec_resistance["air_entraine"], ec_resistance["non_air_entraine"])
+    ec_durabilite = np.where(np.isnan(ec_table), ec_resistance, ec_table)
+    python = ec_durabilite < ec_resistance  # min() retient le float de la table, sinon le np.float64 de np.interp
+    ec_final = np.where(python, ec_durabilite, ec_resistance)
+
+    # --- ÉTAPES 5 à 7: Ciment, gros granulats, sable par volumes absolus ---
+    # (le type de E/C se propage au ciment, puis aux volumes de ciment et de sable)
+    ciment_kg = _arrondi(eau_kg / ec_final, 1, python)
+    i_mf = _cle_proche(_MF_ACI, mf_sable)
+    m_gravier_sec = _VOL_GG_ACI[i_dmax, i_mf] * densite_gg
+    m_gravier_ssd = _arrondi(m_gravier_sec * (1 + absorption_gravier_pct / 100), 1)
+
+    v_eau = eau_kg / 1000.0
+    v_ciment = ciment_kg / (sg_ciment * 1000.0)
+    v_air = air_pct / 100.0
+    v_gravier = m_gravier_ssd / (sg_gravier * 1000.0)
+    v_sable = 1.0 - (v_eau + v_ciment + v_air + v_gravier)
+    v_sable = np.where(v_sable > 0.0, v_sable, 0.0)
+    m_sable_ssd = _arrondi(v_sable * sg_sable * 1000.0, 1, python)
+
+    return pd.DataFrame({
+        "Classe d'exposition": exposition,
+        "Dmax (mm)": _DMAX_ACI[i_dmax],
+        "Module de finesse": _MF_ACI[i_mf],
+        "Ratio E/C final": _arrondi(ec_final, 2, python),
+        "Teneur en air (%)": air_pct,
+        "Eau (kg)": _arrondi(eau_kg, 1),
+        "Ciment (kg)": ciment_kg,
+        "Sable (kg)": m_sable_ssd,
+        "Gravier (kg)": m_gravier_ssd,
+        "Volume Eau": _arrondi(v_eau, 3),
+        "Volume Ciment": _arrondi(v_ciment, 3, python),
+        "Volume Air": _arrondi(v_air, 3),
+        "Volume Sable": _arrondi(v_sable, 3, python),
+        "Volume Gravier": _arrondi(v_gravier, 3),
+        "Volume Total": _arrondi(v_eau + v_ciment + v_air + v_sable + v_gravier, 3, python),
+    })
+
 # =============================================
 # 🚀 LANCEMENT ET AFFICHAGE
 # =============================================
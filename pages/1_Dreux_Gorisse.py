@@ -1,11 +1,10 @@
 # app_dreux.py – Interface Streamlit Dreux-Gorisse (vibration + Kp + avertissements complets)
 # ─────────────────────────────────────────────────────────────────────────────────────────────
-import os, sys, importlib.util, builtins, io, contextlib, re
+import os, sys, time
 from io import BytesIO
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import streamlit as st
 
 from openpyxl import Workbook
@@ -14,32 +13,26 @@ from openpyxl.drawing.image import Image as XLImage
 
 # ── 1. Se placer dans le dossier du script
 
-# ── 2. Charger dynamiquement le moteur Dreux
-import os
-chemin_code = os.path.join(os.path.dirname(__file__), "..", "code_dreux_gorisse_final.py")
-spec = importlib.util.spec_from_file_location("dreux", chemin_code)
-
-dreux = importlib.util.module_from_spec(spec)
-sys.modules["dreux"] = dreux
-spec.loader.exec_module(dreux)
+# ── 2. Moteur Dreux importé une seule fois (ses caches, dont le modèle Copt, survivent aux réexécutions)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import code_dreux_gorisse_final as dreux
+import empilement_compressible as empilement
+import granulometrie_store as granulo
 
 # ── 3. Liste complète de tamis (option 3 du script)
-TAMIS = [
-    63, 50, 40, 31.5, 25, 20, 16, 12.5, 10, 8, 6.3, 5,
-    4, 2.5, 2, 1.25, 1, 0.63, 0.5, 0.315, 0.25, 0.16,
-    0.125, 0.08, 0.063
-]
-
-# ── 4. Fonction d’exécution (monkey-patch input())
-def run_dreux(inputs):
-    it = iter(inputs)
-    backup = builtins.input
-    builtins.input = lambda _="": next(it)
-    buf = io.StringIO()
-    with contextlib.redirect_stdout(buf):
-        dreux.main()
-    builtins.input = backup
-    return buf.getvalue()
+TAMIS = list(dreux.SERIES_TAMIS["Complète"])
+
+# ── 4. Lecture du tableau granulométrique (None = tamis non mesuré)
+def lire_granulats(df, colonnes):
+    return {c: [float(v) if pd.notna(v) else None for v in pd.to_numeric(df[c], errors="coerce")]
+            for c in colonnes}
+
+# ── 4-bis. Export de laboratoire → cube granulométrique (mis en cache par contenu de fichier)
+@st.cache_data(show_spinner="Lecture de l'export granulométrique…")
+def charger_analyses(contenu, nom):
+    fichier = BytesIO(contenu)
+    fichier.name = nom
+    return granulo.lire_granulometrie(fichier)
 
 # ── 5. Interface Streamlit
 st.set_page_config(page_title="🧱 Dreux-Gorisse", layout="wide")
@@ -58,9 +51,52 @@ st.sidebar.header("Paramètres K′")
 vibration = st.sidebar.selectbox("Vibration", ["faible", "normale", "puissante"], 1)
 pompabilite = st.sidebar.selectbox("Pompabilité", ["non", "pompable", "très pompable"], 0)
 
+st.sidebar.header("Proportions des granulats")
+METHODES_MELANGE = {"graphique": "Graphique Dreux (points 95 % / 5 %)",
+                    "OAB": "Moindres carrés – courbe OAB",
+                    "fuller": "Moindres carrés – Fuller",
+                    "andreasen": "Moindres carrés – Andreasen modifiée"}
+methode_melange = st.sidebar.selectbox("Méthode", list(METHODES_MELANGE), format_func=METHODES_MELANGE.get,
+                                       help="Les moindres carrés ajustent le mélange sur tous les tamis "
+                                            "(proportions ≥ 0, somme = 100 %).")
+cible_melange = None if methode_melange == "graphique" else methode_melange
+
+st.sidebar.header("Incertitudes (Monte Carlo)")
+mode_incertitude = st.sidebar.checkbox("Propager les erreurs de mesure", False)
+if mode_incertitude:
+    n_tirages = st.sidebar.number_input("Nombre de tirages", 1000, 100000, 10000, 1000)
+    sigma_passant = st.sidebar.number_input("Écart-type lecture tamis (points de %)", 0.0, 10.0,
+                                            dreux.SIGMA_PASSANT, 0.1)
+    sigma_rho = st.sidebar.number_input("Écart-type masses volumiques (%)", 0.0, 10.0, dreux.SIGMA_RHO * 100, 0.1)
+
+st.sidebar.header("Compacité (empilement compressible)")
+mode_compacite = st.sidebar.checkbox("Classer les mélanges par compacité", False,
+                                     help="Modèle d'empilement compressible de de Larrard, grille de mélanges "
+                                          f"au pas de {empilement.PAS_MELANGES:.0%}.")
+if mode_compacite:
+    serrage = st.sidebar.selectbox("Mise en place (indice de serrage K)", list(empilement.INDICES_SERRAGE), 3)
+
+st.sidebar.header("Matrice « et si… »")
+mode_scenarios = st.sidebar.checkbox("Comparer vibration × pompabilité × formes × affaissement", False)
+if mode_scenarios:
+    plage_aff = st.sidebar.slider("Plage d'affaissement (cm)", 0.0, 20.0, (4.0, 12.0), 0.5)
+    pas_aff = st.sidebar.number_input("Pas d'affaissement (cm)", 0.5, 10.0, 2.0, 0.5)
+
+st.sidebar.header("Calibration Copt")
+fichier_copt = st.sidebar.file_uploader("Table de la centrale (CSV/XLSX)", type=["csv", "xlsx"],
+                                        help="Colonnes : C/E, Affaissement (cm), Copt (kg/m³). "
+                                             "Sans fichier : table Dreux à 3 points.")
+calibration_Copt = None
+if fichier_copt is not None:
+    try:
+        calibration_Copt = dreux.lire_calibration_Copt(fichier_copt)
+        st.sidebar.caption(f"✅ {len(calibration_Copt.valeurs)} points chargés ({calibration_Copt.nom})")
+    except ValueError as exc:
+        st.sidebar.error(str(exc))
+
 # 5-B. Tableau granulométrique
-st.subheader("Granulométrie (2 à 4 granulats)")
-n_gr = st.number_input("Nombre de granulats", 2, 4, 3, 1)
+st.subheader(f"Granulométrie (2 à {dreux.MAX_GRANULATS} granulats)")
+n_gr = st.number_input("Nombre de granulats", 2, dreux.MAX_GRANULATS, 3, 1)
 g_cols = [f"G{i+1}" for i in range(n_gr)]
 
 df_init = pd.DataFrame(
@@ -80,118 +116,151 @@ for i, col in enumerate(st.columns(n_gr)):
     )
 
 # ── 6. Bouton Calcul
+# Après le premier calcul, chaque modification de paramètre met le résultat à jour (essais « et si… »)
 if st.button("🚀 Lancer le calcul Dreux-Gorisse"):
+    st.session_state["dreux_actif"] = True
+
+if st.session_state.get("dreux_actif"):
 
-    # 6-A. Calcul automatique du module de finesse Mf sur G1
-    g1_num = pd.to_numeric(granulo_df["G1"], errors="coerce").fillna(0)
-    passants = 100 - g1_num
-    def pct(t):
-        idx = np.where(np.isclose(granulo_df["Tamis (mm)"].astype(float), t, atol=1e-6))[0]
-        return float(passants.iloc[idx[0]]) if idx.size else 0.0
-    mf_auto = round((pct(2)+pct(1)+pct(0.5)+pct(0.25)+pct(0.125))/100, 2)
-
-    # 6-B. Construire la liste d’inputs pour le script
-    inp = ["3", str(n_gr)]
-    for g in g_cols:
-        inp.append(g)
-        inp.extend([str(v) if pd.notna(v) else "" for v in granulo_df[g]])
-    inp += [
-        str(fc28), qual, cim, str(aff_cm),
-        type_s, type_g,
-        *map(str, rho_vals),
-        type_s, vibration, str(mf_auto), pompabilite
-    ]
-
-    # 6-C. Exécution du moteur
-    console = run_dreux(inp)
-
-    # 6-D. Extraire tableau de synthèse et avertissements
-    synth, warnings_txt = None, ""
-    m_table = re.search(r"RÉSULTATS FINAUX\s*:\s*\n(.*)", console, re.S)
-    if m_table:
-        raw = pd.read_fwf(io.StringIO(m_table.group(1)))
-        # repérer la ligne Avertissements
-        warn_row = raw[raw.iloc[:,0].str.contains("Avertissements", na=False)]
-        if not warn_row.empty:
-            warnings_txt = " ".join(
-                str(warn_row.iloc[0][c]) for c in raw.columns if pd.notna(warn_row.iloc[0][c])
-            ).strip()
-            raw = raw.drop(warn_row.index)
-        # Nettoyer les colonnes inutiles
-        cols = raw.columns
-        def last_val(row):
-            for c in cols[::-1]:
-                val = str(row[c]).strip()
-                if val and val.lower() != "nan":
-                    return val
-            return ""
-        synth = pd.DataFrame({
-            "Description": raw[cols[0]],
-            "Valeur": raw.apply(last_val, axis=1)
-        })
-
-    # 6-E. Extraire les coefficients K, Ks, Kp, K′
-    m_coef = re.search(r"K=([-\d.]+).*Ks=([-\d.]+).*Kp=([-\d.]+).*K'=\s*([-\d.]+)", console)
-    if m_coef:
-        K, Ks, Kp, Kprime = map(float, m_coef.groups())
-    else:
-        K = Ks = Kp = Kprime = None
-
-    # 6-F. Affichage
-    st.success(f"✅ Calcul terminé – Mf = {mf_auto} | Vibration : {vibration}, Pompabilité : {pompabilite}")
-    if synth is not None:
-        st.table(synth)
+    # 6-B. Calcul Dreux-Gorisse incrémental : seules les étapes en aval des entrées modifiées sont refaites
+    granulats = lire_granulats(granulo_df, g_cols)
+    rho_granulats = dict(zip(g_cols, map(float, rho_vals)))
+    options = dict(vibration=vibration, pompabilite=pompabilite, qualite_granulats=qual,
+                   calibration_Copt=calibration_Copt, cible_melange=cible_melange)
+    entrees = dict(diams=TAMIS, granulats=granulats, fc28=fc28, denomination_ciment=cim, affaissement_cm=aff_cm,
+                   type_sable=type_s, type_gravier=type_g, rho_granulats=rho_granulats, **options)
+    t0 = time.perf_counter()
+    if "graphe_dreux" not in st.session_state:
+        st.session_state["graphe_dreux"] = dreux.GrapheDreux(**entrees)
+    graphe = st.session_state["graphe_dreux"].modifier(**entrees)
+    res = graphe.resultat()
+    duree_ms = (time.perf_counter() - t0) * 1e3
+    synth = res.tableau()
+    warnings_txt = " / ".join(res.warnings)
+    synth = synth[synth["Description"] != "Avertissements"]
+    K, Ks, Kp, Kprime = (res.coefficients_K[k] for k in ("K", "Ks", "Kp", "Kprime"))
+
+    # 6-C. Affichage
+    st.success(f"✅ Calcul terminé – Mf = {res.mfs:.2f} (G1) | Vibration : {vibration}, Pompabilité : {pompabilite}")
+    st.table(synth)
 
     if warnings_txt:
         st.warning(f"{warnings_txt}")
 
-    if Kprime is not None:
-        met1, met2, met3, met4 = st.columns(4)
-        met1.metric("K",     f"{K:.2f}")
-        met2.metric("Ks",    f"{Ks:.2f}")
-        met3.metric("Kp",    f"{Kp:.2f}")
-        met4.metric("K′",    f"{Kprime:.2f}")
-
-    # 6-G. Graphe
-    fig = plt.gcf()
-    st.pyplot(fig)
-
-    # 6-H. Export PNG
-    buf_png = BytesIO()
-    fig.savefig(buf_png, format="png", dpi=300, bbox_inches="tight")
-    st.download_button("📥 Télécharger courbe (PNG)",
-                       buf_png.getvalue(), "courbe_dreux.png", "image/png")
-
-    # 6-I. Export Excel
-    wb = Workbook()
-    ws_syn = wb.active
-    ws_syn.title = "Synthese"
-    if synth is not None:
+    met1, met2, met3, met4 = st.columns(4)
+    met1.metric("K",     f"{K:.2f}")
+    met2.metric("Ks",    f"{Ks:.2f}")
+    met3.metric("Kp",    f"{Kp:.2f}")
+    met4.metric("K′",    f"{Kprime:.2f}")
+
+    # 6-D. Graphe (rendu une fois par résultat, puis servi depuis le cache du module)
+    st.image(dreux.exporter_figure(res, "png", dpi=120))
+
+    # 6-E. Exports PNG / SVG, rendus seulement au téléchargement
+    exp1, exp2, exp3 = st.columns(3)
+    exp1.download_button("📥 Télécharger courbe (PNG)", lambda: dreux.exporter_figure(res, "png"),
+                         "courbe_dreux.png", "image/png", on_click="ignore")
+    exp2.download_button("📥 Télécharger courbe (SVG)", lambda: dreux.exporter_figure(res, "svg"),
+                         "courbe_dreux.svg", "image/svg+xml", on_click="ignore")
+
+    # 6-F. Export Excel
+    def synthese_xlsx():
+        wb = Workbook()
+        ws_syn = wb.active
+        ws_syn.title = "Synthese"
         for r in dataframe_to_rows(synth, index=False, header=True):
             ws_syn.append(r)
-        if Kprime is not None:
-            ws_syn.append(["K'", Kprime])
-    # Feuille Avertissements
-    ws_warn = wb.create_sheet("Avertissements")
-    if warnings_txt:
-        for i, line in enumerate(warnings_txt.splitlines(), start=1):
-            ws_warn[f"A{i}"] = line
-    else:
-        ws_warn["A1"] = "RAS"
-    # Feuille Granulo
-    ws_gra = wb.create_sheet("Granulo")
-    ws_gra.append(["Tamis (mm)", *g_cols])
-    for _, row in granulo_df.iterrows():
-        ws_gra.append([row["Tamis (mm)"], *row[g_cols].tolist()])
-    # Image dans Synthese
-    ws_syn.add_image(XLImage(buf_png), "F2")
-
-    buf_xlsx = BytesIO()
-    wb.save(buf_xlsx)
-    st.download_button("📥 Télécharger synthèse (XLSX)",
-                       buf_xlsx.getvalue(), "dreux_synthese.xlsx",
-                       "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-
-    # 6-J. Console brute
-    with st.expander("🔍 Sortie console complète"):
-        st.text(console)
+        ws_syn.append(["K'", Kprime])
+        # Feuille Avertissements
+        ws_warn = wb.create_sheet("Avertissements")
+        if res.warnings:
+            for i, line in enumerate(res.warnings, start=1):
+                ws_warn[f"A{i}"] = line
+        else:
+            ws_warn["A1"] = "RAS"
+        # Feuille Granulo
+        ws_gra = wb.create_sheet("Granulo")
+        ws_gra.append(["Tamis (mm)", *g_cols])
+        for _, row in granulo_df.iterrows():
+            ws_gra.append([row["Tamis (mm)"], *row[g_cols].tolist()])
+        # Image dans Synthese
+        ws_syn.add_image(XLImage(BytesIO(dreux.exporter_figure(res, "png"))), "F2")
+
+        buf_xlsx = BytesIO()
+        wb.save(buf_xlsx)
+        return buf_xlsx.getvalue()
+
+    exp3.download_button("📥 Télécharger synthèse (XLSX)", synthese_xlsx, "dreux_synthese.xlsx",
+                         "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", on_click="ignore")
+
+    # 6-G. Journal du calcul
+    with st.expander("🔍 Journal du calcul"):
+        st.text("\n".join(res.messages) or "RAS")
+        st.caption(f"⚡ {len(graphe.recalculees)} étape(s) recalculée(s) en {duree_ms:.1f} ms : "
+                   f"{', '.join(graphe.recalculees) or 'aucune'}")
+
+    # 6-H. Incertitudes : tous les tirages calculés en un seul lot (Mf recalculé sur G1 bruité)
+    if mode_incertitude:
+        inc = dreux.incertitude_dreux(TAMIS, granulats, fc28, cim, aff_cm, type_s, type_g, rho_granulats,
+                                      n=int(n_tirages), sigma_passant=sigma_passant, sigma_rho=sigma_rho / 100,
+                                      seed=0, **options)
+        st.subheader(f"🎲 Incertitudes – {int(n_tirages)} tirages Monte Carlo")
+        st.dataframe(inc["tableau"].round(3), use_container_width=True, hide_index=True)
+
+    # 6-I. Compacité du squelette : proportions Dreux vs meilleurs mélanges de la grille (MEC)
+    if mode_compacite:
+        K_serrage = empilement.INDICES_SERRAGE[serrage]
+        mesures = {nom: g for nom, g in granulats.items() if any(v is not None for v in g)}
+        squelette = empilement.squelette_granulaire(
+            TAMIS, mesures, formes={nom: type_s if i == 0 else type_g for i, nom in enumerate(mesures)})
+        phi_dreux = float(squelette.compacite([res.proportions.get(nom, 0.0) for nom in mesures], K_serrage))
+        classement = empilement.classer_melanges(squelette, K=K_serrage, n=10)
+        phi_max = classement["Compacité Φ"].iloc[0]
+        st.subheader("🧩 Compacité du squelette – modèle d'empilement compressible")
+        cmp1, cmp2 = st.columns(2)
+        cmp1.metric("Φ des proportions Dreux", f"{phi_dreux:.4f}")
+        cmp2.metric("Φ du mélange le plus compact", f"{phi_max:.4f}", f"{phi_max - phi_dreux:+.4f}")
+        st.dataframe(classement.round(4), use_container_width=True, hide_index=True)
+
+    # 6-J. Matrice « et si… » : tous les scénarios en un seul calcul par lots
+    if mode_scenarios:
+        affaissements = np.arange(plage_aff[0], plage_aff[1] + pas_aff / 2, pas_aff)
+        matrice = dreux.matrice_scenarios(TAMIS, granulats, fc28, cim, rho_granulats, affaissements=affaissements,
+                                          qualite_granulats=qual, calibration_Copt=calibration_Copt,
+                                          cible_melange=cible_melange)
+        st.subheader(f"🔀 Matrice « et si… » – {len(matrice)} scénarios")
+        st.dataframe(matrice.drop(columns=["Messages"]).round(2), use_container_width=True, hide_index=True)
+        st.download_button("📥 Télécharger la matrice (CSV)",
+                           matrice.to_csv(index=False, sep=";", decimal=",").encode("utf-8-sig"),
+                           "dreux_scenarios.csv", "text/csv", on_click="ignore")
+
+# ── 7. Calcul par lots (exports de laboratoire)
+st.divider()
+st.subheader("📚 Calcul par lots – analyses de laboratoire")
+fichier_lot = st.file_uploader("Export granulométrique (CSV/XLSX, une ligne par mesure)", type=["csv", "xlsx"],
+                               help="Colonnes : Échantillon, Granulat, Tamis (mm), Passant (%). "
+                                    "Les paramètres béton de la barre latérale s'appliquent à tous les échantillons.")
+if fichier_lot is not None:
+    try:
+        analyses = charger_analyses(fichier_lot.getvalue(), fichier_lot.name)
+    except ValueError as exc:
+        st.error(str(exc))
+        st.stop()
+    st.caption(f"✅ {len(analyses)} échantillons · granulats (du plus fin au plus gros) : "
+               f"{', '.join(analyses.granulats)} · {len(analyses.tamis)} tamis")
+
+    rho_lot = [col.number_input(f"ρ {nom}", 50, 3000, 2650 if i == 0 else 2600, 50, key=f"rho_lot_{nom}")
+               for i, (col, nom) in enumerate(zip(st.columns(len(analyses.granulats)), analyses.granulats))]
+
+    if st.button("🚀 Calculer tous les échantillons"):
+        resultats_lot = analyses.calculer_dreux(
+            fc28=fc28, denomination_ciment=cim, affaissement_cm=aff_cm, type_sable=type_s, type_gravier=type_g,
+            rho_granulats=np.array(rho_lot, dtype=float), vibration=vibration, pompabilite=pompabilite,
+            qualite_granulats=qual, calibration_Copt=calibration_Copt, cible_melange=cible_melange,
+        )
+        n_alertes = int((resultats_lot["Avertissements"] != "✅ OK").sum())
+        st.success(f"✅ {len(resultats_lot)} formulations calculées – {n_alertes} avec avertissements")
+        st.dataframe(resultats_lot, use_container_width=True)
+        st.download_button("📥 Télécharger les résultats (CSV)",
+                           resultats_lot.to_csv(index=False, sep=";", decimal=",").encode("utf-8-sig"),
+                           "dreux_lot.csv", "text/csv")
@@ -2,7 +2,9 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from new_formulation_aci import aci_formulation
+import index_aci
 import io
+import time
 
 st.set_page_config(page_title="Méthode des Volumes Absolus", page_icon="📊", layout="wide")
 
@@ -289,6 +291,42 @@ if submitted:
         - Que la combinaison de paramètres est cohérente
         """)
 
+# Recherche inverse dans l'abaque précalculé
+@st.cache_resource(show_spinner="Chargement de l'abaque ACI…")
+def abaque_aci(empreinte):
+    return index_aci.charger_index()
+
+st.markdown("---")
+st.markdown("### 🔎 Recherche inverse – abaque ACI précalculé")
+abaque = abaque_aci(index_aci.empreinte_index())
+st.caption(f"{len(abaque):,} formulations précalculées (f'c × affaissement × Dmax × Mf × exposition × air), ".replace(",", " ", 1)
+           + f"matériaux de référence : gravier sec tassé {index_aci.MATERIAUX_INDEX['densite_gros_granulats_tasse_sec_kg_m3']:.0f} kg/m³, "
+           f"absorption {index_aci.MATERIAUX_INDEX['absorption_gravier_pct']} %.")
+
+col_r1, col_r2, col_r3 = st.columns(3)
+with col_r1:
+    plage_fc = st.slider("f'c (MPa)", 10.0, 80.0, (30.0, 80.0), 1.0)
+    plage_ciment = st.slider("Ciment (kg/m³)", 0.0, 800.0, (0.0, 380.0), 5.0)
+with col_r2:
+    plage_slump = st.slider("Affaissement (mm)", 0.0, 250.0, (0.0, 250.0), 10.0)
+    classes_recherche = st.multiselect("Classes d'exposition", list(exposition_options),
+                                       default=list(exposition_options))
+with col_r3:
+    choix_air = st.radio("Air entraîné", ["Indifférent", "Oui", "Non"], horizontal=True)
+    regroupement = st.multiselect("Combinaisons de", ["dmax_mm", "slump_mm", "exposition", "mf_sable", "air_entraine"],
+                                  default=["dmax_mm", "slump_mm", "exposition"],
+                                  format_func=lambda cle: index_aci.COLONNES_INDEX[cle][0])
+
+criteres = {"fc_mpa": plage_fc, "ciment_kg": plage_ciment, "slump_mm": plage_slump,
+            "exposition": classes_recherche}
+if choix_air != "Indifférent":
+    criteres["air_entraine"] = choix_air == "Oui"
+if classes_recherche and regroupement:
+    t0 = time.perf_counter()
+    combinaisons = abaque.combinaisons(par=regroupement, **criteres)
+    st.caption(f"⚡ {len(combinaisons)} combinaison(s) trouvée(s) en {(time.perf_counter() - t0) * 1e3:.0f} ms")
+    st.dataframe(combinaisons, use_container_width=True, hide_index=True)
+
 # Section d'information
 st.markdown("---")
 st.markdown("### 📚 Informations complémentaires")
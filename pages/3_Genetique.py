@@ -1,8 +1,11 @@
 # app_genetique.py  –  Interface Streamlit (GA béton) – dynamique & export XLSX
-import os, sys, importlib.util, builtins, io, contextlib, re
+import os, sys, importlib.util, tempfile
 from io import BytesIO
 import streamlit as st
 import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 
 # ── 1. Toujours travailler dans le dossier du script
 
@@ -16,36 +19,94 @@ ga_beton = importlib.util.module_from_spec(spec)
 sys.modules["ga_beton"] = ga_beton
 spec.loader.exec_module(ga_beton)
 
-# ── 3. Monkey-patch input() pour nourrir le script
-def run_optim(inputs_list):
-    ans_iter = iter(inputs_list)
-    backup = builtins.input
-    builtins.input = lambda _="": next(ans_iter)
-    buf = io.StringIO()
-    with contextlib.redirect_stdout(buf):
-        ga_beton.run_optimization()
-    builtins.input = backup
-    return buf.getvalue()
-
-# ── 4. Parsing des infos utiles
-def parse_results(txt):
-    def grab(pat, cast=float):
-        m = re.search(pat, txt)
-        return cast(m.group(1)) if m else None
+# ── 3. Synthèse structurée des résultats de l'API
+def resume_resultats(res):
+    best, ind = res["best"], res["indicateurs"]
     return {
-        "Ciment (kg/m³)"       : grab(r"Ciment\s*:\s*([\d.]+)"),
-        "Eau (kg/m³)"          : grab(r"Eau\s*:\s*([\d.]+)"),
-        "Sable (kg/m³)"        : grab(r"Sable\s*:\s*([\d.]+)"),
-        "Gravier (kg/m³)"      : grab(r"Gravier\s*:\s*([\d.]+)"),
-        "E/C"                  : grab(r"E/C\s*=\s*([\d.]+)"),
-        "Ratio G/S (vol)"      : grab(r"Ratio G/S \(volumique\)\s*:\s*([\d.]+)"),
-        "Ratio S/G masse (%)"  : grab(r"Ratio Sable/Gravier \(masse\)\s*:\s*([\d.]+)"),
-        "Résistance (MPa)"     : grab(r"Résistance\s*:\s*([\d.]+)"),
-        "Affaissement (mm)"    : grab(r"Affaissement\s*:\s*([\d.]+)"),
-        "Coût (FCFA/m³)"       : grab(r"Coût total\s*:\s*([0-9,\s]+)", cast=lambda s: float(s.replace(",","")))
+        "Ciment (kg/m³)"       : round(best["cement"]),
+        "Eau (kg/m³)"          : round(best["water"]),
+        "Sable (kg/m³)"        : round(best["sand"]),
+        "Gravier (kg/m³)"      : round(best["gravel"]),
+        "E/C"                  : ind["E_C"],
+        "Ratio G/S (vol)"      : round(ind["GS_real"], 2),
+        "Ratio S/G masse (%)"  : round(ind["S_ratio"] * 100, 1),
+        "Résistance (MPa)"     : round(ind["strength"], 1),
+        "Affaissement (mm)"    : round(ind["slump"]),
+        "Coût (FCFA/m³)"       : ind["cost"],
+        "CO₂ (kg/m³)"          : round(ind["co2"], 1),
+        "Sources"              : ", ".join(best.get("sources", {}).values()) or "—"
     }
 
-# ── 5. Interface Streamlit (sans st.form)
+# ── 4. Carte du paysage de la fitness autour de l'optimum
+def afficher_paysage(res):
+    with st.expander("🗺️ Paysage de la fitness autour de l’optimum"):
+        axes = list(ga_beton.AXES_PAYSAGE)
+        noms = lambda k: ga_beton.AXES_PAYSAGE[k]["name"]
+        colX, colY, colN = st.columns(3)
+        axe_x = colX.selectbox("Axe horizontal", axes, axes.index("E_C"), format_func=noms, key="paysage_x")
+        axe_y = colY.selectbox("Axe vertical", axes, axes.index("S_ratio"), format_func=noms, key="paysage_y")
+        n = colN.select_slider("Résolution", [100, 200, 500, 1000], 200, key="paysage_n")
+        try:
+            carte = ga_beton.carte_paysage(res, axe_x, axe_y, n)
+        except ValueError as exc:
+            st.warning(str(exc))
+            return
+
+        # Fitness masquée là où une pénalité s'applique ; pénalités en carte séparée
+        admissible = carte["penalites"] == 0
+        fitness = np.where(admissible, carte["fitness"], np.nan).astype(np.float32)
+        fig = make_subplots(rows=1, cols=2, subplot_titles=("Fitness (zone admissible)", "Pénalités actives"))
+        fig.add_trace(go.Heatmap(x=carte["x"], y=carte["y"], z=fitness, colorscale="Viridis",
+                                 colorbar=dict(x=0.45, title="Fitness")), 1, 1)
+        fig.add_trace(go.Heatmap(x=carte["x"], y=carte["y"], z=carte["penalites"], colorscale="Reds",
+                                 showscale=False,
+                                 hovertemplate="code=%{z} (1 E/C, 2 G/S, 4 masse, 8 CO₂, 16 bornes)<extra></extra>"), 1, 2)
+        opt = dict(x=[ga_beton.coordonnees_optimum(res, axe_x)], y=[ga_beton.coordonnees_optimum(res, axe_y)],
+                   mode="markers", marker=dict(symbol="x", size=12, color="white", line=dict(width=2)),
+                   name="Optimum", showlegend=False)
+        fig.add_trace(go.Scatter(**opt), 1, 1)
+        fig.add_trace(go.Scatter(**opt), 1, 2)
+        fig.update_xaxes(title_text=noms(axe_x))
+        fig.update_yaxes(title_text=noms(axe_y))
+        st.plotly_chart(fig, use_container_width=True)
+        if not admissible.any():
+            st.info("Aucun point admissible sur ce plan : l’optimum est sur une arête des contraintes.")
+
+# ── 5. Population au fil des générations (sous-échantillonnée côté serveur, rendu WebGL)
+def afficher_population(res):
+    if res.get("population") is None:
+        return
+    with st.expander("📈 Population au fil des générations"):
+        n_gen = int(res["population"]["generation"][-1]) + 1
+        colP, colG = st.columns(2)
+        max_points = colP.select_slider("Points affichés (max)", [5000, 10000, 20000, 50000],
+                                        ga_beton.MAX_POINTS_POPULATION, key="pop_max_points")
+        gen_min, gen_max = colG.slider("Générations", 0, n_gen - 1, (0, n_gen - 1), key="pop_generations") \
+            if n_gen > 1 else (0, 0)
+        masque_gen = (res["population"]["generation"] >= gen_min) & (res["population"]["generation"] <= gen_max)
+        sous_pop = {**res, "population": {**res["population"],
+                                          **{k: res["population"][k][masque_gen] for k in ("X", "fitness", "generation")}}}
+        ech = ga_beton.echantillonner_population(sous_pop, max_points)
+        adm = ech["admissible"]
+
+        fig = go.Figure()
+        fig.add_trace(go.Scattergl(
+            x=ech["E_C"][~adm], y=ech["cost"][~adm], mode="markers", name="Pénalisés",
+            marker=dict(size=3, color="lightgray", opacity=0.4),
+            customdata=ech["generation"][~adm], hovertemplate="E/C=%{x:.3f}<br>Coût=%{y:,.0f}<br>Génération %{customdata}<extra></extra>"))
+        fig.add_trace(go.Scattergl(
+            x=ech["E_C"][adm], y=ech["cost"][adm], mode="markers", name="Admissibles",
+            marker=dict(size=4, color=ech["fitness"][adm], colorscale="Viridis", colorbar=dict(title="Fitness"), opacity=0.7),
+            customdata=np.stack([ech["generation"][adm], ech["fitness"][adm]], axis=-1),
+            hovertemplate="E/C=%{x:.3f}<br>Coût=%{y:,.0f}<br>Génération %{customdata[0]}<br>Fitness %{customdata[1]:.3f}<extra></extra>"))
+        fig.add_trace(go.Scattergl(x=[res["indicateurs"]["E_C"]], y=[res["indicateurs"]["cost"]], mode="markers",
+                                   name="Optimum", marker=dict(symbol="x", size=12, color="red")))
+        fig.update_layout(xaxis_title="E/C", yaxis_title="Coût (FCFA/m³)")
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"{len(ech['E_C']):,} individus affichés sur {ech['n_total']:,} évalués "
+                   f"(générations {gen_min}–{gen_max}, meilleurs de chaque génération toujours conservés).")
+
+# ── 6. Interface Streamlit (sans st.form)
 st.set_page_config(page_title="🧬 Optimiseur Béton (GA)", layout="wide")
 st.title("🧬 Formulation Béton – Algorithme Génétique")
 
@@ -59,7 +120,7 @@ with col2:
     slump = st.number_input("Affaissement cible (mm)", 50, 200, 100, 5)
     profile_choice = st.selectbox(
         "Profil d’optimisation",
-        ["1 – Résistance", "2 – Ouvrabilité", "3 – Économie", "4 – Équilibré"], 3
+        ["1 – Résistance", "2 – Ouvrabilité", "3 – Économie", "4 – Équilibré", "5 – Bas carbone"], 3
     )
 
 # ---- Valeurs typiques dynamiques
@@ -105,43 +166,130 @@ mf    = st.slider("Module de finesse sable (Mf)", 2.0, 3.5, 2.5, 0.05)
 rho_s = st.number_input("ρ sable (kg/m³)",   0.0, value=1600.0, step=10.0)
 rho_g = st.number_input("ρ gravier (kg/m³)", 0.0, value=1500.0, step=10.0)
 
-# ------------- 5) Paramètres GA -------------
-with st.expander("5️⃣ Paramètres de l’algorithme génétique (avancé)", expanded=True):
+# ------------- 5) Empreinte carbone -------------
+st.subheader("5️⃣ Empreinte carbone (kg CO₂-eq/kg)")
+col_co2a, col_co2b = st.columns(2)
+with col_co2a:
+    co2_c = st.number_input("Ciment (kg CO₂/kg)",  value=ga_beton.FACTEURS_CO2["cement"], step=0.01, min_value=0.0, format="%.3f")
+    co2_w = st.number_input("Eau (kg CO₂/kg)",     value=ga_beton.FACTEURS_CO2["water"],  step=0.0001, min_value=0.0, format="%.4f")
+with col_co2b:
+    co2_s = st.number_input("Sable (kg CO₂/kg)",   value=ga_beton.FACTEURS_CO2["sand"],   step=0.001, min_value=0.0, format="%.3f")
+    co2_g = st.number_input("Gravier (kg CO₂/kg)", value=ga_beton.FACTEURS_CO2["gravel"], step=0.001, min_value=0.0, format="%.3f")
+max_co2 = st.number_input("Plafond CO₂ (kg CO₂-eq/m³) – 0 = aucun", value=0.0, step=10.0, min_value=0.0,
+                          help="Contrainte dure ; utiliser le profil « Bas carbone » pour la pondérer.")
+
+# ------------- 5 bis) Choix discrets des matériaux -------------
+with st.expander("🏷️ Choix du ciment et des sources de granulats (optimisé dans le même calcul)"):
+    sourcing = st.checkbox("Optimiser aussi le choix des matériaux", value=False,
+                           help="Chaque option apporte son coût, son CO₂, sa masse volumique et (ciment) sa classe de résistance.")
+    df_ciments = st.data_editor(pd.DataFrame({
+        "Ciment": [c["name"] for c in ga_beton.CIMENTS_DEFAUT],
+        "Disponible": [True] * len(ga_beton.CIMENTS_DEFAUT),
+        "Coût (FCFA/kg)": [c["cost"] for c in ga_beton.CIMENTS_DEFAUT],
+        "CO₂ (kg/kg)": [c["co2"] for c in ga_beton.CIMENTS_DEFAUT],
+    }), num_rows="fixed", disabled=["Ciment"], key="src_ciments", use_container_width=True)
+    df_sables = st.data_editor(pd.DataFrame({
+        "Sable": ["Sable roulé (saisi)", "Sable concassé"],
+        "Coût (FCFA/kg)": [cost_s, 7.0], "CO₂ (kg/kg)": [co2_s, 0.008], "ρ (kg/m³)": [rho_s, 1500.0],
+    }), num_rows="dynamic", key="src_sables", use_container_width=True)
+    df_graviers = st.data_editor(pd.DataFrame({
+        "Gravier": ["Gravier concassé (saisi)", "Gravier roulé"],
+        "Coût (FCFA/kg)": [cost_g, 7.5], "CO₂ (kg/kg)": [co2_g, 0.005], "ρ (kg/m³)": [rho_g, 1450.0],
+    }), num_rows="dynamic", key="src_graviers", use_container_width=True)
+
+def options_granulats(df, colonne):
+    df = df.dropna()
+    return [{"name": str(r[colonne]), "cost": float(r["Coût (FCFA/kg)"]), "co2": float(r["CO₂ (kg/kg)"]),
+             "rho": float(r["ρ (kg/m³)"])} for _, r in df.iterrows()]
+
+# ------------- 6) Paramètres GA -------------
+bornes_saisies = {
+    "target_strength": fc28, "D_max": dmax,
+    "min_cement": min_c, "max_cement": max_c, "min_water": min_w, "max_water": max_w,
+    "min_sand": min_s, "max_sand": max_s, "min_gravel": min_g, "max_gravel": max_g,
+}
+regles = ga_beton.parametres_regles(bornes_saisies)
+with st.expander("6️⃣ Paramètres de l’algorithme génétique (avancé)", expanded=True):
+    st.caption(f"🎛️ Valeurs réglées pour la classe « {ga_beton.classe_probleme(bornes_saisies)} »")
     colA, colB = st.columns(2)
     with colA:
-        pop_size = st.number_input("POP_SIZE", 20, 500, 100, 10,
+        pop_size = st.number_input("POP_SIZE", 20, 500, int(regles["POP_SIZE"]), 10,
                                    help="Nombre de solutions testées par génération.")
-        mut_rate = st.slider("MUTATION_RATE", 0.05, 0.5, 0.15, 0.01,
+        mut_rate = st.slider("MUTATION_RATE", 0.05, 0.5, float(regles["MUTATION_RATE"]), 0.01,
                              help="Probabilité de mutation.")
     with colB:
-        gen_nbr  = st.number_input("N_GENERATIONS", 10, 500, 80, 10,
+        gen_nbr  = st.number_input("N_GENERATIONS", 10, 500, int(regles["N_GENERATIONS"]), 10,
                                    help="Nombre d'itérations.")
-        n_parent = st.number_input("N_PARENTS", 5, 200, 20, 1,
+        n_parent = st.number_input("N_PARENTS", 2, 200, int(regles["N_PARENTS"]), 1,
                                    help="Meilleures solutions conservées.")
+    methode = st.selectbox(
+        "Moteur d’optimisation", list(ga_beton.OPTIMISEURS),
+        format_func=lambda k: ga_beton.OPTIMISEURS[k]["name"],
+        help="Tous les moteurs partagent le même objectif vectorisé."
+    )
+    colC, colD, colE = st.columns(3)
+    with colC:
+        reprise = st.checkbox("💾 Point de reprise", value=False, disabled=not ga_beton.OPTIMISEURS[methode]["reprise"],
+                              help="Sauvegarde l’état du GA et reprend automatiquement un calcul interrompu.")
+    with colD:
+        intervalle_reprise = st.number_input("Intervalle (générations)", 1, 500, 10, 1)
+    with colE:
+        graine = st.number_input("Graine aléatoire", 0, 2**31 - 1, 0, 1,
+                                 help="Même graine + mêmes entrées ⇒ même résultat, avec ou sans reprise.")
+    trace_pop = st.checkbox("📈 Tracer la population (débogage)", value=False,
+                            help="Conserve chaque génération pour la vue « Population au fil des générations ».")
 
 just_calculated = False
 
 # ------------- Bouton de lancement -------------
 if st.button("🚀 Lancer l’optimisation"):
-    inputs_script = [
-        "o",
-        str(pop_size), str(gen_nbr), str(mut_rate), str(n_parent),
-        str(fc28), str(slump), str(dmax),
-        str(min_c), str(max_c), str(min_w), str(max_w),
-        str(min_s), str(max_s), str(min_g), str(max_g),
-        str(cost_c), str(cost_w), str(cost_s), str(cost_g),
-        str(mf), str(rho_s), str(rho_g),
-        profile_choice.split(" ")[0]
-    ]
+    constraints = {
+        "target_strength": fc28, "target_slump": slump, "D_max": dmax,
+        "min_cement": min_c, "max_cement": max_c, "min_water": min_w, "max_water": max_w,
+        "min_sand": min_s, "max_sand": max_s, "min_gravel": min_g, "max_gravel": max_g,
+        "cost_cement": cost_c, "cost_water": cost_w, "cost_sand": cost_s, "cost_gravel": cost_g,
+        "Mf": mf, "rho_sand": rho_s, "rho_gravel": rho_g,
+        "co2_cement": co2_c, "co2_water": co2_w, "co2_sand": co2_s, "co2_gravel": co2_g,
+    }
+    if max_co2 > 0:
+        constraints["max_co2"] = max_co2
+    if sourcing:
+        constraints["sources"] = {
+            "cement": [ga_beton.option_ciment(r["Ciment"], float(r["Coût (FCFA/kg)"]), float(r["CO₂ (kg/kg)"]))
+                       for _, r in df_ciments[df_ciments["Disponible"]].iterrows()],
+            "sand": options_granulats(df_sables, "Sable"),
+            "gravel": options_granulats(df_graviers, "Gravier"),
+        }
+    parametres = {"POP_SIZE": pop_size, "N_GENERATIONS": gen_nbr,
+                  "MUTATION_RATE": mut_rate, "N_PARENTS": n_parent}
+    weights = ga_beton.OPTIMIZATION_PROFILES[int(profile_choice.split(" ")[0])]["weights"]
 
     try:
-        raw_output = run_optim(inputs_script)
+        checkpoint = None
+        if reprise and ga_beton.OPTIMISEURS[methode]["reprise"]:
+            cle = ga_beton.signature_probleme(constraints, list(weights), parametres, methode, graine)
+            checkpoint = os.path.join(tempfile.gettempdir(), f"optibeton_ga_{cle[:16]}.npz")
+        res = ga_beton.optimiser_formulation(constraints, weights, parametres, methode, seed=graine,
+                                             checkpoint=checkpoint, intervalle_checkpoint=intervalle_reprise,
+                                             trace_population=trace_pop)
+
+        # -- Prérésolution : diagnostic immédiat si les bornes sont infaisables
+        if not res["faisable"]:
+            st.error("❌ Aucune formulation ne respecte simultanément E/C 0.30–0.65, G/S ±20 % et sable 35–45 % avec ces bornes.")
+            for diag in res["presolve"]["diagnostics"]:
+                st.markdown(f"- **[{diag['contrainte']}]** {diag['message']}  \n  💡 {diag['conseil']}")
+            st.stop()
+
+        raw_output = ga_beton.formater_resultats(res)
+        if res["conseils"]:
+            raw_output += "\n\n💡 CONSEILS D'OPTIMISATION\n" + "\n".join(
+                f"{i}. {c}" for i, c in enumerate(res["conseils"], 1))
         st.success("Optimisation terminée ✅")
         just_calculated = True
 
         # -- Résumé structuré
-        info = parse_results(raw_output)
-        met1, met2, met3, met4, met5, met6 = st.columns(6)
+        info = resume_resultats(res)
+        met1, met2, met3, met4, met5, met6, met7 = st.columns(7)
         met1.metric("Ciment (kg/m³)", info["Ciment (kg/m³)"])
         met2.metric("Eau (kg/m³)",    info["Eau (kg/m³)"])
         met3.metric("E/C",            f'{info["E/C"]:.3f}' if info["E/C"] else "—")
@@ -149,6 +297,7 @@ if st.button("🚀 Lancer l’optimisation"):
         met5.metric("Slump (mm)",       info["Affaissement (mm)"])
         met6.metric("Coût (FCFA/m³)",
                     f'{info["Coût (FCFA/m³)"]:,.0f}' if info["Coût (FCFA/m³)"] else "—")
+        met7.metric("CO₂ (kg/m³)",    info["CO₂ (kg/m³)"])
 
         st.markdown("---")
         df_summary = pd.DataFrame([
@@ -161,13 +310,17 @@ if st.button("🚀 Lancer l’optimisation"):
             ["Ratio S/G masse (%)", info["Ratio S/G masse (%)"]],
             ["Résistance (MPa)",    info["Résistance (MPa)"]],
             ["Slump (mm)",          info["Affaissement (mm)"]],
-            ["Coût (FCFA/m³)",      info["Coût (FCFA/m³)"]]
+            ["Coût (FCFA/m³)",      info["Coût (FCFA/m³)"]],
+            ["CO₂ (kg/m³)",         info["CO₂ (kg/m³)"]]
         ], columns=["Paramètre", "Valeur"])
         st.table(df_summary)
+        if info["Sources"] != "—":
+            st.info(f"🏷️ Sources retenues : {info['Sources']}")
         # -- Sauvegarde pour persistance
         st.session_state["ga_raw"] = raw_output
         st.session_state["ga_info"] = info
         st.session_state["ga_df"] = df_summary
+        st.session_state["ga_res"] = res
 
 
         # -- Export XLSX (openpyxl)
@@ -192,8 +345,9 @@ if st.button("🚀 Lancer l’optimisation"):
         with st.expander("🔍 Sortie détaillée du moteur"):
             st.text(raw_output)
 
-    except StopIteration:
-        st.error("Flux d’entrées désynchronisé – vérifiez l’ordre des champs.")
+        afficher_paysage(res)
+        afficher_population(res)
+
     except Exception as exc:
         st.exception(exc)
 
@@ -206,13 +360,14 @@ if not just_calculated and "ga_raw" in st.session_state and "ga_df" in st.sessio
     info = st.session_state["ga_info"]
     df_summary = st.session_state["ga_df"]
 
-    met1, met2, met3, met4, met5, met6 = st.columns(6)
+    met1, met2, met3, met4, met5, met6, met7 = st.columns(7)
     met1.metric("Ciment (kg/m³)", info["Ciment (kg/m³)"])
     met2.metric("Eau (kg/m³)",    info["Eau (kg/m³)"])
     met3.metric("E/C",            f'{info["E/C"]:.3f}' if info["E/C"] else "—")
     met4.metric("Résistance (MPa)", info["Résistance (MPa)"])
     met5.metric("Slump (mm)",       info["Affaissement (mm)"])
     met6.metric("Coût (FCFA/m³)", f'{info["Coût (FCFA/m³)"]:,.0f}' if info["Coût (FCFA/m³)"] else "—")
+    met7.metric("CO₂ (kg/m³)",    info.get("CO₂ (kg/m³)", "—"))
 
     st.markdown("---")
     st.table(df_summary)
@@ -238,3 +393,7 @@ if not just_calculated and "ga_raw" in st.session_state and "ga_df" in st.sessio
 
     with st.expander("🔍 Sortie détaillée du moteur"):
         st.text(raw_output)
+
+    if "ga_res" in st.session_state:
+        afficher_paysage(st.session_state["ga_res"])
+        afficher_population(st.session_state["ga_res"])
@@ -0,0 +1,111 @@
+# app_portefeuille.py  –  Interface Streamlit : portefeuille de bétons d'une centrale sous stocks partagés
+import os, sys
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+
+# ── 1. Modules de calcul (racine du projet)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import algorithme_genetique_co as ga_beton
+import portefeuille_centrale as pf
+
+# ── 2. Interface Streamlit
+st.set_page_config(page_title="🏭 Portefeuille Centrale", layout="wide")
+st.title("🏭 Portefeuille de bétons – Centrale à béton")
+st.caption("Optimise simultanément tous les bétons du plan de production : coût total minimal, "
+           "résistance ≥ cible, affaissement à ±10 %, stocks de ciment et de granulats partagés.")
+
+# ------------- 1) Plan de production -------------
+st.subheader("1️⃣ Plan de production journalier")
+plan_defaut = pd.DataFrame({
+    "Nom": ["C20", "C25", "C30", "C35"],
+    "fc28 (MPa)": [20.0, 25.0, 30.0, 35.0],
+    "Affaissement (mm)": [80.0, 100.0, 100.0, 120.0],
+    "Dmax (mm)": [20.0, 20.0, 16.0, 16.0],
+    "Volume (m³)": [40.0, 80.0, 60.0, 20.0],
+})
+plan = st.data_editor(plan_defaut, num_rows="dynamic", use_container_width=True, key="plan_portefeuille")
+incompletes = int(plan.isna().any(axis=1).sum())
+plan = plan.dropna()
+if incompletes:
+    st.warning(f"{incompletes} ligne(s) incomplète(s) ignorée(s) : renseigner toutes les colonnes.")
+
+# ------------- 2) Bornes, coûts, granulats -------------
+st.subheader("2️⃣ Bornes, coûts et granulats communs")
+col1, col2, col3 = st.columns(3)
+with col1:
+    largeur = st.slider("Largeur des bornes autour des valeurs typiques (±%)", 5, 40, 15, 1) / 100
+    mf    = st.slider("Module de finesse sable (Mf)", 2.0, 3.5, 2.5, 0.05)
+with col2:
+    cost_c = st.number_input("Ciment (FCFA/kg)",  value=100.0, step=5.0, min_value=0.0)
+    cost_w = st.number_input("Eau (FCFA/kg)",     value=0.23,  step=0.01, min_value=0.0)
+    cost_s = st.number_input("Sable (FCFA/kg)",   value=5.0,   step=1.0, min_value=0.0)
+    cost_g = st.number_input("Gravier (FCFA/kg)", value=9.0,   step=1.0, min_value=0.0)
+with col3:
+    rho_s = st.number_input("ρ sable (kg/m³)",   0.0, value=1600.0, step=10.0)
+    rho_g = st.number_input("ρ gravier (kg/m³)", 0.0, value=1500.0, step=10.0)
+
+# ------------- 3) Stocks -------------
+st.subheader("3️⃣ Stocks disponibles sur la journée (kg, 0 = illimité)")
+cols = st.columns(4)
+stocks_saisis = {mat: cols[i].number_input(nom, 0.0, value=0.0, step=1000.0, key=f"stock_{mat}")
+                 for i, (mat, nom) in enumerate(ga_beton.MATERIAUX.items())}
+stocks = {mat: v for mat, v in stocks_saisis.items() if v > 0}
+
+# ------------- 4) Méthode -------------
+st.subheader("4️⃣ Méthode de résolution")
+methodes = {"lp": "Programme linéaire exact (HiGHS)",
+            **{cle: opt["name"] for cle, opt in ga_beton.OPTIMISEURS.items()}}
+methode = st.selectbox("Moteur", list(methodes), format_func=methodes.get)
+
+def contraintes_melange(ligne):
+    """Contraintes d'un béton du plan, bornes centrées sur des valeurs typiques (ciment issu de l'E/C de résistance)."""
+    fc, slump = ligne["fc28 (MPa)"], ligne["Affaissement (mm)"]
+    typ_w = 150 + slump / 2
+    ec = min(ga_beton.EC_MAX, pf.ec_max_resistance({"target_strength": fc}))
+    typiques = {"cement": max(300, typ_w / ec), "water": typ_w, "sand": 600, "gravel": 900}
+    constraints = {"target_strength": fc, "target_slump": slump, "D_max": ligne["Dmax (mm)"], "Mf": mf,
+                   "rho_sand": rho_s, "rho_gravel": rho_g,
+                   "cost_cement": cost_c, "cost_water": cost_w, "cost_sand": cost_s, "cost_gravel": cost_g}
+    for mat, typ in typiques.items():
+        constraints[f"min_{mat}"], constraints[f"max_{mat}"] = (1 - largeur) * typ, (1 + largeur) * typ
+    return constraints
+
+if st.button("🚀 Optimiser le portefeuille"):
+    if plan.empty:
+        st.error("Plan de production vide : ajouter au moins un béton complet avant d'optimiser.")
+        st.stop()
+    melanges = [pf.melange(ligne["Nom"], ligne["Volume (m³)"], contraintes_melange(ligne))
+                for _, ligne in plan.iterrows()]
+    with st.spinner("Optimisation du portefeuille…"):
+        res = pf.optimiser_portefeuille(melanges, stocks, methode, seed=0)
+
+    if not res["faisable"]:
+        st.error("Portefeuille infaisable : aucune optimisation lancée.")
+        for diag in res["diagnostics"]:
+            st.markdown(f"- **[{diag['contrainte']}]** {diag['message']}  \n  💡 {diag['conseil']}")
+        st.stop()
+
+    ind = res["evaluation"]["indicateurs"]
+    tableau = pd.DataFrame({
+        "Béton": [m["nom"] for m in melanges],
+        "Volume (m³)": [m["volume"] for m in melanges],
+        **{f"{nom} (kg/m³)": res["dosages"][:, j].round() for j, nom in enumerate(ga_beton.MATERIAUX.values())},
+        "E/C": ind["E_C"].round(3),
+        "Résistance (MPa)": ind["strength"].round(1),
+        "Affaissement (mm)": ind["slump"].round(),
+        "Coût (FCFA/m³)": ind["cost"].round(),
+        "CO₂ (kg/m³)": ind["co2"].round(1),
+    })
+    st.success(f"💰 Coût total du plan : {res['cout_total']:,.0f} FCFA")
+    if not res["admissible"]:
+        st.warning("Solution non admissible : augmenter le nombre de générations ou utiliser le programme linéaire.")
+    st.dataframe(tableau, use_container_width=True)
+
+    conso = res["evaluation"]["consommation"]
+    fig = go.Figure(go.Bar(x=list(ga_beton.MATERIAUX.values()), y=conso, name="Consommation"))
+    fig.add_trace(go.Scatter(x=[ga_beton.MATERIAUX[mat] for mat in stocks], y=list(stocks.values()),
+                             mode="markers", marker=dict(symbol="line-ew-open", size=40, color="red"),
+                             name="Stock disponible"))
+    fig.update_layout(title="📦 Consommation du plan vs stocks", yaxis_title="kg")
+    st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+# Optimisation d'un portefeuille de bétons d'une centrale (C20, C25, C30…)
+# sous stocks partagés (silo ciment, stocks de granulats) et plan de volumes journalier
+#
+# Chaque mélange garde ses contraintes de formulation (mêmes clés que
+# `algorithme_genetique_co.optimiser_formulation`) ; le portefeuille minimise le coût
+# total du plan sous :
+#   - les contraintes de chaque mélange (E/C, G/S, ratio sable, plafond CO2),
+#   - la résistance ≥ cible et l'affaissement à ±10 % de la cible,
+#   - Σ volume × dosage ≤ stock disponible, pour chaque matériau.
+#
+import numpy as np
+
+import algorithme_genetique_co as ga
+
+# =============================================
+# PARAMÈTRES DU PORTEFEUILLE
+# =============================================
+TOLERANCE_AFFAISSEMENT = 0.10   # ±10 % autour de l'affaissement cible (cf. conseils du GA)
+B_RESISTANCE = 4.5              # base de la loi d'Abrams utilisée par `resistance_compression`
+PENALITE_PORTEFEUILLE = 1e6     # par unité de violation relative (objectif des moteurs stochastiques)
+
+def melange(nom, volume, constraints):
+    """Un béton du plan de production : nom, volume (m³/jour) et contraintes de formulation."""
+    if ga.genes_discrets(constraints):
+        raise ValueError(f"{nom} : les choix de sources ne sont pas gérés en mode portefeuille")
+    return {"nom": nom, "volume": float(volume), "constraints": dict(constraints)}
+
+def _eau_affaissement(slump, D_max):
+    """Dosage en eau donnant l'affaissement `slump` (inverse de `calculate_slump`)."""
+    return (slump - 5.4816 * D_max + 955.58) / 4.6707
+
+def ec_max_resistance(constraints):
+    """E/C maximal garantissant la résistance cible (loi d'Abrams inversée)."""
+    a = constraints.get("coef_resistance", 110.0)
+    return np.log(a / constraints["target_strength"]) / (1.5 * np.log(B_RESISTANCE))
+
+# =============================================
+# PRÉRÉSOLUTION PAR MÉLANGE
+# =============================================
+def presolve_melange(m):
+    """
+    Prérésolution d'un mélange (`presolve_bornes`) complétée des exigences du
+    portefeuille : fenêtre d'eau issue de l'affaissement et E/C ≤ E/C de résistance.
+    Retourne le dict de `presolve_bornes` enrichi de "GS_target" et "ec_max".
+    """
+    constraints = dict(m["constraints"])
+    GS_target = ga.compute_GS_target(constraints["target_slump"], constraints["D_max"], constraints["Mf"])
+    w_lo = _eau_affaissement((1 - TOLERANCE_AFFAISSEMENT) * constraints["target_slump"], constraints["D_max"])
+    w_hi = _eau_affaissement((1 + TOLERANCE_AFFAISSEMENT) * constraints["target_slump"], constraints["D_max"])
+    ec_max = min(ga.EC_MAX, ec_max_resistance(constraints))
+
+    diagnostics = []
+    if w_lo > constraints["max_water"] or w_hi < constraints["min_water"]:
+        diagnostics.append({"contrainte": "affaissement",
+                            "message": f"Eau pour l'affaissement cible ({w_lo:.0f}-{w_hi:.0f}) hors des bornes "
+                                       f"[{constraints['min_water']:.0f} ; {constraints['max_water']:.0f}]",
+                            "conseil": "💧 Élargir les bornes d'eau ou revoir l'affaissement cible"})
+    if ec_max < ga.EC_MIN:
+        diagnostics.append({"contrainte": "résistance",
+                            "message": f"Résistance {constraints['target_strength']} MPa inatteignable avec E/C ≥ {ga.EC_MIN:.2f}",
+                            "conseil": "🧱 Choisir un ciment de classe supérieure ou réduire la résistance cible"})
+    if diagnostics:
+        return {"faisable": False, "bornes": {}, "diagnostics": diagnostics, "GS_target": GS_target, "ec_max": ec_max}
+
+    constraints["min_water"] = max(constraints["min_water"], w_lo)
+    constraints["max_water"] = min(constraints["max_water"], w_hi)
+    presolve = ga.presolve_bornes(constraints, GS_target)
+    if presolve["faisable"]:
+        bornes = presolve["bornes"]
+        bornes["cement"], bornes["water"] = ga._projeter_ratio(bornes["cement"], bornes["water"], ga.EC_MIN, ec_max)
+        if any(lo > hi + 1e-9 for lo, hi in bornes.values()):
+            presolve = {**presolve, "faisable": False, "diagnostics": [{
+                "contrainte": "résistance",
+                "message": f"E/C ≤ {ec_max:.3f} (résistance {constraints['target_strength']} MPa) incompatible "
+                           "avec l'eau imposée par l'affaissement",
+                "conseil": f"🧱 Augmenter max_cement à ≥ {bornes['water'][0] / ec_max:.0f} kg/m³"}]}
+        elif "max_co2" in constraints:
+            # La projection sur E/C ≤ ec_max relève le ciment minimal : plafond CO2 à revérifier
+            co2_min = _co2_minimal(constraints, bornes, ga.fenetre_ratio_GS(constraints, GS_target)[0])
+            if co2_min > constraints["max_co2"] + 1e-9:
+                presolve = {**presolve, "faisable": False, "diagnostics": [{
+                    "contrainte": "CO2",
+                    "message": f"Émission minimale atteignable {co2_min:.0f} kg CO2-eq/m³ (E/C ≤ {ec_max:.3f} pour la "
+                               f"résistance) > plafond {constraints['max_co2']:.0f}",
+                    "conseil": f"🌍 Relever max_co2 à ≥ {co2_min:.0f} kg/m³, réduire la résistance cible "
+                               "ou choisir un ciment moins émissif"}]}
+    return {**presolve, "GS_target": GS_target, "ec_max": ec_max}
+
+def _co2_minimal(constraints, bornes, r_min):
+    """Émission minimale (kg CO2-eq/m³) dans des bornes déjà projetées (E/C ≥ EC_MIN, G ≥ r_min·S)."""
+    ef = {mat: ga.facteur_co2(constraints, mat) for mat in ga.GENES}
+    c_min, s_min = bornes["cement"][0], bornes["sand"][0]
+    return (ef["cement"] * c_min + ef["water"] * max(bornes["water"][0], ga.EC_MIN * c_min)
+            + ef["sand"] * s_min + ef["gravel"] * max(bornes["gravel"][0], r_min * s_min))
+
+# =============================================
+# ÉVALUATION VECTORISÉE DU PORTEFEUILLE
+# =============================================
+def empiler_contraintes(melanges):
+    """Contraintes des M mélanges empilées en tableaux (M,) pour `evaluer_indicateurs`."""
+    cles = ["target_strength", "target_slump", "D_max", "Mf", "rho_sand", "rho_gravel",
+            *[f"cost_{mat}" for mat in ga.GENES]]
+    empilees = {cle: np.array([m["constraints"][cle] for m in melanges], dtype=float) for cle in cles}
+    for mat in ga.GENES:
+        empilees[f"co2_{mat}"] = np.array([ga.facteur_co2(m["constraints"], mat) for m in melanges], dtype=float)
+    empilees["coef_resistance"] = np.array([m["constraints"].get("coef_resistance", 110.0) for m in melanges])
+    empilees["max_co2"] = np.array([m["constraints"].get("max_co2", np.inf) for m in melanges], dtype=float)
+    return empilees
+
+def vecteur_stocks(stocks):
+    """Stocks disponibles (kg) dans l'ordre de GENES ; matériau absent = illimité."""
+    return np.array([stocks.get(mat, np.inf) for mat in ga.GENES], dtype=float)
+
+def evaluer_portefeuille(X, melanges, stocks, empilees=None, GS_targets=None):
+    """
+    Évalue des portefeuilles X (n × M × 4) en une passe : indicateurs de chaque
+    mélange (n × M), consommation par matériau (n × 4), coût total du plan (n)
+    et violations relatives (≥ 0, nulles si admissible).
+    """
+    X = np.asarray(X, dtype=float)
+    if empilees is None:
+        empilees = empiler_contraintes(melanges)
+    if GS_targets is None:
+        GS_targets = ga.compute_GS_target(empilees["target_slump"], empilees["D_max"], empilees["Mf"])
+    volumes = np.array([m["volume"] for m in melanges])
+
+    ind = ga.evaluer_indicateurs(X, empilees, GS_targets)
+    consommation = np.einsum("m,...mj->...j", volumes, X)
+    cout_total = ind["cost"] @ volumes
+
+    with np.errstate(invalid="ignore"):
+        violations = {
+            "E_C": np.maximum(ga.EC_MIN - ind["E_C"], ind["E_C"] - ga.EC_MAX).clip(0) / ga.EC_MAX,
+            "GS": (np.abs(ind["GS_real"] - GS_targets) - ga.TOLERANCE_GS * GS_targets).clip(0) / GS_targets,
+            "masse": np.maximum(ga.S_RATIO_MIN - ind["S_ratio"], ind["S_ratio"] - ga.S_RATIO_MAX).clip(0),
+            "co2": np.where(np.isfinite(empilees["max_co2"]),
+                            (ind["co2"] - empilees["max_co2"]) / empilees["max_co2"], 0.0).clip(0),
+            "résistance": ((empilees["target_strength"] - ind["strength"]) / empilees["target_strength"]).clip(0),
+            "affaissement": ((np.abs(ind["slump"] - empilees["target_slump"]) / empilees["target_slump"])
+                             - TOLERANCE_AFFAISSEMENT).clip(0),
+        }
+    stock = vecteur_stocks(stocks)
+    depassement = ((consommation - stock) / np.where(np.isfinite(stock), stock, 1.0)).clip(0)
+    depassement = np.where(np.isfinite(stock), depassement, 0.0)
+
+    return {
+        "indicateurs": ind,
+        "consommation": consommation,
+        "cout_total": cout_total,
+        "violations": {k: np.nan_to_num(v, nan=1.0) for k, v in violations.items()},
+        "depassement_stock": depassement,
+    }
+
+def fitness_portefeuille(evaluation):
+    """Fitness (à maximiser) : − coût total − pénalités graduées de violation."""
+    violation = sum(v.sum(axis=-1) for v in evaluation["violations"].values())
+    violation = violation + evaluation["depassement_stock"].sum(axis=-1)
+    return -evaluation["cout_total"] - PENALITE_PORTEFEUILLE * violation
+
+# =============================================
+# RÉSOLUTION
+# =============================================
+def _programme_lineaire(melanges, stocks, presolves):
+    """
+    Le coût, les fenêtres de ratio (E/C, G/S, ratio sable), l'exigence de résistance
+    (E/C ≤ ec_max), le plafond CO2 et les stocks sont linéaires en les dosages :
+    le portefeuille est un programme linéaire résolu exactement (HiGHS).
+    """
+    from scipy.optimize import linprog
+    from scipy.sparse import lil_matrix
+
+    M, d = len(melanges), len(ga.GENES)
+    C, E, S, G = (ga.GENES.index(mat) for mat in ("cement", "water", "sand", "gravel"))
+    volumes = np.array([m["volume"] for m in melanges])
+    couts = np.array([[m["constraints"][f"cost_{mat}"] for mat in ga.GENES] for m in melanges])
+    stock = vecteur_stocks(stocks)
+    limites = [mat for mat in range(d) if np.isfinite(stock[mat])]
+    plafonds = [i for i, m in enumerate(melanges) if "max_co2" in m["constraints"]]
+
+    A = lil_matrix((4 * M + len(plafonds) + len(limites), M * d))
+    b = np.zeros(A.shape[0])
+    for i, (m, p) in enumerate(zip(melanges, presolves)):
+        r_min, r_max, _, _ = ga.fenetre_ratio_GS(m["constraints"], p["GS_target"])
+        for k, (x, y, lo, hi) in enumerate([(C, E, ga.EC_MIN, p["ec_max"]), (S, G, r_min, r_max)]):
+            A[4 * i + 2 * k, i * d + x], A[4 * i + 2 * k, i * d + y] = lo, -1       # lo·x − y ≤ 0
+            A[4 * i + 2 * k + 1, i * d + y], A[4 * i + 2 * k + 1, i * d + x] = 1, -hi  # y − hi·x ≤ 0
+    for k, i in enumerate(plafonds):
+        for j, mat in enumerate(ga.GENES):
+            A[4 * M + k, i * d + j] = ga.facteur_co2(melanges[i]["constraints"], mat)
+        b[4 * M + k] = melanges[i]["constraints"]["max_co2"]
+    for k, j in enumerate(limites):
+        ligne = 4 * M + len(plafonds) + k
+        for i in range(M):
+            A[ligne, i * d + j] = volumes[i]
+        b[ligne] = stock[j]
+
+    bornes = [p["bornes"][mat] for p in presolves for mat in ga.GENES]
+    return linprog((volumes[:, None] * couts).ravel(), A_ub=A.tocsr(), b_ub=b, bounds=bornes, method="highs")
+
+def _diagnostic_lp(melanges, stocks, presolves, sol):
+    """
+    Cause d'un échec du programme linéaire. Sans les stocks, le programme se sépare
+    par mélange : chaque mélange est résolu seul pour distinguer une formulation
+    infaisable d'une pénurie de stock ; les autres statuts sont des échecs du solveur.
+    """
+    if sol.status != 2:
+        return [{"contrainte": "solveur",
+                 "message": f"Échec du solveur HiGHS (statut {sol.status}) : {sol.message}",
+                 "conseil": "🔁 Relancer avec un moteur stochastique (GA, DE, CMA-ES, PSO) ou vérifier les données"}]
+    infaisables = [m for m, p in zip(melanges, presolves) if _programme_lineaire([m], {}, [p]).status == 2]
+    if infaisables:
+        return [{"contrainte": "mélange",
+                 "message": f"{m['nom']} : aucune formulation ne respecte à la fois E/C, G/S, ratio sable"
+                            + (" et plafond CO2" if "max_co2" in m["constraints"] else "") + " dans les bornes",
+                 "conseil": "📐 Élargir les bornes de ce béton"
+                            + (" ou relever son max_co2" if "max_co2" in m["constraints"] else "")}
+                for m in infaisables]
+    return [{"contrainte": "stock",
+             "message": "Stocks insuffisants pour satisfaire simultanément tous les mélanges",
+             "conseil": "📦 Réapprovisionner le matériau le plus sollicité ou étaler le plan de production"}]
+
+def _besoins_minimaux(melanges, presolves):
+    """Consommation minimale de chaque matériau (kg), mélange par mélange, bornes resserrées."""
+    return {mat: sum(m["volume"] * p["bornes"][mat][0] for m, p in zip(melanges, presolves)) for mat in ga.GENES}
+
+def optimiser_portefeuille(melanges, stocks, methode="lp", parametres=None, seed=None):
+    """
+    Optimise simultanément tous les mélanges du plan de production.
+
+    `stocks` : {matériau: kg disponibles sur la période du plan} (absent = illimité).
+    `methode` : "lp" (programme linéaire exact, par défaut) ou une clé de
+    OPTIMISEURS, qui travaille alors sur le vecteur aplati des M × 4 dosages avec
+    `fitness_portefeuille` comme objectif.
+
+    Retourne {"faisable", "dosages" (M × 4), "evaluation", "cout_total", ...} ou,
+    si le plan est vide ou si un mélange ou les stocks sont infaisables,
+    {"faisable": False, "diagnostics"}.
+    """
+    if not melanges:
+        return {"faisable": False, "presolves": [], "diagnostics": [{
+            "contrainte": "plan",
+            "message": "Plan de production vide : aucun mélange à optimiser",
+            "conseil": "📋 Ajouter au moins un béton (nom, fc28, affaissement, Dmax, volume) au plan"}]}
+    presolves = [presolve_melange(m) for m in melanges]
+    diagnostics = [{**diag, "message": f"{m['nom']} : {diag['message']}"}
+                   for m, p in zip(melanges, presolves) if not p["faisable"] for diag in p["diagnostics"]]
+    if diagnostics:
+        return {"faisable": False, "diagnostics": diagnostics, "presolves": presolves}
+
+    besoins = _besoins_minimaux(melanges, presolves)
+    for mat, nom in ga.MATERIAUX.items():
+        if besoins[mat] > stocks.get(mat, np.inf):
+            diagnostics.append({"contrainte": "stock",
+                                "message": f"{nom} : besoin minimal {besoins[mat]:,.0f} kg > stock {stocks[mat]:,.0f} kg",
+                                "conseil": f"📦 Réapprovisionner au moins {besoins[mat] - stocks[mat]:,.0f} kg "
+                                           "ou réduire les volumes du plan"})
+    if diagnostics:
+        return {"faisable": False, "diagnostics": diagnostics, "presolves": presolves}
+
+    empilees = empiler_contraintes(melanges)
+    GS_targets = np.array([p["GS_target"] for p in presolves])
+    historique = []
+    if methode == "lp":
+        sol = _programme_lineaire(melanges, stocks, presolves)
+        if sol.status != 0:
+            return {"faisable": False, "presolves": presolves,
+                    "diagnostics": _diagnostic_lp(melanges, stocks, presolves, sol)}
+        dosages = sol.x.reshape(len(melanges), len(ga.GENES))
+    else:
+        M, d = len(melanges), len(ga.GENES)
+        lo = np.array([p["bornes"][mat][0] for p in presolves for mat in ga.GENES])
+        hi = np.array([p["bornes"][mat][1] for p in presolves for mat in ga.GENES])
+
+        def objectif(X):
+            fitnesses = fitness_portefeuille(evaluer_portefeuille(X.reshape(-1, M, d), melanges, stocks, empilees, GS_targets))
+            historique.append(max(float(np.max(fitnesses)), historique[-1] if historique else -np.inf))
+            return fitnesses
+
+        parametres = {**ga.PARAMETRES_DEFAUT, **(parametres or {})}
+        res = ga.OPTIMISEURS[methode]["fonction"](objectif, lo, hi, parametres, np.random.default_rng(seed))
+        dosages = np.asarray(res["x"], dtype=float).reshape(M, d)
+
+    evaluation = evaluer_portefeuille(dosages, melanges, stocks, empilees, GS_targets)
+    violation = sum(float(v.sum()) for v in evaluation["violations"].values()) + float(evaluation["depassement_stock"].sum())
+    return {
+        "faisable": True,
+        "methode": methode,
+        "admissible": violation <= 1e-6,
+        "dosages": dosages,
+        "evaluation": evaluation,
+        "cout_total": float(evaluation["cout_total"]),
+        "melanges": melanges,
+        "stocks": stocks,
+        "presolves": presolves,
+        "historique": historique,
+    }
+
+def formater_portefeuille(res):
+    """Rapport texte d'`optimiser_portefeuille`."""
+    if not res["faisable"]:
+        return "\n".join(["\n❌ PORTEFEUILLE INFAISABLE", "========================",
+                          *[f"- [{d['contrainte']}] {d['message']}\n  {d['conseil']}" for d in res["diagnostics"]]])
+
+    ind = res["evaluation"]["indicateurs"]
+    nom_methode = "Programme linéaire (HiGHS)" if res["methode"] == "lp" else ga.OPTIMISEURS[res["methode"]]["name"]
+    lignes = [f"\n✅ PORTEFEUILLE OPTIMISÉ ({nom_methode})", "====================="]
+    for i, m in enumerate(res["melanges"]):
+        C, E, S, G = res["dosages"][i]
+        lignes.append(f"- {m['nom']:<8} {m['volume']:>6.0f} m³ | C={C:.0f} E={E:.0f} S={S:.0f} G={G:.0f} kg/m³ | "
+                      f"E/C={ind['E_C'][i]:.3f} | {ind['strength'][i]:.1f} MPa | {ind['slump'][i]:.0f} mm | "
+                      f"{ind['cost'][i]:,.0f} FCFA/m³")
+    lignes.append("\n📦 CONSOMMATION / STOCKS")
+    for j, (mat, nom) in enumerate(ga.MATERIAUX.items()):
+        stock = res["stocks"].get(mat)
+        conso = res["evaluation"]["consommation"][j]
+        lignes.append(f"  • {nom} : {conso:,.0f} kg" + (f" / {stock:,.0f} kg ({conso / stock * 100:.0f}%)" if stock else ""))
+    lignes.append(f"\n💰 Coût total du plan : {res['cout_total']:,.0f} FCFA")
+    if not res["admissible"]:
+        lignes.append("⚠️ Solution non admissible : augmenter le nombre de générations ou utiliser la méthode 'lp'")
+    return "\n".join(lignes)
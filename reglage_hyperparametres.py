@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# Réglage hors ligne des paramètres du GA par classe de problème (course par élimination successive)
+#
+#   python reglage_hyperparametres.py            → régénère parametres_regles.json
+#
+import json
+import time
+import itertools
+
+import numpy as np
+
+import algorithme_genetique_co as ga
+
+# =============================================
+# ESPACE DE RECHERCHE ET PROBLÈMES REPRÉSENTATIFS
+# =============================================
+GRILLE_PARAMETRES = {
+    "POP_SIZE": [30, 50, 100, 150, 250],
+    "N_GENERATIONS": [30, 50, 80, 120, 200],
+    "MUTATION_RATE": [0.05, 0.1, 0.15, 0.25],
+    "PART_PARENTS": [0.1, 0.2, 0.3],
+}
+BANDES_RESISTANCE = {"fc≤25": (20, 25), "fc25-35": (26, 35), "fc>35": (36, 50)}
+BANDES_LARGEUR = {"bornes-étroites": (0.05, 0.14), "bornes-moyennes": (0.15, 0.29), "bornes-larges": (0.30, 0.45)}
+BANDES_DMAX = {"D≤10": [5, 10], "D≤16": [16], "D≤20": [20], "D>20": [25]}
+# Types d'instances de chaque classe (cf. `ga.variante_probleme`) : les paramètres réglés
+# ne sont appliqués qu'aux types représentés dans la course
+VARIANTES = ("simple", "co2", "sources")
+
+# Coût de calcul : pénalité de score par tranche de 10 000 évaluations de fitness. Les regrets
+# relatifs entre configurations valent 1e-5 à 1e-2 : le coût ne départage que des qualités voisines
+POIDS_CALCUL = 5e-5
+
+def generer_probleme(rng, bande_fc, bande_largeur, bande_dmax, variante="simple"):
+    """
+    Problème aléatoire de la classe donnée, construit comme les valeurs typiques de la page GA,
+    avec un plafond CO2 proche de l'émission typique ("co2") ou des choix de ciment et de
+    sources de granulats ("sources").
+    """
+    fc = rng.uniform(*BANDES_RESISTANCE[bande_fc])
+    slump = rng.uniform(50, 200)
+    dmax = float(rng.choice(BANDES_DMAX[bande_dmax]))
+    largeur = rng.uniform(*BANDES_LARGEUR[bande_largeur])
+    typiques = {"cement": max(300, fc * 10), "water": 150 + slump / 2, "sand": 600, "gravel": 900}
+
+    constraints = {"target_strength": fc, "target_slump": slump, "D_max": dmax,
+                   "Mf": rng.uniform(2.2, 3.0), "rho_sand": rng.uniform(1500, 1700), "rho_gravel": rng.uniform(1400, 1600),
+                   "cost_cement": rng.uniform(80, 120), "cost_water": 0.23,
+                   "cost_sand": rng.uniform(3, 8), "cost_gravel": rng.uniform(6, 12)}
+    for mat, typ in typiques.items():
+        centre = typ * rng.uniform(0.9, 1.1)
+        constraints[f"min_{mat}"] = centre * (1 - largeur / 2)
+        constraints[f"max_{mat}"] = centre * (1 + largeur / 2)
+
+    if variante == "co2":
+        co2_typique = sum(typ * ga.FACTEURS_CO2[mat] for mat, typ in typiques.items())
+        constraints["max_co2"] = co2_typique * rng.uniform(0.85, 1.05)
+    elif variante == "sources":
+        constraints["sources"] = {
+            "cement": [ga.option_ciment(o["name"], o["cost"] * rng.uniform(0.9, 1.1), o["co2"]) for o in ga.CIMENTS_DEFAUT],
+            "sand": [{"name": f"Sable {k}", "cost": rng.uniform(3, 8), "rho": rng.uniform(1500, 1700)} for k in "AB"],
+            "gravel": [{"name": f"Gravier {k}", "cost": rng.uniform(6, 12), "rho": rng.uniform(1400, 1600)} for k in "AB"],
+        }
+    return constraints
+
+def problemes_representatifs(classe, n, seed=0):
+    """n problèmes faisables (après prérésolution) d'une classe, répartis entre les VARIANTES."""
+    rng = np.random.default_rng([seed, *map(ord, classe)])
+    bande_fc, bande_largeur, bande_dmax = classe.split("|")
+    problemes = []
+    while len(problemes) < n:
+        variante = VARIANTES[len(problemes) % len(VARIANTES)]
+        constraints = generer_probleme(rng, bande_fc, bande_largeur, bande_dmax, variante)
+        GS_target = ga.compute_GS_target(constraints["target_slump"], constraints["D_max"], constraints["Mf"])
+        if ga.presolve_bornes(constraints, GS_target)["faisable"]:
+            problemes.append(constraints)
+    return problemes
+
+def configurations_candidates(n, seed=0):
+    """Défauts actuels + n-1 configurations tirées dans GRILLE_PARAMETRES."""
+    rng = np.random.default_rng(seed)
+    toutes = list(itertools.product(*GRILLE_PARAMETRES.values()))
+    tirees = [toutes[i] for i in rng.choice(len(toutes), size=n - 1, replace=False)]
+    configs = [dict(ga.PARAMETRES_DEFAUT)]
+    for pop, gen, mut, part in tirees:
+        configs.append({"POP_SIZE": pop, "N_GENERATIONS": gen, "MUTATION_RATE": mut,
+                        "N_PARENTS": max(2, int(round(part * pop)))})
+    return configs
+
+# =============================================
+# COURSE PAR ÉLIMINATION SUCCESSIVE
+# =============================================
+def course_elimination(problemes, configs, eta=3, instances_initiales=2, weights=(0.33, 0.33, 0.34), n_graines=None):
+    """
+    Successive halving : chaque tour évalue les configurations survivantes sur un
+    nombre croissant d'instances (problème, graine) et ne garde que le meilleur tiers.
+    Chaque problème est résolu avec `n_graines` graines (défaut : autant que de problèmes).
+
+    Score = regret relatif moyen par rapport à la meilleure fitness observée sur
+    l'instance + POIDS_CALCUL × évaluations / 10 000.
+    """
+    n_graines = len(problemes) if n_graines is None else n_graines
+    if n_graines < 1:
+        raise ValueError(f"n_graines doit être ≥ 1 (reçu {n_graines})")
+    instances = [(p, s) for s in range(n_graines) for p in range(len(problemes))]
+    fitness = {}  # (i_config, i_instance) -> fitness finale
+    survivantes = list(range(len(configs)))
+    n_instances = instances_initiales
+
+    while True:
+        n_instances = min(n_instances, len(instances))
+        for c in survivantes:
+            for i in range(n_instances):
+                if (c, i) not in fitness:
+                    p, graine = instances[i]
+                    res = ga.optimiser_formulation(problemes[p], weights, configs[c], "ga", seed=graine)
+                    fitness[(c, i)] = res["fitness"]
+
+        meilleure = [max(fitness[(c, i)] for c in survivantes) for i in range(n_instances)]
+        scores = {}
+        for c in survivantes:
+            regret = np.mean([(meilleure[i] - fitness[(c, i)]) / max(abs(meilleure[i]), 1e-9) for i in range(n_instances)])
+            evaluations = configs[c]["POP_SIZE"] * (configs[c]["N_GENERATIONS"] + 1)
+            scores[c] = regret + POIDS_CALCUL * evaluations / 1e4
+
+        survivantes = sorted(survivantes, key=scores.get)
+        if len(survivantes) == 1 or n_instances == len(instances):
+            return configs[survivantes[0]], scores[survivantes[0]]
+        survivantes = survivantes[:max(1, len(survivantes) // eta)]
+        n_instances *= eta
+
+def regler_toutes_classes(n_configs=27, n_problemes=6, n_graines=2, fichier=ga.FICHIER_PARAMETRES_REGLES):
+    """Règle chaque classe de problème et enregistre le meilleur jeu de paramètres."""
+    classes = {}
+    for classe in map("|".join, itertools.product(BANDES_RESISTANCE, BANDES_LARGEUR, BANDES_DMAX)):
+        t0 = time.perf_counter()
+        problemes = problemes_representatifs(classe, n_problemes)
+        hors_classe = {ga.classe_probleme(p) for p in problemes} - {classe}
+        if hors_classe:
+            raise RuntimeError(f"Problèmes générés hors de la classe {classe} : {', '.join(sorted(hors_classe))}")
+        config, score = course_elimination(problemes, configurations_candidates(n_configs), n_graines=n_graines)
+        classes[classe] = {**config, "score": round(float(score), 6)}
+        print(f"- {classe:<38} → {config} (score={score:.2e}, {time.perf_counter() - t0:.1f} s)")
+
+    with open(fichier, "w", encoding="utf-8") as f:
+        json.dump({"methode": "successive halving", "poids_calcul": POIDS_CALCUL, "variantes": list(VARIANTES),
+                   "classes": classes},
+                  f, ensure_ascii=False, indent=2)
+    return classes
+
+if __name__ == "__main__":
+    print("\n🏁 RÉGLAGE DES PARAMÈTRES DU GA PAR CLASSE DE PROBLÈME")
+    print("====================================================")
+    regler_toutes_classes()
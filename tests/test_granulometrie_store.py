@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# Régression : un échantillon à cheval sur deux blocs de lecture reste un seul échantillon
+import io
+
+import numpy as np
+import pandas as pd
+
+import granulometrie_store as granulo
+
+TAMIS = [20, 10, 5, 2.5, 1.25, 0.63, 0.315, 0.16, 0.08]
+SABLE = [100, 100, 98, 85, 65, 45, 25, 10, 3]
+GRAVIER = [95, 40, 8, 2, 1, 0, 0, 0, 0]
+
+def _export(echantillons):
+    lignes = [(e, nom, t, str(p).replace(".", ",")) for e in echantillons
+              for nom, courbe in (("Sable", SABLE), ("Gravier", GRAVIER)) for t, p in zip(TAMIS, courbe)]
+    df = pd.DataFrame(lignes, columns=list(granulo.COLONNES_GRANULO.values()))
+    fichier = io.BytesIO(df.to_csv(sep=";", decimal=",", index=False).encode("utf-8"))
+    fichier.name = "export.csv"
+    return fichier
+
+def test_echantillon_a_cheval_sur_deux_blocs():
+    # 18 lignes par échantillon : « 103 » occupe les lignes 36-53, le premier bloc (40 lignes)
+    # est tout numérique, le second contient aussi « A7 »
+    for taille_bloc in (40, 18, 7, 1000):
+        stock = granulo.lire_granulometrie(_export(["101", "102", "103", "A7"]), taille_bloc=taille_bloc)
+        assert stock.echantillons == ["101", "102", "103", "A7"]
+        assert stock.granulats == ["Sable", "Gravier"]
+        assert not np.isnan(stock.passants).any()